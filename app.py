@@ -1,41 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime
-import queue
 
 # --- Local Module Imports ---
-from backtest.data import HistoricDataHandler
-from backtest.portfolio import Portfolio
-from backtest.execution import SimulatedExecutionHandler
-from backtest.engine import Backtest
-from backtest.performance import get_performance_metrics
-from strategies.buy_and_hold import BuyAndHoldStrategy
-from strategies.sma_crossover import SMACrossoverStrategy
-from strategies.rsi_strategy import RSIStrategy
-from strategies.bollinger_bands_strategy import BollingerBandsStrategy
-from strategies.macd_strategy import MACDStrategy
-from strategies.parabolic_sar_strategy import ParabolicSARStrategy
-from strategies.stochastic_oscillator_strategy import StochasticOscillatorStrategy
-from strategies.on_balance_volume_strategy import OnBalanceVolumeStrategy
-from strategies.ichimoku_cloud_strategy import IchimokuCloudStrategy
-from strategies.atr_channel_strategy import ATRChannelStrategy
-from strategies.rate_of_change_strategy import RateOfChangeStrategy
-from strategies.awesome_oscillator_strategy import AwesomeOscillatorStrategy
-from strategies.keltner_channel_strategy import KeltnerChannelStrategy
-from strategies.vwap_crossover_strategy import VWAPCrossoverStrategy
-from strategies.donchian_channel_strategy import DonchianChannelStrategy
-from strategies.cci_strategy import CCIStrategy
-from strategies.ma_ribbon_strategy import MARibbonStrategy
-from strategies.chaikin_money_flow_strategy import ChaikinMoneyFlowStrategy
-from strategies.williams_r_strategy import WilliamsRStrategy
-from strategies.aroon_indicator_strategy import AroonIndicatorStrategy
-from strategies.money_flow_index_strategy import MoneyFlowIndexStrategy
-from strategies.trix_strategy import TrixStrategy
-from strategies.vortex_indicator_strategy import VortexIndicatorStrategy
-from strategies.dema_crossover_strategy import DEMACrossoverStrategy
-from strategies.tema_crossover_strategy import TEMACrossoverStrategy
+from backtest import allocation, significance
+from backtest.jobs import JobManager, JobQueueFull
+from backtest.registry import default_registry
+from backtest.visualization import downsample_frame, paginate, trade_log_frame
 
 # --- App Configuration ---
 st.set_page_config(
@@ -46,46 +18,24 @@ st.set_page_config(
 )
 
 # --- Strategy Registry with Default Parameters ---
-DEFAULT_STRATEGY_REGISTRY = {
-    "Buy and Hold": {"class": BuyAndHoldStrategy, "params": {}},
-    "SMA Crossover (50/200)": {"class": SMACrossoverStrategy, "params": {"short_window": 50, "long_window": 200}},
-    "DEMA Crossover (50/200)": {"class": DEMACrossoverStrategy, "params": {"short_period": 50, "long_period": 200}},
-    "TEMA Crossover (50/200)": {"class": TEMACrossoverStrategy, "params": {"short_period": 50, "long_period": 200}},
-    "RSI (14/30/70)": {"class": RSIStrategy, "params": {"rsi_period": 14, "oversold_threshold": 30, "overbought_threshold": 70}},
-    "Bollinger Bands (20/2)": {"class": BollingerBandsStrategy, "params": {"bb_period": 20, "bb_std_dev": 2.0}},
-    "MACD (12/26/9)": {"class": MACDStrategy, "params": {"short_ema_period": 12, "long_ema_period": 26, "signal_ema_period": 9}},
-    "Parabolic SAR (0.02/0.2)": {"class": ParabolicSARStrategy, "params": {"initial_af": 0.02, "max_af": 0.2}},
-    "Stochastic Oscillator (14/20/80)": {"class": StochasticOscillatorStrategy, "params": {"k_period": 14, "oversold_threshold": 20, "overbought_threshold": 80}},
-    "OBV Crossover (20)": {"class": OnBalanceVolumeStrategy, "params": {"obv_ma_period": 20}},
-    "Ichimoku Cloud (9/26)": {"class": IchimokuCloudStrategy, "params": {"tenkan_period": 9, "kijun_period": 26}},
-    "ATR Channel Breakout (20/14/2)": {"class": ATRChannelStrategy, "params": {"sma_period": 20, "atr_period": 14, "atr_multiplier": 2.0}},
-    "Rate of Change (12/20)": {"class": RateOfChangeStrategy, "params": {"roc_period": 12, "ma_period": 20}},
-    "Awesome Oscillator (5/34)": {"class": AwesomeOscillatorStrategy, "params": {"short_period": 5, "long_period": 34}},
-    "Keltner Channel (20/10/2)": {"class": KeltnerChannelStrategy, "params": {"ema_period": 20, "atr_period": 10, "atr_multiplier": 2.0}},
-    "VWAP Crossover (20)": {"class": VWAPCrossoverStrategy, "params": {"vwap_ma_period": 20}},
-    "Donchian Channel (20)": {"class": DonchianChannelStrategy, "params": {"period": 20}},
-    "CCI (20/-100/100)": {"class": CCIStrategy, "params": {"period": 20, "oversold": -100, "overbought": 100}},
-    "MA Ribbon (5/10/20)": {"class": MARibbonStrategy, "params": {"short_period": 5, "medium_period": 10, "long_period": 20}},
-    "Chaikin Money Flow (20)": {"class": ChaikinMoneyFlowStrategy, "params": {"period": 20}},
-    "Williams %R (14/-80/-20)": {"class": WilliamsRStrategy, "params": {"period": 14, "oversold": -80, "overbought": -20}},
-    "Aroon Indicator (25)": {"class": AroonIndicatorStrategy, "params": {"period": 25}},
-    "Money Flow Index (14/20/80)": {"class": MoneyFlowIndexStrategy, "params": {"period": 14, "oversold": 20, "overbought": 80}},
-    "TRIX (15/9)": {"class": TrixStrategy, "params": {"period": 15, "signal_period": 9}},
-    "Vortex Indicator (14)": {"class": VortexIndicatorStrategy, "params": {"period": 14}},
-}
-
-# --- Caching ---
-@st.cache_data
-def get_stock_data(ticker, start_date, end_date):
-    try:
-        data = yf.download(ticker, start=start_date, end=end_date)
-        if data.empty:
-            st.error(f"Error: No data found for ticker '{ticker}'. It might be delisted or an invalid ticker.")
-            return None
-        return data
-    except Exception as e:
-        st.error(f"An error occurred while fetching data for {ticker}: {e}")
-        return None
+# Strategy classes are imported lazily, only when a backtest runs them
+DEFAULT_STRATEGY_REGISTRY = default_registry()
+
+# --- Background Execution ---
+# Backtests run in one worker pool shared by every session and kept across
+# reruns. Each worker caches the data it has loaded, and each strategy is
+# its own job, so a rerun only runs the strategies whose inputs changed.
+JOB_POLL_SECONDS = 0.5
+
+@st.cache_resource
+def get_job_manager():
+    manager = JobManager(max_pending=256)
+    manager.warm()
+    return manager
+
+# Spawned workers re-import this script as __mp_main__ (Streamlit runs it
+# as __main__); only the Streamlit process may own the pool
+job_manager = get_job_manager() if __name__ == "__main__" else None
 
 # --- Sidebar for User Inputs ---
 st.sidebar.header("Backtest Configuration")
@@ -93,6 +43,12 @@ ticker = st.sidebar.text_input("Stock Ticker", "AAPL").upper()
 start_date = st.sidebar.date_input("Start Date", datetime(2020, 1, 1))
 end_date = st.sidebar.date_input("End Date", datetime.now())
 initial_capital = st.sidebar.number_input("Initial Capital", 1000, 1000000, 100000, step=1000)
+# Yahoo's prices and volume already include splits, so the choice is only
+# whether dividends are adjusted for as well
+ADJUSTMENT_OPTIONS = {"Splits and dividends": "all", "Splits only (as downloaded)": "none"}
+adjustment = ADJUSTMENT_OPTIONS[st.sidebar.selectbox("Price Adjustment", list(ADJUSTMENT_OPTIONS),
+                                                     help="Downloaded prices and volume are already split-adjusted; "
+                                                          "'Splits and dividends' also scales earlier prices down by each dividend")]
 
 # --- Position Sizing Settings ---
 st.sidebar.header("Position Sizing")
@@ -108,18 +64,18 @@ elif position_size_pct > 10:
 # --- Strategy Parameter Customization ---
 st.sidebar.header("Strategy Parameters")
 
-# Create a copy of the default registry that we'll modify with user inputs
-STRATEGY_REGISTRY = DEFAULT_STRATEGY_REGISTRY.copy()
+# User-adjusted parameters per strategy; the registry defaults stay untouched
+strategy_params = {}
 
 # Create expandable sections for each strategy with parameter controls
 strategy_toggles = {}
-for strategy_name, config in DEFAULT_STRATEGY_REGISTRY.items():
+for strategy_name, spec in DEFAULT_STRATEGY_REGISTRY.items():
     strategy_toggles[strategy_name] = st.sidebar.checkbox(f"Run {strategy_name}", value=True)
     
     if strategy_toggles[strategy_name]:
         with st.sidebar.expander(f"Customize {strategy_name}"):
             custom_params = {}
-            for param_name, param_value in config["params"].items():
+            for param_name, param_value in spec.params.items():
                 if isinstance(param_value, int):
                     custom_params[param_name] = st.number_input(
                         f"{param_name}", 
@@ -138,8 +94,13 @@ for strategy_name, config in DEFAULT_STRATEGY_REGISTRY.items():
                 else:
                     custom_params[param_name] = param_value
                     
-            # Update the registry with custom parameters
-            STRATEGY_REGISTRY[strategy_name]["params"] = custom_params
+            strategy_params[strategy_name] = custom_params
+
+# --- Display Settings ---
+st.sidebar.header("Display")
+chart_points = st.sidebar.number_input("Chart Resolution (points)", 200, 10000, 1000, step=100,
+                                       help="Equity curves are downsampled to this many points; zoom in to see full detail")
+trades_per_page = st.sidebar.number_input("Trade Log Rows per Page", 10, 1000, 50, step=10)
 
 run_button = st.sidebar.button("Run All Strategies", type="primary")
 
@@ -147,94 +108,138 @@ run_button = st.sidebar.button("Run All Strategies", type="primary")
 st.title("📈 Comprehensive Stock Backtester")
 st.write("""
 This tool runs multiple trading strategies against historical stock data to identify the top performers. 
-Configure your backtest on the left and click 'Run All Strategies' to begin.
+Configure your backtest on the left and click 'Run All Strategies' to begin. After that, changing a setting
+re-runs only the strategies it affects.
 """)
 
-if run_button and ticker:
-    data = get_stock_data(ticker, start_date, end_date)
-    if data is not None:
-        all_results = []
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Filter strategies based on toggles
-        active_strategies = {name: config for name, config in STRATEGY_REGISTRY.items() if strategy_toggles[name]}
-        
-        for i, (name, config) in enumerate(active_strategies.items()):
-            status_text.text(f"Running backtest for: {name}...")
-            
-            # --- Initialize and Run Backtest for each strategy ---
-            events = queue.Queue()
-            symbol_list = [ticker]
-            
-            data_handler = HistoricDataHandler(events, symbol_list, data)
-            strategy = config["class"](data_handler, events, **config["params"])
-            # Pass position size percentage to the Portfolio
-            portfolio = Portfolio(data_handler, events, start_date, initial_capital, position_size_pct/100.0)
-            execution_handler = SimulatedExecutionHandler(events, data_handler)
-
-            backtest = Backtest(data_handler, strategy, portfolio, execution_handler)
-            equity_curve, trade_log = backtest.simulate_trading()
-            
-            # --- Store Results ---
-            performance = get_performance_metrics(equity_curve, trade_log, initial_capital)
-            all_results.append({
-                "name": name,
-                "performance": performance,
-                "equity_curve": equity_curve,
-                "trade_log": trade_log
-            })
-            
-            progress_bar.progress((i + 1) / len(active_strategies))
-
-        status_text.text("All backtests complete! Compiling results...")
-
-        # --- Rank and Display Results ---
-        if all_results:
-            all_results.sort(key=lambda x: x["performance"]["Net Profit"], reverse=True)
-            
-            st.subheader("🏆 Strategy Performance Ranking")
-            
-            rank_data = []
-            for i, result in enumerate(all_results):
-                p = result["performance"]
-                rank_data.append({
-                    "Rank": i + 1,
-                    "Strategy": result["name"],
-                    "Net Profit ($)": f"{p['Net Profit']:,.2f}",
-                    "Sharpe Ratio": f"{p['Sharpe Ratio']:.2f}",
-                    "Max Drawdown (%)": f"{p['Max Drawdown']:.2f}",
-                    "Total Trades": p["Total Trades"]
-                })
-            
-            rank_df = pd.DataFrame(rank_data).set_index("Rank")
-            st.dataframe(rank_df)
-            
-            st.subheader("Comparative Equity Curves (Top 5)")
-            top_5_results = all_results[:5]
-            equity_curves_df = pd.DataFrame()
-            for result in top_5_results:
-                if 'equity_curve' in result['equity_curve'].columns:
-                    curve = result['equity_curve'][['equity_curve']].rename(columns={'equity_curve': result['name']})
-                    if equity_curves_df.empty:
-                        equity_curves_df = curve
-                    else:
-                        equity_curves_df = equity_curves_df.join(curve, how='outer')
-            
-            equity_curves_df.ffill(inplace=True)
-            st.line_chart(equity_curves_df)
-            
-            st.subheader("Detailed Analysis of Top Performers")
-            for result in top_5_results:
-                with st.expander(f"View Details for: {result['name']}"):
-                    rank_info = rank_df[rank_df['Strategy'] == result['name']]
-                    st.dataframe(rank_info)
-                    st.line_chart(result['equity_curve']['equity_curve'])
-                    st.write("Trade Log")
-                    st.dataframe(pd.DataFrame(result['trade_log']))
-        
-        progress_bar.empty()
-        status_text.success("Analysis complete!")
-
-elif run_button and not ticker:
-    st.error("Please enter a stock ticker to begin.")
+if run_button:
+    if ticker:
+        st.session_state["backtests_started"] = True
+    else:
+        st.error("Please enter a stock ticker to begin.")
+
+# Once started, every rerun submits the current configuration, one job per
+# strategy. Unchanged strategies map to their finished (or running) jobs,
+# so zooming, paging or editing one strategy's parameters never re-runs
+# the others, and the script never waits for a backtest.
+jobs = {}
+if st.session_state.get("backtests_started") and ticker:
+    for name in [name for name in DEFAULT_STRATEGY_REGISTRY if strategy_toggles[name]]:
+        request = {
+            "ticker": ticker, "start_date": start_date, "end_date": end_date,
+            "initial_capital": initial_capital, "position_size": position_size_pct / 100.0, "adjust": adjustment,
+            "strategies": [{"name": name, "params": strategy_params[name]}],
+        }
+        try:
+            job, _ = job_manager.submit(request, reuse=True)
+            if run_button and job.state == "failed":
+                job, _ = job_manager.submit(request)
+            jobs[name] = job
+        except JobQueueFull:
+            st.warning("The backtest workers are busy; the remaining strategies will be submitted on the next rerun.")
+            break
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_ids, n_shown):
+    # Polls the jobs without re-running the page; a full rerun picks up new results
+    jobs = [job_manager.get(job_id) for job_id in job_ids]
+    n_finished = sum(job is None or job.finished is not None for job in jobs)
+    if n_finished != n_shown:
+        st.rerun()
+    st.progress(n_finished / len(jobs), text=f"Running backtests: {n_finished} of {len(jobs)} complete...")
+
+finished = {name: job for name, job in jobs.items() if job.finished is not None}
+if len(finished) < len(jobs):
+    job_progress([job.job_id for job in jobs.values()], len(finished))
+
+failures = {}
+for name, job in finished.items():
+    if job.state == "failed":
+        failures.setdefault(job.errors[name], []).append(name)
+for error, names in failures.items():
+    st.error(f"Backtest failed for {'all strategies' if len(names) == len(jobs) else ', '.join(names)}: {error}")
+
+# --- Rank and Display Results ---
+# Results are shared with other sessions through the job manager; read only
+all_results = sorted((job.results[name] for name, job in finished.items() if job.state == "done"),
+                     key=lambda x: x["performance"]["Net Profit"], reverse=True)
+if all_results:
+    st.subheader("🏆 Strategy Performance Ranking")
+
+    # The best of many backtests looks good by luck alone; the deflated
+    # Sharpe ratio and the overfitting tests account for how many were run
+    strategy_returns = allocation.returns_frame(all_results)
+    deflated = significance.deflated_sharpe(strategy_returns)
+
+    rank_data = []
+    for i, result in enumerate(all_results):
+        p = result["performance"]
+        rank_data.append({
+            "Rank": i + 1,
+            "Strategy": result["name"],
+            "Net Profit ($)": f"{p['Net Profit']:,.2f}",
+            "Sharpe Ratio": f"{p['Sharpe Ratio']:.2f}",
+            "Deflated Sharpe (prob.)": f"{deflated['dsr'][result['name']]:.2f}",
+            "Max Drawdown (%)": f"{p['Max Drawdown']:.2f}",
+            "Total Trades": p["Total Trades"]
+        })
+
+    rank_df = pd.DataFrame(rank_data).set_index("Rank")
+    st.dataframe(rank_df)
+    if len(all_results) > 1 and len(strategy_returns) >= 32:
+        snooping = significance.reality_check(strategy_returns)
+        overfitting = significance.backtest_overfitting(strategy_returns)
+        st.caption(f"Probability of backtest overfitting: {overfitting['pbo']:.0%}. "
+                   f"p-value of the best strategy ({snooping['best']}) beating cash after data snooping: "
+                   f"{snooping['spa']:.2f} (SPA test; White's Reality Check {snooping['reality_check']:.2f}).")
+
+    st.subheader("Comparative Equity Curves (Top 5)")
+    top_5_results = all_results[:5]
+    equity_curves_df = pd.DataFrame()
+    for result in top_5_results:
+        if 'equity_curve' in result['equity_curve'].columns:
+            curve = result['equity_curve'][['equity_curve']].rename(columns={'equity_curve': result['name']})
+            if equity_curves_df.empty:
+                equity_curves_df = curve
+            else:
+                equity_curves_df = equity_curves_df.join(curve, how='outer')
+
+    equity_curves_df.ffill(inplace=True)
+    zoom = None
+    if len(equity_curves_df) > 1:
+        first, last = equity_curves_df.index[0].to_pydatetime(), equity_curves_df.index[-1].to_pydatetime()
+        zoom = st.slider("Zoom", min_value=first, max_value=last, value=(first, last), key="equity_zoom")
+    start, end = zoom if zoom else (None, None)
+    st.line_chart(downsample_frame(equity_curves_df, chart_points, start, end))
+
+    st.subheader("Strategy Blend")
+    blend_method = st.selectbox("Allocation", allocation.ALLOCATORS, index=allocation.ALLOCATORS.index('risk_parity'),
+                                key="blend_method")
+    blend_rolling = st.checkbox("Re-optimize monthly on the trailing year", key="blend_rolling")
+    # Near-duplicate strategies (correlation >= 0.9) would otherwise take a double share
+    blend_returns = allocation.deduplicate(strategy_returns)
+    if blend_rolling and len(blend_returns) > 252:
+        blend_weights = allocation.rolling_allocation(blend_returns, blend_method, window=252, step=21)
+        current_weights = blend_weights.iloc[-1]
+    else:
+        blend_weights = current_weights = allocation.allocate(blend_returns, blend_method)
+    blend_curve = initial_capital * (1.0 + allocation.blend(blend_returns, blend_weights)).cumprod()
+    st.dataframe(current_weights[current_weights > 1e-4].sort_values(ascending=False).rename("Weight").to_frame())
+    st.line_chart(downsample_frame(blend_curve.rename("Blend").to_frame(), chart_points, start, end))
+
+    st.subheader("Detailed Analysis of Top Performers")
+    for result in top_5_results:
+        with st.expander(f"View Details for: {result['name']}"):
+            rank_info = rank_df[rank_df['Strategy'] == result['name']]
+            st.dataframe(rank_info)
+            st.line_chart(downsample_frame(result['equity_curve'][['equity_curve']], chart_points, start, end))
+            st.write("Trade Log")
+            trades = trade_log_frame(result['trade_log'])
+            n_pages = max(1, -(-len(trades) // trades_per_page))
+            page = st.number_input("Page", 1, n_pages, 1, key=f"{result['name']}_trade_page")
+            page_df, n_pages = paginate(trades, page, trades_per_page)
+            st.dataframe(page_df)
+            st.caption(f"Page {page} of {n_pages} ({len(trades)} trades)")
+            if hasattr(result['trade_log'], 'round_trips'):
+                st.write("Round Trips")
+                st.dataframe(result['trade_log'].round_trips())
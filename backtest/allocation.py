@@ -0,0 +1,342 @@
+import numpy as np
+import pandas as pd
+
+PERIODS_PER_YEAR = 252
+COVARIANCES = ('shrunk', 'sample')
+
+
+def returns_frame(curves):
+    """
+    Per-bar returns of several equity curves, one column per strategy.
+    `curves` is {name: equity curve (or its 'total' series)} or the app's
+    result records (dicts with 'name' and 'equity_curve'). Curves are
+    aligned on the union of their dates and are flat where they have none.
+    """
+    if not isinstance(curves, dict):
+        curves = {r['name']: r['equity_curve'] for r in curves}
+    totals = pd.DataFrame({name: c['total'] if isinstance(c, pd.DataFrame) else c for name, c in curves.items()})
+    return totals.ffill().pct_change(fill_method=None).fillna(0.0)
+
+
+class RunningCovariance:
+    """
+    Mean and sample covariance of a stream of return rows, updated in
+    O(rows x N^2) as rows are added or removed, so a rolling window moves
+    without recomputing from all of its rows. Sums are kept around the
+    first rows' mean, which keeps them well conditioned.
+    """
+    def __init__(self, n_assets):
+        self.count = 0
+        self.shift = None
+        self._sum = np.zeros(n_assets)
+        self._cross = np.zeros((n_assets, n_assets))
+
+    def _centered(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(self._sum))
+        if self.shift is None:
+            self.shift = rows.mean(axis=0)
+        return rows - self.shift
+
+    def add(self, rows):
+        x = self._centered(rows)
+        self.count += len(x)
+        self._sum += x.sum(axis=0)
+        self._cross += x.T @ x
+
+    def remove(self, rows):
+        x = self._centered(rows)
+        self.count -= len(x)
+        self._sum -= x.sum(axis=0)
+        self._cross -= x.T @ x
+
+    def mean(self):
+        return self.shift + self._sum / self.count
+
+    def covariance(self):
+        m = self._sum / self.count
+        return (self._cross - self.count * np.outer(m, m)) / (self.count - 1)
+
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf covariance: the sample covariance shrunk towards a scaled
+    identity by the intensity that minimises the expected squared error.
+    With hundreds of strategies and a few years of bars the sample matrix
+    is close to singular; the shrunk one is well conditioned. Returns
+    (covariance, shrinkage).
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    x = x - x.mean(axis=0)
+    n, p = x.shape
+    sample = x.T @ x / n
+    mu = np.trace(sample) / p
+    x2 = x * x
+    pi = ((x2.T @ x2).sum() / n - (sample ** 2).sum()) / n
+    delta = ((sample - mu * np.eye(p)) ** 2).sum()
+    shrinkage = float(np.clip(pi / delta, 0.0, 1.0)) if delta > 0 else 1.0
+    covariance = (1.0 - shrinkage) * sample + shrinkage * mu * np.eye(p)
+    return covariance, shrinkage
+
+
+def _covariance(returns, method):
+    if method == 'shrunk':
+        return ledoit_wolf(returns)[0]
+    if method == 'sample':
+        return np.cov(np.asarray(returns, dtype=np.float64), rowvar=False).reshape(returns.shape[1], -1)
+    raise ValueError(f"Unknown covariance estimator '{method}', expected one of {COVARIANCES}")
+
+
+def _sharpe(returns, periods_per_year=PERIODS_PER_YEAR):
+    x = np.asarray(returns, dtype=np.float64)
+    std = x.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.sqrt(periods_per_year) * x.mean(axis=0) / std
+    return np.where(std > 0, sharpe, 0.0)
+
+
+def correlation_clusters(returns, threshold=0.9):
+    """
+    Groups strategies whose returns are redundant: complete-linkage
+    clustering on correlation, so every pair inside a cluster correlates at
+    `threshold` or more. Flat curves form one cluster. Returns a label per
+    column (a Series for a DataFrame), numbered by first appearance.
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    p = x.shape[1]
+    flat = x.std(axis=0) == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.nan_to_num(np.corrcoef(x, rowvar=False).reshape(p, p))
+    corr[np.ix_(flat, flat)] = 1.0
+    dist = 1.0 - corr
+    np.fill_diagonal(dist, np.inf)
+
+    parent = np.arange(p)
+    limit = 1.0 - threshold
+    for _ in range(p - 1):
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        if not dist[i, j] <= limit:
+            break
+        i, j = min(i, j), max(i, j)
+        # Complete linkage: a merged cluster is as far as its farthest member
+        dist[i] = np.maximum(dist[i], dist[j])
+        dist[:, i] = dist[i]
+        dist[i, i] = np.inf
+        dist[j] = np.inf
+        dist[:, j] = np.inf
+        parent[parent == j] = i
+    # A cluster is labelled by its first member, so labels follow first appearance
+    labels = np.unique(parent, return_inverse=True)[1]
+    return pd.Series(labels, index=returns.columns) if isinstance(returns, pd.DataFrame) else labels
+
+
+def deduplicate(returns, threshold=0.9, score=None, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Keeps one strategy per correlation cluster (see correlation_clusters),
+    the one with the highest `score` (default: annualised Sharpe ratio).
+    Returns the remaining columns of `returns`.
+    """
+    labels = np.asarray(correlation_clusters(returns, threshold))
+    score = _sharpe(returns, periods_per_year) if score is None else np.asarray(score, dtype=np.float64)
+    # Best score first, then keep the first column seen per label
+    order = np.lexsort((-score, labels))
+    _, first = np.unique(labels[order], return_index=True)
+    keep = np.sort(order[first])
+    return returns.iloc[:, keep]
+
+
+def _project(v, max_weight=1.0):
+    """Euclidean projection of `v` onto {w : 0 <= w <= max_weight, sum(w) = 1}."""
+    if max_weight * len(v) < 1.0 - 1e-12:
+        raise ValueError(f"max_weight {max_weight} cannot hold a fully invested portfolio of {len(v)} assets")
+    if max_weight >= 1.0:
+        u = np.sort(v)[::-1]
+        css = np.cumsum(u) - 1.0
+        rho = np.flatnonzero(u - css / np.arange(1, len(v) + 1) > 0)[-1]
+        return np.maximum(v - css[rho] / (rho + 1), 0.0)
+    # Capped simplex: bisection on the shift
+    lo, hi = v.min() - 1.0, v.max()
+    for _ in range(60):
+        tau = 0.5 * (lo + hi)
+        if np.clip(v - tau, 0.0, max_weight).sum() > 1.0:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(v - 0.5 * (lo + hi), 0.0, max_weight)
+
+
+def mean_variance(mu, cov, risk_aversion=1.0, max_weight=1.0, start=None, iterations=1000, tol=1e-10):
+    """
+    Long-only, fully invested weights maximising mu'w - risk_aversion/2 x
+    w'cov w, each at most `max_weight`, by accelerated projected gradient.
+    mu = 0 gives the minimum-variance portfolio.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    n = len(mu)
+    step = 1.0 / max(risk_aversion * np.linalg.eigvalsh(cov)[-1], 1e-12)
+    w = _project(np.full(n, 1.0 / n) if start is None else np.asarray(start, dtype=np.float64), max_weight)
+    y, t = w, 1.0
+    for _ in range(iterations):
+        w_next = _project(y + step * (mu - risk_aversion * (cov @ y)), max_weight)
+        t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+        y = w_next + (t - 1.0) / t_next * (w_next - w)
+        done = np.abs(w_next - w).max() < tol
+        w, t = w_next, t_next
+        if done:
+            break
+    return w
+
+
+def min_variance(cov, max_weight=1.0, start=None):
+    return mean_variance(np.zeros(len(cov)), cov, 1.0, max_weight, start)
+
+
+def risk_parity(cov, budgets=None, start=None, iterations=100, tol=1e-20):
+    """
+    Weights whose risk contributions w_i (cov w)_i are proportional to
+    `budgets` (default equal). Solved as min 1/2 y'cov y - budgets'log y
+    by damped Newton steps, then normalised to sum to one.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    n = len(cov)
+    b = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=np.float64) / np.sum(budgets)
+    y = b / np.sqrt(np.diag(cov))
+    if start is not None:
+        # Warm start from earlier weights, scaled to the solution's y'cov y = 1
+        y = np.maximum(np.asarray(start, dtype=np.float64), 1e-3 / n)
+        y /= np.sqrt(y @ cov @ y)
+
+    def objective(y):
+        return 0.5 * y @ cov @ y - b @ np.log(y)
+
+    f = objective(y)
+    for _ in range(iterations):
+        gradient = cov @ y - b / y
+        direction = np.linalg.solve(cov + np.diag(b / (y * y)), gradient)
+        decrement = gradient @ direction
+        if decrement < tol:
+            break
+        # Backtrack to stay positive and, until the objective can no longer
+        # resolve the progress, to decrease it; near the solution take full steps
+        step = 1.0
+        while np.any(y - step * direction <= 0) or (
+                decrement > 1e-8 and objective(y - step * direction) > f - 0.25 * step * decrement):
+            step *= 0.5
+        y = y - step * direction
+        f = objective(y)
+    return y / y.sum()
+
+
+def min_drawdown(returns, max_weight=1.0, start=None, iterations=2000):
+    """
+    Long-only, fully invested weights minimising the maximum drawdown of
+    the blend's cumulative (uncompounded) returns. That drawdown is convex
+    in the weights; it is minimised by projected subgradient steps and the
+    best weights seen are returned.
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    n = x.shape[1]
+    cumulative = np.vstack([np.zeros(n), np.cumsum(x, axis=0)])
+    w = _project(np.full(n, 1.0 / n) if start is None else np.asarray(start, dtype=np.float64), max_weight)
+    best, best_drawdown = w, np.inf
+    for k in range(iterations):
+        path = cumulative @ w
+        drawdown = np.maximum.accumulate(path) - path
+        trough = int(np.argmax(drawdown))
+        if drawdown[trough] < best_drawdown:
+            best, best_drawdown = w, drawdown[trough]
+        peak = int(np.argmax(path[:trough + 1]))
+        gradient = cumulative[peak] - cumulative[trough]
+        norm = np.linalg.norm(gradient)
+        if norm == 0:
+            break
+        w = _project(w - 0.5 / np.sqrt(k + 1.0) * gradient / norm, max_weight)
+    return best
+
+
+ALLOCATORS = ('equal', 'min_variance', 'mean_variance', 'risk_parity', 'min_drawdown')
+
+
+def _solve(method, returns, cov, periods_per_year, start=None, **params):
+    n = returns.shape[1]
+    if method == 'equal':
+        return np.full(n, 1.0 / n)
+    if method == 'min_variance':
+        return min_variance(cov, start=start, **params)
+    if method == 'mean_variance':
+        mu = returns.mean(axis=0) * periods_per_year
+        return mean_variance(mu, cov * periods_per_year, start=start, **params)
+    if method == 'risk_parity':
+        return risk_parity(cov, start=start, **params)
+    if method == 'min_drawdown':
+        return min_drawdown(returns, start=start, **params)
+    raise ValueError(f"Unknown allocation method '{method}', expected one of {ALLOCATORS}")
+
+
+def allocate(returns, method='risk_parity', covariance='shrunk', periods_per_year=PERIODS_PER_YEAR, **params):
+    """
+    Weights (a Series over the columns of `returns`, summing to one) from
+    one of ALLOCATORS. Extra `params` go to the solver (e.g. risk_aversion
+    or max_weight). Strategies whose curve never moves get weight 0.
+    `risk_aversion` is in annualised units (periods_per_year bars a year).
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    active = np.flatnonzero(x.std(axis=0) > 0)
+    weights = np.zeros(x.shape[1])
+    if len(active):
+        window = x[:, active]
+        cov = _covariance(window, covariance) if method not in ('equal', 'min_drawdown') else None
+        weights[active] = _solve(method, window, cov, periods_per_year, **params)
+    return pd.Series(weights, index=returns.columns) if isinstance(returns, pd.DataFrame) else weights
+
+
+def rolling_allocation(returns, method='risk_parity', window=252, step=21, covariance='shrunk',
+                       periods_per_year=PERIODS_PER_YEAR, **params):
+    """
+    Re-optimizes every `step` bars on the previous `window` bars. Returns
+    a DataFrame of weights with one row per rebalance, indexed by the first
+    bar the weights apply to, so each row only uses earlier bars (see
+    `blend`). Consecutive solves start from the previous weights, and the
+    sample covariance is maintained incrementally by a RunningCovariance.
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    n_bars, n = x.shape
+    running = RunningCovariance(n) if covariance == 'sample' else None
+    rows, dates = [], []
+    previous = None
+    for t in range(window, n_bars, step):
+        block = x[t - window:t]
+        if running is not None:
+            # Slide the window: add the bars since the last rebalance, drop those now too old
+            start = t - window if running.count == 0 else t - step
+            running.add(x[start:t])
+            if running.count > window:
+                running.remove(x[t - window - step:t - window])
+        active = np.flatnonzero(block.std(axis=0) > 0)
+        weights = np.zeros(n)
+        if len(active):
+            cov = None
+            if method not in ('equal', 'min_drawdown'):
+                cov = running.covariance()[np.ix_(active, active)] if running is not None \
+                    else _covariance(block[:, active], covariance)
+            start = None
+            if previous is not None and previous[active].sum() > 0:
+                start = previous[active] / previous[active].sum()
+            weights[active] = _solve(method, block[:, active], cov, periods_per_year, start=start, **params)
+        previous = weights
+        rows.append(weights)
+        dates.append(returns.index[t] if isinstance(returns, pd.DataFrame) else t)
+    columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+    return pd.DataFrame(rows, index=dates, columns=columns)
+
+
+def blend(returns, weights):
+    """
+    Per-bar returns of the blend held at `weights`: one weight vector (a
+    Series), or rolling_allocation's frame, where each row applies from its
+    date until the next. Bars before the first row are in cash.
+    """
+    if isinstance(weights, pd.Series):
+        return returns @ weights.reindex(returns.columns, fill_value=0.0)
+    held = weights.reindex(columns=returns.columns, fill_value=0.0).reindex(returns.index, method='ffill').fillna(0.0)
+    return (returns * held).sum(axis=1)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close')
+VOLUME_FIELDS = ('Volume',)
+
+# Adjustment modes: which events scale prices; volume only ever moves with splits
+ADJUST_MODES = ('all', 'splits', 'none')
+
+
+class CorporateActions:
+    """
+    Split and dividend events per symbol, and the backward adjustment
+    factors derived from them.
+
+    Bars before a split with ratio r (2.0 for a 2-for-1) get prices / r and
+    volume * r. Bars before a dividend D get prices * (1 - D / C), where C
+    is the raw close of the last bar before the ex-date. The factors are
+    cumulative products over all later events, computed once per symbol and
+    applied to the raw bars when they are read, so only the raw history and
+    one factor array per field kind are held in memory.
+
+    `split_adjusted=True` describes bars whose prices and volume already
+    include the splits, as yfinance returns them: the splits are kept as
+    events but add no factors, and dividends (which yfinance reports split-
+    adjusted too) are sized against the split-adjusted closes.
+    """
+    def __init__(self, split_adjusted=False):
+        self.split_adjusted = split_adjusted
+        self.splits = {}
+        self.dividends = {}
+        self._factors = {}
+
+    def add_split(self, symbol, date, ratio):
+        self.splits.setdefault(symbol, []).append((pd.Timestamp(date), float(ratio)))
+        self._factors.clear()
+
+    def add_dividend(self, symbol, date, amount):
+        self.dividends.setdefault(symbol, []).append((pd.Timestamp(date), float(amount)))
+        self._factors.clear()
+
+    @classmethod
+    def from_yfinance(cls, data, symbol, split_adjusted=True):
+        """
+        Reads the 'Stock Splits' and 'Dividends' columns that yfinance adds
+        when called with actions=True. yfinance split-adjusts prices and
+        volume even with auto_adjust=False, so by default the splits are
+        not applied again; pass split_adjusted=False for truly raw bars.
+        """
+        actions = cls(split_adjusted)
+        for field, add in (('Stock Splits', actions.add_split), ('Dividends', actions.add_dividend)):
+            column = _field(data, field, symbol)
+            if column is None:
+                continue
+            events = column[column.fillna(0) != 0]
+            for date, value in events.items():
+                add(symbol, date, value)
+        return actions
+
+    def factors(self, symbol, index, close, mode='all'):
+        """
+        Returns (price_factor, volume_factor) arrays aligned with `index`.
+        `close` holds the closes as stored (raw, or split-adjusted when
+        `split_adjusted`), needed to size dividend adjustments.
+        """
+        if mode not in ADJUST_MODES:
+            raise ValueError(f"Unknown adjustment mode '{mode}', expected one of {ADJUST_MODES}")
+        index = pd.DatetimeIndex(index)
+        key = (symbol, mode, len(index), index[0] if len(index) else None, index[-1] if len(index) else None)
+        cached = self._factors.get(key)
+        if cached is not None:
+            return cached
+
+        n = len(index)
+        price_steps = np.ones(n + 1)
+        volume_steps = np.ones(n + 1)
+        if mode != 'none' and not self.split_adjusted:
+            for date, ratio in self.splits.get(symbol, []):
+                pos = index.searchsorted(_align(date, index), side='left')
+                if 0 < pos <= n and ratio > 0:
+                    price_steps[pos] /= ratio
+                    volume_steps[pos] *= ratio
+        if mode == 'all':
+            close = np.asarray(close, dtype=np.float64).reshape(n, -1)[:, 0] if n else np.empty(0)
+            for date, amount in self.dividends.get(symbol, []):
+                pos = index.searchsorted(_align(date, index), side='left')
+                if 0 < pos <= n and close[pos - 1] > 0:
+                    price_steps[pos] *= 1.0 - amount / close[pos - 1]
+
+        # factor[i] = product of the steps of all events after bar i
+        price_factor = np.cumprod(price_steps[::-1])[::-1][1:]
+        volume_factor = np.cumprod(volume_steps[::-1])[::-1][1:]
+        self._factors[key] = (price_factor, volume_factor)
+        return price_factor, volume_factor
+
+
+def adjust_frame(bars, price_factor, volume_factor):
+    """
+    Returns a copy of `bars` with price columns scaled by `price_factor` and
+    volume columns by `volume_factor` (arrays aligned with the rows).
+    float32 columns stay float32; everything else is computed in float64.
+    """
+    bars = bars.copy()
+    for col in bars.columns:
+        field = col[0] if isinstance(col, tuple) else col
+        if field in PRICE_FIELDS or field in VOLUME_FIELDS:
+            dtype = np.float32 if bars[col].dtype == np.float32 else np.float64
+            factor = price_factor if field in PRICE_FIELDS else volume_factor
+            bars[col] = bars[col].to_numpy(dtype=dtype) * np.asarray(factor, dtype=dtype)
+    return bars
+
+
+def _field(data, field, symbol=None):
+    if isinstance(data.columns, pd.MultiIndex):
+        if field not in data.columns.get_level_values(0):
+            return None
+        column = data[field]
+        if isinstance(column, pd.DataFrame):
+            return column[symbol] if symbol in column.columns else column.iloc[:, 0]
+        return column
+    return data[field] if field in data.columns else None
+
+
+def _align(date, index):
+    # Event dates and bar timestamps may differ in timezone awareness
+    if index.tz is not None and date.tzinfo is None:
+        return date.tz_localize(index.tz)
+    if index.tz is None and date.tzinfo is not None:
+        return date.tz_convert(None)
+    return date
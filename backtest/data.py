@@ -1,5 +1,75 @@
+import copy
+
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
 from backtest.event import MarketEvent
+from backtest.corporate_actions import PRICE_FIELDS, VOLUME_FIELDS, adjust_frame
+from backtest.ingest import ingest
+from backtest.ledger import precision_dtype
+
+# Fields held by BarPanel, the matrix view strategies evaluate all symbols on
+PANEL_FIELDS = PRICE_FIELDS + VOLUME_FIELDS
+
+
+class BarPanel:
+    """
+    The bars of several symbols as one (bars, symbols) array per field,
+    the input of Strategy.signals_matrix. Rows are aligned from the end:
+    row `stop - 1` is every symbol's latest bar and `counts` is how many
+    real bars each symbol has up to the last row (shorter histories are
+    NaN-padded at the top), so column `symbol` of `bars(n)[field]` holds
+    what get_latest_bars(symbol, n) returns, below any padding.
+    """
+    def __init__(self, arrays, symbols, counts=None, stop=None):
+        self.arrays = arrays
+        self.symbols = list(symbols)
+        self.columns = pd.Index(self.symbols)
+        self.position = {s: j for j, s in enumerate(self.symbols)}
+        self.length = len(next(iter(arrays.values()))) if arrays else 0
+        self.stop = self.length if stop is None else stop
+        self.counts = np.full(len(self.symbols), self.length) if counts is None else np.asarray(counts)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def bars(self, n):
+        """
+        The last `n` rows of every field, as DataFrames built on first
+        access; NaN-padded at the top while fewer than `n` rows exist.
+        """
+        return _PanelWindow(self, self.stop - n, self.stop)
+
+    def has(self, n):
+        """Symbols with at least `n` bars, the strategies' len(bars) check."""
+        return self.counts - (self.length - self.stop) >= n
+
+    def upto(self, stop):
+        """The same panel as it was when row `stop - 1` was the latest."""
+        view = copy.copy(self)
+        view.stop = stop
+        return view
+
+
+class _PanelWindow(dict):
+    # {field: DataFrame} over rows start:stop, filled in as fields are read
+    def __init__(self, panel, start, stop):
+        super().__init__()
+        self.panel = panel
+        self.start = start
+        self.stop = stop
+
+    def __missing__(self, field):
+        values = self.panel.arrays[field]
+        if self.start >= 0:
+            values = values[self.start:self.stop]
+        else:
+            pad = np.full((-self.start, values.shape[1]), np.nan, dtype=values.dtype)
+            values = np.concatenate([pad, values[:self.stop]])
+        frame = pd.DataFrame(values, columns=self.panel.columns, copy=False)
+        self[field] = frame
+        return frame
+
 
 class DataHandler:
     def get_latest_bar(self, symbol):
@@ -8,45 +78,315 @@ class DataHandler:
         raise NotImplementedError("Should implement get_latest_bars()")
     def get_latest_bar_value(self, symbol, val_type):
         raise NotImplementedError("Should implement get_latest_bar_value()")
+    def get_latest_bar_datetime(self, symbol):
+        return self.get_latest_bar(symbol).index[0]
+    def get_latest_bar_values(self, val_type):
+        return [self.get_latest_bar_value(s, val_type) for s in self.symbol_list]
     def update_bars(self):
         raise NotImplementedError("Should implement update_bars()")
 
 class HistoricDataHandler(DataHandler):
-    def __init__(self, events, symbol_list, data):
+    def __init__(self, events, symbol_list, data, corporate_actions=None, adjust='all', precision='float64',
+                 gaps='ffill', align='inner'):
         self.events = events
         self.symbol_list = symbol_list
-        # Ensure the data index is datetime
-        data.index = pd.to_datetime(data.index)
-        self.symbol_data = {s: data for s in self.symbol_list}
-        self.latest_symbol_data = {s: pd.DataFrame() for s in self.symbol_list}
-        self.data_stream = self._create_data_stream()
+        # 'float32' halves the memory of the bars and adjustment factors;
+        # strategies then see float32 prices and indicators
+        self.precision = precision
+        self.dtype = precision_dtype(precision)
+        # Bars are normalized once here (see backtest.ingest): flat float
+        # columns, a sorted unique DatetimeIndex and a valid close on every
+        # bar, so nothing downstream re-checks types or NaN prices per bar.
+        # `data` may also be a multi-ticker yfinance frame or a
+        # {symbol: frame} dict, aligned on one index.
+        self.gaps = gaps
+        self.align = align
+        self.symbol_data = self._ingest(data)
+
+        # Split/dividend adjustment is applied to the raw bars as they are
+        # read, using one precomputed factor array per symbol and field kind
+        self.corporate_actions = corporate_actions
+        self.adjust = adjust
+        self.adjustments = {}
+        if corporate_actions is not None and adjust != 'none':
+            for s in self.symbol_list:
+                self.adjustments[s] = self._factors(s, self.symbol_data[s], corporate_actions, adjust)
+        # Number of bars released so far; the "latest" bars are a slice of
+        # the full history ending here, so nothing is copied per bar
+        self.bar_index = 0
         self.continue_backtest = True
+        # All symbols' adjusted bars as (bars, symbols) arrays, built on
+        # first use by get_latest_panel()
+        self._panel = None
 
-    def _create_data_stream(self):
-        # Assuming single symbol data for simplicity
-        return self.symbol_data[self.symbol_list[0]].iterrows()
+    def __getstate__(self):
+        # The panel is derived from symbol_data; snapshots rebuild it
+        state = self.__dict__.copy()
+        state['_panel'] = None
+        return state
+
+    def _ingest(self, data):
+        frames = ingest(data, self.symbol_list, self.gaps, self.align)
+        cast = {}
+        for frame in frames.values():
+            if id(frame) not in cast:
+                cast[id(frame)] = self._cast(frame)
+        return {s: cast[id(frame)] for s, frame in frames.items()}
+
+    def _cast(self, data):
+        if self.dtype == np.float64:
+            return data
+        fields = PRICE_FIELDS + VOLUME_FIELDS + ('Adj Close',)
+        columns = [c for c in data.columns if c in fields]
+        return data.astype({c: self.dtype for c in columns})
+
+    def _factors(self, symbol, frame, corporate_actions, adjust):
+        price_factor, volume_factor = corporate_actions.factors(symbol, frame.index, frame['Close'], adjust)
+        return price_factor.astype(self.dtype, copy=False), volume_factor.astype(self.dtype, copy=False)
 
     def update_bars(self):
-        try:
-            index, row = next(self.data_stream)
-            for s in self.symbol_list:
-                df_row = pd.DataFrame([row], index=[index])
-                # Use concat instead of append for performance and future compatibility
-                self.latest_symbol_data[s] = pd.concat([self.latest_symbol_data[s], df_row])
-            self.events.put(MarketEvent())
-        except StopIteration:
+        # Assuming single symbol data for simplicity
+        if self.bar_index >= len(self.symbol_data[self.symbol_list[0]]):
             self.continue_backtest = False
+            return
+        self.bar_index += 1
+        self.events.put(MarketEvent(self.symbol_data[self.symbol_list[0]].index[self.bar_index - 1]))
+
+    def _bars(self, symbol, start, stop):
+        bars = self.symbol_data[symbol].iloc[start:stop]
+        if symbol in self.adjustments:
+            price_factor, volume_factor = self.adjustments[symbol]
+            bars = adjust_frame(bars, price_factor[start:stop], volume_factor[start:stop])
+        return bars
 
     def get_latest_bar(self, symbol):
-        return self.latest_symbol_data[symbol].iloc[-1:]
+        return self._bars(symbol, max(0, self.bar_index - 1), self.bar_index)
 
     def get_latest_bars(self, symbol, N=1):
-        return self.latest_symbol_data[symbol].tail(N)
+        return self._bars(symbol, max(0, self.bar_index - N), self.bar_index)
+
+    def get_latest_bar_datetime(self, symbol):
+        if self.bar_index > 0:
+            return self.symbol_data[symbol].index[self.bar_index - 1]
+        return None
 
     def get_latest_bar_value(self, symbol, val_type):
         """
         Returns the latest value for a given bar component (e.g., 'Close').
         """
-        if len(self.latest_symbol_data[symbol]) > 0:
-            return self.latest_symbol_data[symbol][val_type].iloc[-1]
-        return None
\ No newline at end of file
+        if self.bar_index > 0:
+            if val_type in PANEL_FIELDS:
+                panel = self.panel()
+                return panel.arrays[val_type][self.bar_index - 1, panel.position[symbol]]
+            value = self.symbol_data[symbol][val_type].iloc[self.bar_index - 1]
+            if symbol in self.adjustments:
+                price_factor, volume_factor = self.adjustments[symbol]
+                if val_type in PRICE_FIELDS:
+                    value = value * price_factor[self.bar_index - 1]
+                elif val_type in VOLUME_FIELDS:
+                    value = value * volume_factor[self.bar_index - 1]
+            return value
+        return None
+
+    def get_latest_bar_values(self, val_type):
+        """The latest `val_type` value of every symbol, in symbol_list order."""
+        if self.bar_index == 0:
+            return [None] * len(self.symbol_list)
+        if val_type in PANEL_FIELDS:
+            return list(self.panel().arrays[val_type][self.bar_index - 1])
+        return super().get_latest_bar_values(val_type)
+
+    def panel(self):
+        """
+        The full adjusted history of all symbols as a BarPanel. Symbols are
+        on one index after ingestion, so the arrays are stacked once and
+        every bar is a view of them.
+        """
+        if self._panel is None:
+            arrays = {}
+            for field in PANEL_FIELDS:
+                columns = []
+                for s in self.symbol_list:
+                    column = self.symbol_data[s][field].to_numpy(dtype=self.dtype)
+                    if s in self.adjustments:
+                        price_factor, volume_factor = self.adjustments[s]
+                        column = column * (price_factor if field in PRICE_FIELDS else volume_factor)
+                    columns.append(column)
+                arrays[field] = np.column_stack(columns) if columns else np.empty((0, 0), dtype=self.dtype)
+            self._panel = BarPanel(arrays, self.symbol_list)
+        return self._panel
+
+    def get_latest_panel(self):
+        """BarPanel of the bars released so far, see Strategy.signals_matrix."""
+        return self.panel().upto(self.bar_index)
+
+    def append_data(self, data, corporate_actions=None, adjust=None):
+        """
+        Extends the history with bars after the current last bar (earlier
+        or duplicate timestamps are ignored) and lets the backtest continue.
+        `corporate_actions` and `adjust` replace the stored ones, e.g. with
+        events reported since the snapshot, and the factors are recomputed
+        from them. Adjustments must not change for bars already processed,
+        otherwise a resumed run would differ from a full rerun: ValueError
+        is raised and nothing is appended.
+        """
+        corporate_actions = self.corporate_actions if corporate_actions is None else corporate_actions
+        adjust = self.adjust if adjust is None else adjust
+        new_data = self._ingest(data)
+        symbol_data, extended = {}, {}
+        for s in self.symbol_list:
+            frame, new_bars = self.symbol_data[s], new_data[s]
+            key = (id(frame), id(new_bars))
+            if key not in extended:
+                new_bars = new_bars[new_bars.index > frame.index[-1]] if len(frame) else new_bars
+                extended[key] = pd.concat([frame, new_bars[frame.columns]])
+            symbol_data[s] = extended[key]
+
+        adjustments = {}
+        n = self.bar_index
+        for s in self.symbol_list:
+            if corporate_actions is not None and adjust != 'none':
+                adjustments[s] = self._factors(s, symbol_data[s], corporate_actions, adjust)
+            # Unadjusted symbols have unit factors
+            old = self.adjustments.get(s, (np.ones(n), np.ones(n)))
+            new = adjustments.get(s, (np.ones(n), np.ones(n)))
+            if not (np.array_equal(old[0][:n], new[0][:n]) and np.array_equal(old[1][:n], new[1][:n])):
+                raise ValueError(f"New corporate actions for {s} change adjustments of processed bars; "
+                                 "rerun the backtest from the start")
+        self.symbol_data = symbol_data
+        self.corporate_actions = corporate_actions
+        self.adjust = adjust
+        self.adjustments = adjustments
+        self._panel = None
+        self.continue_backtest = True
+
+    def adjusted_data(self, symbol):
+        """
+        The symbol's full history with adjustments applied, as one copy.
+        """
+        frame = self.symbol_data[symbol]
+        if symbol not in self.adjustments:
+            return frame
+        return adjust_frame(frame, *self.adjustments[symbol])
+
+
+# Column aggregation when building higher-timeframe bars; other columns keep
+# the last value of the period
+RESAMPLE_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last', 'Volume': 'sum'}
+
+
+def period_end_times(index, rule):
+    """
+    Exclusive end time of the `rule` period that each timestamp falls in.
+    Fixed frequencies ('30min', '4h') use floor(); calendar frequencies
+    ('W-FRI', 'ME', 'QE') use periods, so a week or month ends on the
+    calendar boundary whether or not there was a bar on its last day.
+    """
+    offset = to_offset(rule)
+    if isinstance(offset, pd.offsets.Tick):
+        return index.floor(offset) + offset
+    code = offset.rule_code
+    # Periods use 'M', 'Q', 'Y' where offsets use 'ME', 'QE', 'YE'
+    for suffix in ('ME', 'QE', 'YE'):
+        if code.startswith(suffix):
+            code = suffix[0] + code[2:]
+    periods = index.tz_localize(None).to_period(code) if index.tz is not None else index.to_period(code)
+    ends = periods.end_time + pd.Timedelta(1, 'ns')
+    return ends.tz_localize(index.tz) if index.tz is not None else ends
+
+
+def resample_bars(data, rule, bar_duration=None):
+    """
+    Builds `rule` bars from `data` in one vectorized groupby and, for each
+    base bar, how many of them are complete once that base bar has closed.
+
+    A higher-timeframe bar is complete when the base bar's end (timestamp +
+    bar_duration) reaches the end of its period; e.g. a W-FRI week becomes
+    visible on Friday's daily bar, but only on the following Monday if that
+    Friday was a holiday. Returns (bars indexed by the timestamp of their
+    last base bar, int array of visible bar counts per base bar).
+    """
+    index = data.index
+    if bar_duration is None:
+        gaps = np.diff(index.asi8)
+        gaps = gaps[gaps > 0]
+        bar_duration = pd.Timedelta(int(gaps.min()), 'ns') if len(gaps) else pd.Timedelta(1, 'D')
+
+    ends = period_end_times(index, rule)
+    key = pd.Index(ends, name=None)
+    agg = {}
+    for col in data.columns:
+        field = col[0] if isinstance(col, tuple) else col
+        agg[col] = RESAMPLE_AGGREGATION.get(field, 'last')
+    bars = data.groupby(key.values, sort=True).agg(agg)
+    last_bar = pd.Series(index, index=key.values).groupby(level=0, sort=True).max()
+    period_ends = bars.index.values
+    bars.index = pd.DatetimeIndex(last_bar.values, name=index.name)
+
+    visible = np.searchsorted(period_ends, (index + pd.Timedelta(bar_duration)).values, side='right')
+    return bars, visible.astype(np.int64)
+
+
+class MultiTimeframeDataHandler(HistoricDataHandler):
+    """
+    HistoricDataHandler that also serves higher-timeframe bars, e.g.
+
+        handler = MultiTimeframeDataHandler(events, ['AAPL'], data, timeframes=['W-FRI', 'ME'])
+        weekly = handler.get_latest_bars('AAPL', 10, timeframe='W-FRI')
+
+    All timeframes are resampled once up front. Only bars whose period has
+    completed at the current base bar are visible, and each lookup is a
+    slice at a precomputed position.
+    """
+    def __init__(self, events, symbol_list, data, timeframes=('W-FRI',), bar_duration=None,
+                 corporate_actions=None, adjust='all', precision='float64', gaps='ffill', align='inner'):
+        super().__init__(events, symbol_list, data, corporate_actions, adjust, precision, gaps, align)
+        self.timeframes = list(timeframes)
+        self.bar_duration = bar_duration
+        self._build_timeframes()
+
+    def _build_timeframes(self):
+        self.timeframe_data = {}
+        self.timeframe_visible = {}
+        built = {}
+        for s in self.symbol_list:
+            # Symbols sharing one unadjusted frame share the resampled bars
+            # too. Adjusted symbols are resampled from adjusted prices, so a
+            # split inside a week does not mix pre- and post-split prices.
+            key = (id(self.symbol_data[s]), s if s in self.adjustments else None)
+            if key not in built:
+                frame = self.adjusted_data(s)
+                built[key] = {tf: resample_bars(frame, tf, self.bar_duration) for tf in self.timeframes}
+            self.timeframe_data[s] = {tf: bars for tf, (bars, _) in built[key].items()}
+            self.timeframe_visible[s] = {tf: visible for tf, (_, visible) in built[key].items()}
+
+    def append_data(self, data, corporate_actions=None, adjust=None):
+        super().append_data(data, corporate_actions, adjust)
+        # Completion is decided by calendar, so bars already seen keep the
+        # same visible counts after rebuilding
+        self._build_timeframes()
+
+    def _visible(self, symbol, timeframe):
+        if self.bar_index == 0:
+            return 0
+        return int(self.timeframe_visible[symbol][timeframe][self.bar_index - 1])
+
+    def get_latest_bar(self, symbol, timeframe=None):
+        if timeframe is None:
+            return super().get_latest_bar(symbol)
+        k = self._visible(symbol, timeframe)
+        return self.timeframe_data[symbol][timeframe].iloc[max(0, k - 1):k]
+
+    def get_latest_bars(self, symbol, N=1, timeframe=None):
+        if timeframe is None:
+            return super().get_latest_bars(symbol, N)
+        k = self._visible(symbol, timeframe)
+        return self.timeframe_data[symbol][timeframe].iloc[max(0, k - N):k]
+
+    def get_latest_bar_value(self, symbol, val_type, timeframe=None):
+        if timeframe is None:
+            return super().get_latest_bar_value(symbol, val_type)
+        k = self._visible(symbol, timeframe)
+        if k > 0:
+            return self.timeframe_data[symbol][timeframe][val_type].iloc[k - 1]
+        return None
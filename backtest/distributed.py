@@ -0,0 +1,336 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+
+import pandas as pd
+
+
+class Broker:
+    """
+    Task queue shared by a coordinator and any number of workers. A task is
+    leased to one worker at a time; if the worker dies the lease expires and
+    another worker picks the task up, until max_attempts is reached.
+    """
+    def submit(self, job_id, payloads, max_attempts=3):
+        raise NotImplementedError("Should implement submit()")
+
+    def claim(self, worker_id, lease_seconds):
+        """Returns (task_id, job_id, payload) or None when nothing is available."""
+        raise NotImplementedError("Should implement claim()")
+
+    def renew(self, task_id, worker_id, lease_seconds):
+        raise NotImplementedError("Should implement renew()")
+
+    def complete(self, task_id, worker_id, result):
+        raise NotImplementedError("Should implement complete()")
+
+    def fail(self, task_id, worker_id, error):
+        raise NotImplementedError("Should implement fail()")
+
+    def status(self, job_id):
+        """Returns a dict of task counts by state."""
+        raise NotImplementedError("Should implement status()")
+
+    def results(self, job_id):
+        """Returns the list of results stored for a job."""
+        raise NotImplementedError("Should implement results()")
+
+
+class SQLiteBroker(Broker):
+    """
+    Broker and result store in one SQLite file, usable by processes on one
+    machine or on nodes sharing a filesystem that supports SQLite locking.
+    """
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    worker TEXT,
+                    lease_until REAL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until);
+                CREATE TABLE IF NOT EXISTS results (
+                    task_id TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    result TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_job ON results (job_id);
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=60000")
+        return _Transaction(conn)
+
+    def submit(self, job_id, payloads, max_attempts=3):
+        rows = [(f"{job_id}:{i}", job_id, json.dumps(p), max_attempts) for i, p in enumerate(payloads)]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO tasks (task_id, job_id, payload, max_attempts) VALUES (?, ?, ?, ?)", rows)
+        return [r[0] for r in rows]
+
+    def claim(self, worker_id, lease_seconds):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Leases of dead workers that used up their attempts are final
+            conn.execute("""UPDATE tasks SET state = 'failed', error = COALESCE(error, 'lease expired')
+                            WHERE state = 'running' AND lease_until < ? AND attempts >= max_attempts""", (now,))
+            row = conn.execute("""SELECT task_id, job_id, payload FROM tasks
+                                  WHERE state = 'pending' OR (state = 'running' AND lease_until < ?)
+                                  ORDER BY rowid LIMIT 1""", (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""UPDATE tasks SET state = 'running', attempts = attempts + 1, worker = ?, lease_until = ?
+                            WHERE task_id = ?""", (worker_id, now + lease_seconds, row[0]))
+        return row[0], row[1], json.loads(row[2])
+
+    def renew(self, task_id, worker_id, lease_seconds):
+        with self._connect() as conn:
+            cur = conn.execute("UPDATE tasks SET lease_until = ? WHERE task_id = ? AND worker = ? AND state = 'running'",
+                               (time.time() + lease_seconds, task_id, worker_id))
+            return cur.rowcount == 1
+
+    def complete(self, task_id, worker_id, result):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job_id = conn.execute("SELECT job_id FROM tasks WHERE task_id = ?", (task_id,)).fetchone()[0]
+            # The first completion wins if an expired lease was picked up twice
+            conn.execute("INSERT OR IGNORE INTO results (task_id, job_id, result) VALUES (?, ?, ?)",
+                         (task_id, job_id, json.dumps(result)))
+            conn.execute("UPDATE tasks SET state = 'done', lease_until = NULL WHERE task_id = ?", (task_id,))
+
+    def fail(self, task_id, worker_id, error):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""UPDATE tasks SET error = ?, lease_until = NULL,
+                                state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END
+                            WHERE task_id = ? AND worker = ? AND state = 'running'""", (error, task_id, worker_id))
+
+    def status(self, job_id):
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        with self._connect() as conn:
+            for state, n in conn.execute("SELECT state, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY state", (job_id,)):
+                counts[state] = n
+        return counts
+
+    def errors(self, job_id):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT task_id, error FROM tasks WHERE job_id = ? AND state = 'failed'", (job_id,)))
+
+    def results(self, job_id):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT result FROM results WHERE job_id = ? ORDER BY task_id", (job_id,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+class _Transaction:
+    # sqlite3 connections in autocommit mode: commit an explicit BEGIN on
+    # success, roll back on error, and always close.
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+def load_local_data(data_dir, ticker, start_date=None, end_date=None):
+    """
+    Reads `<data_dir>/<ticker>.parquet` or `.csv` (a Date index plus OHLCV
+    columns), the stand-in for a shared data store.
+    """
+    parquet = os.path.join(data_dir, f"{ticker}.parquet")
+    if os.path.exists(parquet):
+        data = pd.read_parquet(parquet)
+    else:
+        data = pd.read_csv(os.path.join(data_dir, f"{ticker}.csv"), index_col=0, parse_dates=True)
+    data.index = pd.to_datetime(data.index)
+    return data.loc[start_date:end_date]
+
+
+class Coordinator:
+    """
+    Splits a ticker x strategy sweep into tasks. Each task holds up to
+    `chunk_size` strategies for a single ticker, so a worker loads each
+    ticker's data once per task.
+    """
+    def __init__(self, broker):
+        self.broker = broker
+
+    def submit_sweep(self, tickers, strategies, start_date, end_date, initial_capital=100000.0,
+                     position_size=0.02, chunk_size=5, max_attempts=3):
+        """
+        `strategies` holds registry names or (name, params) pairs.
+        Returns the job id.
+        """
+        from backtest.registry import default_registry
+        registry = default_registry()
+        entries = [(s, None) if isinstance(s, str) else (s[0], s[1]) for s in strategies]
+        unknown = [name for name, _ in entries if name not in registry]
+        if unknown:
+            raise KeyError(f"Unknown strategies: {', '.join(unknown)}")
+        payloads = []
+        for ticker in tickers:
+            for i in range(0, len(entries), chunk_size):
+                payloads.append({
+                    'ticker': ticker,
+                    'start_date': str(start_date),
+                    'end_date': str(end_date),
+                    'initial_capital': initial_capital,
+                    'position_size': position_size,
+                    'strategies': entries[i:i + chunk_size],
+                })
+        job_id = uuid.uuid4().hex
+        self.broker.submit(job_id, payloads, max_attempts)
+        return job_id
+
+    def wait(self, job_id, timeout=None, poll_interval=0.5):
+        """Blocks until no task is pending or running; returns the status."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            status = self.broker.status(job_id)
+            if status['pending'] == 0 and status['running'] == 0:
+                return status
+            if deadline is not None and time.time() > deadline:
+                raise TimeoutError(f"Job {job_id} not finished: {status}")
+            time.sleep(poll_interval)
+
+    def collect(self, job_id):
+        """One row per (ticker, strategy) with its performance metrics."""
+        rows = []
+        for task_result in self.broker.results(job_id):
+            for record in task_result:
+                row = {'ticker': record['ticker'], 'strategy': record['name'], 'params': record['params']}
+                row.update(record['performance'])
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+
+class Worker:
+    """
+    Claims tasks from the broker and runs them until the queue is empty
+    (or forever with `idle_exit=False`). Market data is cached per process.
+    """
+    def __init__(self, broker, worker_id=None, data_dir=None, lease_seconds=300, poll_interval=1.0):
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.data_dir = data_dir
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._data = {}
+
+    def _load(self, ticker, start_date, end_date):
+        key = (ticker, start_date, end_date)
+        if key not in self._data:
+            if self.data_dir is not None:
+                self._data[key] = load_local_data(self.data_dir, ticker, start_date, end_date)
+            else:
+                from backtest.runner import load_stock_data
+                self._data[key] = load_stock_data(ticker, start_date, end_date)
+        return self._data[key]
+
+    def run_task(self, task_id, payload):
+        from backtest.registry import default_registry
+        from backtest.runner import run_strategy
+
+        registry = default_registry()
+        data = self._load(payload['ticker'], payload['start_date'], payload['end_date'])
+        if data is None or data.empty:
+            raise ValueError(f"No data for {payload['ticker']}")
+
+        records = []
+        for name, params in payload['strategies']:
+            spec = registry[name]
+            result = run_strategy(spec, data.copy(), payload['ticker'], payload['start_date'],
+                                  payload['initial_capital'], payload['position_size'], params, metrics_only=True)
+            records.append({
+                'ticker': payload['ticker'],
+                'name': name,
+                'params': spec.params if params is None else params,
+                # NumPy scalars are not JSON serializable
+                'performance': {k: (v.item() if hasattr(v, 'item') else v) for k, v in result['performance'].items()},
+            })
+            # Long chunks keep their lease alive between strategies
+            self.broker.renew(task_id, self.worker_id, self.lease_seconds)
+        return records
+
+    def run(self, max_tasks=None, idle_exit=True):
+        done = 0
+        while max_tasks is None or done < max_tasks:
+            claimed = self.broker.claim(self.worker_id, self.lease_seconds)
+            if claimed is None:
+                if idle_exit:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            task_id, _, payload = claimed
+            try:
+                result = self.run_task(task_id, payload)
+            except Exception:
+                self.broker.fail(task_id, self.worker_id, traceback.format_exc(limit=5))
+            else:
+                self.broker.complete(task_id, self.worker_id, result)
+            done += 1
+        return done
+
+
+def start_local_workers(db_path, n_workers, data_dir=None, lease_seconds=300):
+    """
+    Starts `n_workers` worker processes on this machine against `db_path`.
+    Returns the Popen handles; workers exit when the queue is empty.
+    """
+    # Workers run from the repository root, so relative paths are resolved here
+    cmd = [sys.executable, '-m', 'backtest.distributed', 'worker', '--db', os.path.abspath(db_path),
+           '--lease', str(lease_seconds)]
+    if data_dir is not None:
+        cmd += ['--data-dir', os.path.abspath(data_dir)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return [subprocess.Popen(cmd, cwd=root) for _ in range(n_workers)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed backtest worker / job status")
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help="claim and run tasks")
+    worker.add_argument('--db', required=True)
+    worker.add_argument('--data-dir')
+    worker.add_argument('--lease', type=float, default=300)
+    worker.add_argument('--max-tasks', type=int)
+    worker.add_argument('--wait', action='store_true', help="keep polling when the queue is empty")
+    status = sub.add_parser('status', help="show task counts for a job")
+    status.add_argument('--db', required=True)
+    status.add_argument('job_id')
+    args = parser.parse_args(argv)
+
+    broker = SQLiteBroker(args.db)
+    if args.command == 'worker':
+        Worker(broker, data_dir=args.data_dir, lease_seconds=args.lease).run(args.max_tasks, idle_exit=not args.wait)
+    else:
+        print(json.dumps(broker.status(args.job_id)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,29 @@
-from queue import Empty # <--- THIS LINE IS ADDED
+import pickle
+from queue import Empty, Queue # <--- THIS LINE IS ADDED
+from backtest import trace
 from backtest.event import FillEvent, OrderEvent
+from backtest.ledger import TradeLedger
+
+# Signal/order/fill records for inspection, e.g.
+#   trace.configure(level='DEBUG'); ...; trace.get_tracer().to_frame('backtest.engine')
+_signal = trace.site('backtest.engine.signal', "SIGNAL {} {} {} strength={}")
+_order = trace.site('backtest.engine.order', "ORDER {} {} {} {}")
+_fill = trace.site('backtest.engine.fill', "FILL {} {} {} {} cost={:.2f} commission={:.2f}")
+_timer = trace.site('backtest.engine.timer', "TIMER {} {}")
 
 class Backtest:
-    def __init__(self, data_handler, strategy, portfolio, execution_handler):
+    def __init__(self, data_handler, strategy, portfolio, execution_handler, matrix=False):
         self.data_handler = data_handler
         self.strategy = strategy
+        # Evaluate all symbols per bar with the strategy's signals_matrix
+        # (Strategy.calculate_signals_matrix) when it has one
+        self.matrix = matrix and strategy.supports_matrix() and hasattr(data_handler, 'get_latest_panel')
         self.portfolio = portfolio
         self.execution_handler = execution_handler
         self.events = data_handler.events
-        self.trade_log = []
+        self.trade_log = TradeLedger()
+        # Metrics-only runs (Portfolio(metrics_only=True)) keep no trade log either
+        self.metrics_only = getattr(portfolio, 'metrics_only', False)
 
     def _run_backtest(self):
         while True:
@@ -23,17 +38,90 @@ class Backtest:
                     break
                 else:
                     if event.type == 'MARKET':
-                        self.strategy.calculate_signals(event)
+                        # Resting orders trade against the new bar before strategies react to it
+                        self.execution_handler.on_bar(event)
+                        if self.matrix:
+                            self.strategy.calculate_signals_matrix(event)
+                        else:
+                            self.strategy.calculate_signals(event)
                         self.portfolio.update_timeindex(event)
                     elif event.type == 'SIGNAL':
+                        if _signal.enabled:
+                            _signal(event.datetime, event.symbol, event.signal_type, event.strength)
                         self.portfolio.update_signal(event)
                     elif event.type == 'ORDER':
+                        if _order.enabled:
+                            _order(event.symbol, event.order_type, event.quantity, event.direction)
                         self.execution_handler.execute_order(event)
                     elif event.type == 'FILL':
+                        if _fill.enabled:
+                            _fill(event.timeindex, event.symbol, event.direction, event.quantity, event.fill_cost,
+                                  event.commission)
                         self.portfolio.update_fill(event)
-                        self.trade_log.append(vars(event))
+                        if not self.metrics_only:
+                            self.trade_log.append(event)
+                    elif event.type == 'TIMER':
+                        # Scheduled work from backtest.scheduler.EventScheduler.add_timer
+                        if _timer.enabled:
+                            _timer(event.datetime, event.name)
+                        if event.callback is not None:
+                            event.callback(event)
 
     def simulate_trading(self):
+        """
+        Runs the remaining bars and returns (equity_curve, trade_log). A
+        metrics-only run returns (None, an empty log); its results are in
+        portfolio.metrics.
+        """
         self._run_backtest()
-        self.portfolio.create_equity_curve_dataframe()
-        return self.portfolio.equity_curve, self.trade_log
\ No newline at end of file
+        if not self.metrics_only:
+            self.portfolio.create_equity_curve_dataframe()
+        return self.portfolio.equity_curve, self.trade_log
+
+    def save_snapshot(self, path):
+        """
+        Writes the complete state of the run (data handler position, strategy
+        state, portfolio, resting orders, trade log) to `path`. A Queue is
+        empty between bars and is recreated on load; an EventScheduler is
+        saved with its delayed events and timers.
+        """
+        with open(path, 'wb') as f:
+            _SnapshotPickler(f, self.events if isinstance(self.events, Queue) else None).dump(self)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        with open(path, 'rb') as f:
+            return _SnapshotUnpickler(f, Queue()).load()
+
+    def resume(self, new_data, corporate_actions=None, adjust=None):
+        """
+        Appends bars that follow the snapshot and runs only those. The
+        result is identical to a full rerun over the combined history.
+        `corporate_actions` and `adjust` replace the snapshot's (see
+        HistoricDataHandler.append_data), so events since the snapshot are
+        applied; they must not re-adjust bars already processed.
+        """
+        self.data_handler.append_data(new_data, corporate_actions, adjust)
+        return self.simulate_trading()
+
+
+class _SnapshotPickler(pickle.Pickler):
+    # Every component holds the same event queue, which cannot be pickled
+    # (it owns locks); store a reference and hand out a new queue on load.
+    def __init__(self, f, events):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._events = events
+
+    def persistent_id(self, obj):
+        return 'events' if self._events is not None and obj is self._events else None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, f, events):
+        super().__init__(f)
+        self._events = events
+
+    def persistent_load(self, pid):
+        if pid == 'events':
+            return self._events
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
\ No newline at end of file
@@ -0,0 +1,223 @@
+import itertools
+import json
+import queue
+
+import numpy as np
+import pandas as pd
+
+from backtest.data import HistoricDataHandler
+from backtest.event import SignalEvent
+from backtest.strategy import Strategy
+
+COMBINE_RULES = ('and', 'or', 'majority', 'weighted')
+
+
+def _resolve(component):
+    """
+    Component entries are registry names, (name, params) pairs or
+    {"name": ..., "params": {...}} dicts. Returns (label, class, params).
+    """
+    from backtest.registry import default_registry
+
+    if isinstance(component, str):
+        name, params = component, None
+    elif isinstance(component, dict):
+        name, params = component['name'], component.get('params')
+    else:
+        name, params = component
+    spec = default_registry()[name]
+    label = name if params is None else f"{name} {json.dumps(params, sort_keys=True)}"
+    merged = spec.params
+    merged.update(params or {})
+    return label, spec.load(), merged
+
+
+class _Component:
+    # A strategy run on its own queue. Its signals only update the desired
+    # position (1 after LONG, 0 after EXIT) and never reach the portfolio.
+    def __init__(self, data_handler, strategy_class, params):
+        self.events = queue.Queue()
+        self.strategy = strategy_class(data_handler, self.events, **params)
+        self.state = {s: 0 for s in data_handler.symbol_list}
+
+    def on_bar(self, event):
+        self.strategy.calculate_signals(event)
+        while True:
+            try:
+                signal = self.events.get(False)
+            except queue.Empty:
+                break
+            if signal.type == 'SIGNAL':
+                self.state[signal.symbol] = 1 if signal.signal_type == 'LONG' else 0
+
+
+def capture_signals(data, ticker, components, corporate_actions=None, adjust='all'):
+    """
+    Runs every component's event loop once over `data` and returns the
+    position it wants after each bar: a DataFrame of 0/1 with one column per
+    component, indexed like `data`. All components share one data handler
+    and one pass over the bars.
+    """
+    events = queue.Queue()
+    data_handler = HistoricDataHandler(events, [ticker], data, corporate_actions, adjust)
+    resolved = [_resolve(c) for c in components]
+    runners = [_Component(data_handler, cls, params) for _, cls, params in resolved]
+
+    index = data_handler.symbol_data[ticker].index
+    states = np.zeros((len(index), len(runners)), dtype=np.int8)
+    while True:
+        data_handler.update_bars()
+        if not data_handler.continue_backtest:
+            break
+        event = events.get(False)
+        row = data_handler.bar_index - 1
+        for j, runner in enumerate(runners):
+            runner.on_bar(event)
+            states[row, j] = runner.state[ticker]
+    return pd.DataFrame(states, index=index, columns=[label for label, _, _ in resolved])
+
+
+def _rule_matrix(n_components, combos, rule, weights=None):
+    # Column k of the returned (n_components x n_combos) matrix holds the
+    # weights of combination k, normalised to sum to one, so that S @ W is
+    # the (weighted) fraction of members that are long on each bar.
+    if rule not in COMBINE_RULES:
+        raise ValueError(f"Unknown combine rule '{rule}', expected one of {COMBINE_RULES}")
+    weights = np.ones(n_components) if weights is None or rule != 'weighted' else np.asarray(weights, dtype=np.float64)
+    matrix = np.zeros((n_components, len(combos)))
+    for k, members in enumerate(combos):
+        members = list(members)
+        matrix[members, k] = weights[members]
+    totals = matrix.sum(axis=0)
+    return matrix / np.where(totals > 0, totals, 1.0)
+
+
+def _apply_rule(fraction, rule, threshold=None):
+    # Tolerances absorb rounding in the normalised weights
+    if rule == 'and':
+        return fraction >= 1.0 - 1e-9
+    if rule == 'or':
+        return fraction > 1e-9
+    if rule == 'majority':
+        return fraction > 0.5 + 1e-9
+    return fraction >= (0.5 if threshold is None else threshold) - 1e-9
+
+
+def combination_states(states, combos, rule='and', weights=None, threshold=None):
+    """
+    Combined 0/1 positions for many combinations at once.
+
+    `states` is the output of `capture_signals`; `combos` lists combinations
+    as tuples of column positions or names. 'and' is long when every member
+    is, 'or' when any is, 'majority' when more than half are and 'weighted'
+    when the weight share of long members reaches `threshold` (default 0.5).
+    `weights` holds one weight per column of `states`, or a {column: weight}
+    dict (missing columns weigh 1). Returns an (n_bars x n_combos) int8
+    array computed with one matrix product, so no component is re-run.
+    """
+    columns = list(states.columns)
+    if isinstance(weights, dict):
+        weights = [weights.get(c, 1.0) for c in columns]
+    combos = [tuple(columns.index(m) if not isinstance(m, (int, np.integer)) else m for m in c) for c in combos]
+    matrix = _rule_matrix(len(columns), combos, rule, weights)
+    fraction = states.to_numpy(dtype=np.float64) @ matrix
+    return _apply_rule(fraction, rule, threshold).astype(np.int8)
+
+
+def combine(states, members=None, rule='and', weights=None, threshold=None):
+    """
+    Combined position of one combination (all columns by default) as a
+    Series aligned with `states`. `weights` follow the order of `members`.
+    """
+    members = tuple(states.columns) if members is None else tuple(members)
+    if weights is not None and not isinstance(weights, dict):
+        weights = {states.columns[m] if isinstance(m, (int, np.integer)) else m: w for m, w in zip(members, weights)}
+    combined = combination_states(states, [members], rule, weights, threshold)[:, 0]
+    return pd.Series(combined, index=states.index, name=f"{rule}({', '.join(map(str, members))})")
+
+
+def all_combinations(states, min_size=2, max_size=3):
+    """Every subset of the captured components with min_size..max_size members."""
+    n = states.shape[1]
+    return [c for k in range(min_size, min(max_size, n) + 1) for c in itertools.combinations(range(n), k)]
+
+
+def score_combinations(states, close, combos, rule='and', weights=None, threshold=None, chunk_size=4096):
+    """
+    Screens combinations with a vectorized long/flat simulation on `close`.
+
+    A position decided on bar t's close earns the close-to-close return of
+    bar t + 1, which mirrors the engine filling signals at the close. The
+    whole position is in the symbol, so the figures rank combinations; run
+    the chosen ones through EnsembleStrategy for sized, exact results.
+    Returns one row per combination sorted by Sharpe ratio.
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(len(states), -1)[:, 0]
+    returns = np.zeros_like(close)
+    returns[1:] = np.where(close[:-1] > 0, close[1:] / np.where(close[:-1] > 0, close[:-1], 1.0) - 1.0, 0.0)
+    returns = np.nan_to_num(returns)
+    columns = list(states.columns)
+
+    rows = []
+    for start in range(0, len(combos), chunk_size):
+        chunk = combos[start:start + chunk_size]
+        positions = combination_states(states, chunk, rule, weights, threshold).astype(np.float64)
+        strat = np.zeros_like(positions)
+        strat[1:] = positions[:-1] * returns[1:, None]
+
+        equity = np.cumprod(1.0 + strat, axis=0)
+        peak = np.maximum.accumulate(equity, axis=0)
+        std = strat.std(axis=0, ddof=1) if len(strat) > 1 else np.zeros(len(chunk))
+        sharpe = np.where(std > 0, np.sqrt(252) * strat.mean(axis=0) / np.where(std > 0, std, 1.0), 0.0)
+        entries = (np.diff(positions, axis=0, prepend=0.0) > 0).sum(axis=0)
+
+        for k, members in enumerate(chunk):
+            rows.append({
+                'members': tuple(columns[m] if isinstance(m, (int, np.integer)) else m for m in members),
+                'Total Return': (equity[-1, k] - 1.0) * 100,
+                'Max Drawdown': (equity[:, k] / peak[:, k] - 1.0).min() * 100,
+                'Sharpe Ratio': sharpe[k],
+                'Total Trades': int(entries[k]),
+                'Exposure': positions[:, k].mean() * 100,
+            })
+    return pd.DataFrame(rows).sort_values('Sharpe Ratio', ascending=False, ignore_index=True)
+
+
+class EnsembleStrategy(Strategy):
+    """
+    Runs several registry strategies as one. Each component keeps its own
+    state and signals on a private queue; the ensemble goes long when the
+    combined position (see `combination_states` for the rules) turns on and
+    exits when it turns off. Its signals match the combined series from
+    `capture_signals` + `combine` bar for bar.
+
+    `components` takes registry names, (name, params) pairs or dicts, so an
+    ensemble can itself be registered with plain JSON parameters.
+    """
+    def __init__(self, data_handler, events, components=(), rule='and', weights=None, threshold=None):
+        self.data_handler = data_handler
+        self.events = events
+        self.symbol_list = self.data_handler.symbol_list
+        resolved = [_resolve(c) for c in components]
+        if not resolved:
+            raise ValueError("EnsembleStrategy needs at least one component")
+        self.runners = [_Component(data_handler, cls, params) for _, cls, params in resolved]
+        self.rule = rule
+        self.threshold = threshold
+        self.matrix = _rule_matrix(len(resolved), [tuple(range(len(resolved)))], rule, weights)[:, 0]
+        self.bought = {s: False for s in self.symbol_list}
+
+    def calculate_signals(self, event):
+        if event.type == 'MARKET':
+            for runner in self.runners:
+                runner.on_bar(event)
+            for s in self.symbol_list:
+                fraction = np.array([runner.state[s] for runner in self.runners], dtype=np.float64) @ self.matrix
+                long = bool(_apply_rule(fraction, self.rule, self.threshold))
+                if long != self.bought[s]:
+                    dt = self.data_handler.get_latest_bar_datetime(s)
+                    # Entries carry the (weighted) share of agreeing
+                    # components as their strength, for strength-scaled sizing
+                    strength = float(fraction) if long else 1.0
+                    self.events.put(SignalEvent(self.__class__.__name__, s, dt, 'LONG' if long else 'EXIT', strength))
+                    self.bought[s] = long
@@ -0,0 +1,489 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import queue
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest.corporate_actions import CorporateActions
+
+
+class Tolerance:
+    """
+    Float tolerances for the comparison. Quantities, timestamps and
+    directions must always match exactly; prices, costs, positions and
+    equity are compared with np.isclose(rtol, atol).
+    """
+    def __init__(self, rtol=1e-9, atol=1e-6):
+        self.rtol = rtol
+        self.atol = atol
+
+    def close(self, a, b):
+        return np.isclose(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64),
+                          rtol=self.rtol, atol=self.atol, equal_nan=True)
+
+
+class NotApplicable(Exception):
+    """Raised by a candidate path that does not support a case; reported as skipped."""
+
+
+class RunResult:
+    """What a path has to produce: equity curve, trade log and positions per bar."""
+    def __init__(self, equity_curve, trade_log, positions):
+        self.equity_curve = equity_curve
+        self.trade_log = trade_log
+        self.positions = positions
+
+    @classmethod
+    def from_backtest(cls, backtest):
+        rows = backtest.portfolio.all_positions
+        positions = (rows.to_frame() if hasattr(rows, 'to_frame') else pd.DataFrame(rows)).set_index('datetime')
+        return cls(backtest.portfolio.equity_curve, backtest.trade_log, positions)
+
+
+# ---------------------------------------------------------------------------
+# Datasets
+
+def synthetic_bars(n_bars=750, seed=0, drift=0.0003, volatility=0.015, reversion=0.0, start='2015-01-01',
+                   gaps=0.0, flat_from=None):
+    """
+    Deterministic OHLCV bars on business days. `reversion` pulls the log
+    price back to its start, `gaps` drops that fraction of days (holidays,
+    halts) and `flat_from` freezes the price from that bar on.
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(drift, volatility, n_bars)
+    log_price = np.empty(n_bars)
+    level = 0.0
+    for i in range(n_bars):
+        level += shocks[i] - reversion * level
+        log_price[i] = level
+    close = 100.0 * np.exp(log_price)
+    if flat_from is not None:
+        close[flat_from:] = close[flat_from]
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, volatility / 4, n_bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 3, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 3, n_bars)))
+    volume = rng.integers(100_000, 5_000_000, n_bars).astype(np.float64)
+    if flat_from is not None:
+        open_[flat_from:] = high[flat_from:] = low[flat_from:] = close[flat_from]
+    index = pd.bdate_range(start, periods=n_bars, name='Date')
+    data = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Adj Close': close,
+                         'Volume': volume}, index=index)
+    if gaps:
+        data = data[rng.random(n_bars) >= gaps]
+    return data
+
+
+def _as_yfinance(data, ticker):
+    # yfinance returns (Price, Ticker) column levels even for one ticker
+    data = data.copy()
+    data.columns = pd.MultiIndex.from_product([data.columns, [ticker]], names=['Price', 'Ticker'])
+    return data
+
+
+def _add_actions(data, split):
+    # Quarterly dividends and a 2-for-1 split at row `split`, in the
+    # 'Dividends' / 'Stock Splits' columns of yfinance's actions=True
+    data['Dividends'] = 0.0
+    data.iloc[::63, data.columns.get_loc('Dividends')] = 0.5
+    data.iloc[0, data.columns.get_loc('Dividends')] = 0.0
+    data['Stock Splits'] = 0.0
+    data.iloc[split, data.columns.get_loc('Stock Splits')] = 2.0
+    return data
+
+
+def _with_actions(data, ticker):
+    # Truly raw prices: they halve after the split two thirds in
+    data = data.copy()
+    split = 2 * len(data) // 3
+    data.iloc[split:, :4] = data.iloc[split:, :4].to_numpy() / 2.0
+    data.iloc[split:, 5] = data.iloc[split:, 5].to_numpy() * 2.0
+    data = _add_actions(data, split)
+    return data, CorporateActions.from_yfinance(data, ticker, split_adjusted=False)
+
+
+def _yfinance_with_actions(data, ticker):
+    # As yfinance returns them: prices and volume already split-adjusted (no
+    # jump at the split), which is only reported in 'Stock Splits'
+    data = _as_yfinance(_add_actions(data.copy(), 2 * len(data) // 3), ticker)
+    return data, CorporateActions.from_yfinance(data, ticker)
+
+
+SYNTHETIC_DATASETS = {
+    'trend': lambda ticker: (synthetic_bars(seed=1, drift=0.0008), None),
+    'mean_revert': lambda ticker: (synthetic_bars(seed=2, drift=0.0, reversion=0.05), None),
+    'crash': lambda ticker: (synthetic_bars(seed=3, drift=-0.0015, volatility=0.03), None),
+    'gaps': lambda ticker: (synthetic_bars(seed=4, gaps=0.1), None),
+    'flat': lambda ticker: (synthetic_bars(seed=5, flat_from=300), None),
+    'yfinance_layout': lambda ticker: (_as_yfinance(synthetic_bars(seed=6), ticker), None),
+    'corporate_actions': lambda ticker: _with_actions(synthetic_bars(seed=7), ticker),
+    'yfinance_actions': lambda ticker: _yfinance_with_actions(synthetic_bars(seed=8), ticker),
+}
+
+
+def recorded_datasets(data_dir):
+    """
+    One dataset per `<name>.parquet` or `<name>.csv` in `data_dir`, e.g.
+    saved downloads (see record_dataset). Split and dividend columns, if
+    present, become the dataset's corporate actions.
+    """
+    from backtest.distributed import load_local_data
+
+    datasets = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.parquet')) + glob.glob(os.path.join(data_dir, '*.csv'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in datasets:
+            continue
+
+        def load(ticker, name=name):
+            data = load_local_data(data_dir, name)
+            return data, CorporateActions.from_yfinance(data, ticker)
+        datasets[f"recorded:{name}"] = load
+    return datasets
+
+
+def record_dataset(ticker, start_date, end_date, data_dir):
+    """Downloads a ticker once and stores it for later harness runs."""
+    from backtest.runner import load_stock_data
+
+    data = load_stock_data(ticker, start_date, end_date)
+    if data is None:
+        raise ValueError(f"No data for {ticker}")
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{ticker}.parquet")
+    data.to_parquet(path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Paths
+
+def reference_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                   corporate_actions=None):
+    """Today's Backtest + HistoricDataHandler + Portfolio path."""
+    from backtest.runner import build_backtest
+
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions)
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+
+# Candidate paths take the reference path's arguments and return a
+# RunResult. Faster implementations register themselves here; paths that
+# trade precision for speed register the tolerance they are held to.
+CANDIDATES = {}
+CANDIDATE_TOLERANCES = {}
+
+
+def register_candidate(name, tolerance=None):
+    def decorator(func):
+        CANDIDATES[name] = func
+        if tolerance is not None:
+            CANDIDATE_TOLERANCES[name] = tolerance
+        return func
+    return decorator
+
+
+@register_candidate('multi-timeframe-handler')
+def _multi_timeframe_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                          corporate_actions=None):
+    from backtest.data import MultiTimeframeDataHandler
+    from backtest.engine import Backtest
+    from backtest.execution import SimulatedExecutionHandler
+    from backtest.portfolio import Portfolio
+
+    events = queue.Queue()
+    data_handler = MultiTimeframeDataHandler(events, [ticker], data, corporate_actions=corporate_actions)
+    strategy = strategy_class(data_handler, events, **params)
+    portfolio = Portfolio(data_handler, events, start_date, initial_capital, position_size)
+    backtest = Backtest(data_handler, strategy, portfolio, SimulatedExecutionHandler(events, data_handler))
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+
+@register_candidate('snapshot-resume')
+def _snapshot_resume_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                          corporate_actions=None):
+    from backtest.engine import Backtest
+    from backtest.runner import build_backtest
+
+    cut = len(data) // 2
+    if corporate_actions is not None:
+        events = corporate_actions.splits.get(ticker, []) + corporate_actions.dividends.get(ticker, [])
+        if any(date > data.index[cut - 1] for date, _ in events):
+            # Resuming refuses actions that re-adjust bars already processed
+            raise NotApplicable("corporate actions after the snapshot")
+    backtest = build_backtest(data.iloc[:cut].copy(), ticker, strategy_class, params, start_date,
+                              initial_capital, position_size, corporate_actions)
+    backtest.simulate_trading()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'snapshot.pkl')
+        backtest.save_snapshot(path)
+        backtest = Backtest.load_snapshot(path)
+    backtest.resume(data, corporate_actions)
+    return RunResult.from_backtest(backtest)
+
+
+@register_candidate('float32', tolerance=Tolerance(rtol=1e-5, atol=1e-2))
+def _float32_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                  corporate_actions=None):
+    # float32 bars carry ~7 significant digits; cash and totals stay float64,
+    # so equity may drift by about 1e-6 relative and fills must not change
+    from backtest.runner import build_backtest
+
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions, precision='float32')
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+
+@register_candidate('matrix')
+def _matrix_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                 corporate_actions=None):
+    # One signals_matrix call per bar instead of the per-symbol loop
+    from backtest.runner import build_backtest
+
+    if not strategy_class.supports_matrix():
+        raise NotApplicable("no signals_matrix")
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions, matrix=True)
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+
+@register_candidate('scheduler')
+def _scheduler_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                    corporate_actions=None):
+    # Time-ordered scheduler without latency and with a month-end timer that
+    # does nothing: results must not change, the timing shows its overhead
+    from backtest.runner import build_backtest
+    from backtest.scheduler import EventScheduler
+
+    events = EventScheduler()
+    events.add_timer('month-end', rule='BME')
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions, events=events)
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+
+
+@register_candidate('quote-replay')
+def _quote_replay_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                       corporate_actions=None):
+    # One zero-spread quote per bar at its close, replayed from memory-mapped
+    # files: market orders must fill exactly where the bar-close handler does
+    from backtest.execution import QuoteExecutionHandler
+    from backtest.quotes import QuoteStore
+    from backtest.runner import build_backtest
+
+    if corporate_actions is not None:
+        raise NotApplicable("quotes are stored unadjusted")
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QuoteStore(tmp)
+        close = backtest.data_handler.symbol_data[ticker]['Close']
+        store.write(ticker, pd.DataFrame({'Bid': close, 'Ask': close}))
+        backtest.execution_handler = QuoteExecutionHandler(backtest.events, backtest.data_handler, store)
+        backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+@register_candidate('raw-rebuild')
+def _raw_rebuild_path(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                      corporate_actions=None):
+    # Split-adjusted (yfinance) bars turned back into raw ones by multiplying
+    # the splits in, then run with the full split and dividend factors: the
+    # adjusted bars must come out the same as adjusting for dividends only
+    from backtest.corporate_actions import PRICE_FIELDS, VOLUME_FIELDS
+    from backtest.ingest import normalize_bars
+    from backtest.runner import build_backtest
+
+    if corporate_actions is None or not corporate_actions.split_adjusted:
+        raise NotApplicable("bars are not split-adjusted")
+    raw = normalize_bars(data, ticker)
+    # ratio[i]: product of the splits after bar i, by which raw prices exceed adjusted ones
+    steps = np.ones(len(raw) + 1)
+    for date, ratio in corporate_actions.splits.get(ticker, []):
+        steps[raw.index.searchsorted(date, side='left')] *= ratio
+    ratio = np.cumprod(steps[::-1])[::-1][1:]
+    for field in PRICE_FIELDS:
+        raw[field] = raw[field].to_numpy() * ratio
+    for field in VOLUME_FIELDS:
+        raw[field] = raw[field].to_numpy() / ratio
+    raw_actions = CorporateActions(split_adjusted=False)
+    for date, split in corporate_actions.splits.get(ticker, []):
+        raw_actions.add_split(ticker, date, split)
+    for date, amount in corporate_actions.dividends.get(ticker, []):
+        # Sized against the close before the ex-date, whose ratio applies
+        raw_actions.add_dividend(ticker, date, amount * ratio[max(raw.index.searchsorted(date, side='left') - 1, 0)])
+    backtest = build_backtest(raw, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              raw_actions)
+    backtest.simulate_trading()
+    return RunResult.from_backtest(backtest)
+
+# ---------------------------------------------------------------------------
+# Comparison
+
+def diff_results(reference, candidate, tolerance=None):
+    """
+    Returns None if the runs match, otherwise a description of the first
+    difference found (fills, then positions, then equity).
+    """
+    tolerance = tolerance or Tolerance()
+    ref_fills = _fills_frame(reference.trade_log)
+    cand_fills = _fills_frame(candidate.trade_log)
+    if len(ref_fills) != len(cand_fills):
+        return f"fills: {len(ref_fills)} reference vs {len(cand_fills)} candidate"
+    for col in ('timeindex', 'symbol', 'direction', 'quantity'):
+        mismatch = np.flatnonzero(ref_fills[col].to_numpy() != cand_fills[col].to_numpy())
+        if len(mismatch):
+            i = mismatch[0]
+            return f"fill {i} {col}: {ref_fills[col].iloc[i]} vs {cand_fills[col].iloc[i]}"
+    for col in ('fill_cost', 'commission'):
+        mismatch = np.flatnonzero(~tolerance.close(ref_fills[col], cand_fills[col]))
+        if len(mismatch):
+            i = mismatch[0]
+            return f"fill {i} {col}: {ref_fills[col].iloc[i]} vs {cand_fills[col].iloc[i]}"
+
+    problem = _diff_frames('positions', reference.positions, candidate.positions, tolerance)
+    if problem:
+        return problem
+    ref_equity = reference.equity_curve[['total']]
+    cand_equity = candidate.equity_curve[['total']]
+    return _diff_frames('equity', ref_equity, cand_equity, tolerance)
+
+
+def _fills_frame(trade_log):
+    from backtest.visualization import trade_log_frame
+    fills = trade_log_frame(trade_log)
+    if len(fills) == 0:
+        return pd.DataFrame(columns=['timeindex', 'symbol', 'direction', 'quantity', 'fill_cost', 'commission'])
+    return fills.assign(symbol=fills['symbol'].astype(str), timeindex=pd.to_datetime(fills['timeindex']))
+
+
+def _diff_frames(what, ref, cand, tolerance):
+    if len(ref) != len(cand):
+        return f"{what}: {len(ref)} rows vs {len(cand)}"
+    if not ref.index.equals(cand.index):
+        i = int(np.flatnonzero(ref.index != cand.index)[0])
+        return f"{what} row {i}: index {ref.index[i]} vs {cand.index[i]}"
+    if list(ref.columns) != list(cand.columns):
+        return f"{what}: columns {list(ref.columns)} vs {list(cand.columns)}"
+    ok = tolerance.close(ref.to_numpy(dtype=np.float64), cand.to_numpy(dtype=np.float64))
+    if not ok.all():
+        i, j = np.argwhere(~ok)[0]
+        return f"{what} at {ref.index[i]} {ref.columns[j]}: {ref.iat[i, j]} vs {cand.iat[i, j]}"
+    return None
+
+
+def _timed(path, repeat, quiet, *args):
+    best, result = np.inf, None
+    for _ in range(repeat):
+        # Strategies print their errors per bar; keep the report readable
+        sink = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            args_copy = (args[0].copy(),) + args[1:]
+            start = time.perf_counter()
+            result = path(*args_copy)
+            best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_harness(candidates=None, strategies=None, datasets=None, tolerance=None, ticker='SYN',
+                initial_capital=100000.0, position_size=0.02, repeat=1, quiet=True):
+    """
+    Runs every strategy (registry names, default all) on every dataset
+    (name -> loader(ticker) returning (data, corporate_actions), default the
+    synthetic bank) through the reference path and each candidate (names
+    in CANDIDATES, default all), each held to its registered tolerance or
+    `tolerance`. Returns one report row per comparison:
+    status ('equal', 'different', 'error' or 'skipped'), the first
+    difference found and the speedup of the candidate.
+    """
+    from backtest.registry import default_registry
+
+    registry = default_registry()
+    candidates = list(CANDIDATES) if candidates is None else list(candidates)
+    strategies = registry.names() if strategies is None else list(strategies)
+    datasets = SYNTHETIC_DATASETS if datasets is None else datasets
+    tolerance = tolerance or Tolerance()
+
+    rows = []
+    for dataset_name, load in datasets.items():
+        data, corporate_actions = load(ticker)
+        for name in strategies:
+            spec = registry[name]
+            args = (data, ticker, spec.load(), spec.params, data.index[0], initial_capital, position_size,
+                    corporate_actions)
+            reference, ref_time = _timed(reference_path, repeat, quiet, *args)
+            for candidate_name in candidates:
+                cand_time = np.nan
+                try:
+                    candidate, cand_time = _timed(CANDIDATES[candidate_name], repeat, quiet, *args)
+                    problem = diff_results(reference, candidate, CANDIDATE_TOLERANCES.get(candidate_name, tolerance))
+                    status = 'equal' if problem is None else 'different'
+                except NotApplicable as exc:
+                    status, problem = 'skipped', str(exc)
+                except Exception as exc:
+                    status, problem = 'error', f"{type(exc).__name__}: {exc}"
+                rows.append({
+                    'candidate': candidate_name,
+                    'dataset': dataset_name,
+                    'strategy': name,
+                    'status': status,
+                    'difference': problem,
+                    'fills': len(reference.trade_log),
+                    'reference_s': ref_time,
+                    'candidate_s': cand_time,
+                    'speedup': ref_time / cand_time if cand_time else np.nan,
+                })
+    return pd.DataFrame(rows)
+
+
+def summarize(report):
+    """Per candidate: comparisons, mismatches, skipped cases and median speedup."""
+    return report.groupby('candidate').agg(
+        comparisons=('status', 'size'),
+        mismatches=('status', lambda s: int(s.isin(('different', 'error')).sum())),
+        skipped=('status', lambda s: int((s == 'skipped').sum())),
+        median_speedup=('speedup', 'median'),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare candidate execution paths with the reference backtest")
+    parser.add_argument('--candidate', action='append', help="candidate path (repeatable, default all)")
+    parser.add_argument('--strategy', action='append', help="registry strategy name (repeatable, default all)")
+    parser.add_argument('--data-dir', help="also run on recorded datasets in this directory")
+    parser.add_argument('--no-synthetic', action='store_true', help="skip the synthetic datasets")
+    parser.add_argument('--rtol', type=float, default=1e-9)
+    parser.add_argument('--atol', type=float, default=1e-6)
+    parser.add_argument('--repeat', type=int, default=1, help="timing runs per path, best is kept")
+    args = parser.parse_args(argv)
+
+    datasets = {} if args.no_synthetic else dict(SYNTHETIC_DATASETS)
+    if args.data_dir:
+        datasets.update(recorded_datasets(args.data_dir))
+    report = run_harness(args.candidate, args.strategy, datasets, Tolerance(args.rtol, args.atol), repeat=args.repeat)
+
+    failures = report[report['status'].isin(('different', 'error'))]
+    with pd.option_context('display.width', 200, 'display.max_colwidth', 80):
+        print(summarize(report).to_string())
+        if len(failures):
+            print()
+            print(failures[['candidate', 'dataset', 'strategy', 'difference']].to_string(index=False))
+    return 1 if len(failures) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
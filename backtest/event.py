@@ -2,8 +2,10 @@ class Event:
     pass
 
 class MarketEvent(Event):
-    def __init__(self):
+    def __init__(self, datetime=None):
         self.type = 'MARKET'
+        # Timestamp of the new bar; moves an EventScheduler's clock
+        self.datetime = datetime
 
 class SignalEvent(Event):
     def __init__(self, strategy_id, symbol, datetime, signal_type, strength):
@@ -15,12 +17,23 @@ class SignalEvent(Event):
         self.strength = strength
 
 class OrderEvent(Event):
-    def __init__(self, symbol, order_type, quantity, direction):
+    """
+    order_type is one of 'MKT', 'LMT', 'STP', 'STPLMT' or 'CANCEL' (cancels
+    every resting order for the symbol). Setting take_profit and/or stop_loss
+    turns the order into a bracket: once it fills, a limit and a stop order
+    closing the position are placed as a one-cancels-other pair.
+    """
+    def __init__(self, symbol, order_type, quantity, direction, limit_price=None, stop_price=None,
+                 take_profit=None, stop_loss=None):
         self.type = 'ORDER'
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
         self.direction = direction
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
 
     def print_order(self):
         print(f"Order: Symbol={self.symbol}, Type={self.order_type}, Quantity={self.quantity}, Direction={self.direction}")
@@ -34,4 +47,12 @@ class FillEvent(Event):
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
-        self.commission = commission
\ No newline at end of file
+        self.commission = commission
+
+class TimerEvent(Event):
+    """Fired by an EventScheduler timer (see EventScheduler.add_timer)."""
+    def __init__(self, name, datetime, callback=None):
+        self.type = 'TIMER'
+        self.name = name
+        self.datetime = datetime
+        self.callback = callback
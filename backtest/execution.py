@@ -1,9 +1,20 @@
+import numpy as np
+import pandas as pd
+
 from backtest.event import FillEvent, OrderEvent
+from backtest.quotes import QuoteStore, to_ns
 
 class ExecutionHandler:
     def execute_order(self, event):
         raise NotImplementedError("Should implement execute_order()")
 
+    def on_bar(self, event):
+        """
+        Called for every MarketEvent before the strategy sees the bar.
+        Handlers with resting orders match them against the new bar here.
+        """
+        pass
+
 class SimulatedExecutionHandler(ExecutionHandler):
     def __init__(self, events, data_handler):
         self.events = events
@@ -14,7 +25,446 @@ class SimulatedExecutionHandler(ExecutionHandler):
             # Use the new, safer function to get the close price
             fill_price = self.data_handler.get_latest_bar_value(event.symbol, 'Close')
             if fill_price is not None:
-                timeindex = self.data_handler.get_latest_bar(event.symbol).index[0]
-                fill_cost = fill_price * event.quantity
+                timeindex = self.data_handler.get_latest_bar_datetime(event.symbol)
+                # Cash flows are float64 even when bars are stored as float32
+                fill_cost = float(fill_price) * event.quantity
                 fill_event = FillEvent(timeindex, event.symbol, 'ARCA', event.quantity, event.direction, fill_cost)
                 self.events.put(fill_event)
+
+
+ORDER_KINDS = {'MKT': 0, 'LMT': 1, 'STP': 2, 'STPLMT': 3}
+MKT, LMT, STP, STPLMT = 0, 1, 2, 3
+
+
+class OrderBook:
+    """
+    Resting orders stored column-wise in NumPy arrays so that a bar is
+    matched against every open order with a handful of vector operations.
+
+    Bracket orders are a parent plus two children (take-profit limit and
+    stop-loss stop) sharing an OCO group. Children are inactive until the
+    parent fills and become matchable from the following bar.
+    """
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._next_group = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'symbol', None)
+        fields = {
+            'symbol': np.int32, 'side': np.int8, 'kind': np.int8, 'quantity': np.int64,
+            'limit': np.float64, 'stop': np.float64, 'parent': np.int64, 'oco': np.int64,
+            'is_stop_loss': np.bool_, 'triggered': np.bool_, 'active': np.bool_, 'pending': np.bool_,
+        }
+        for name, dtype in fields.items():
+            arr = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                arr[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, arr)
+
+    def _push(self, symbol, side, kind, quantity, limit=np.nan, stop=np.nan, parent=-1, oco=-1,
+              is_stop_loss=False, active=True):
+        if self.size == len(self.symbol):
+            self._compact()
+            if self.size == len(self.symbol):
+                self._allocate(2 * len(self.symbol))
+        i = self.size
+        self.symbol[i] = symbol
+        self.side[i] = side
+        self.kind[i] = kind
+        self.quantity[i] = quantity
+        self.limit[i] = limit
+        self.stop[i] = stop
+        self.parent[i] = parent
+        self.oco[i] = oco
+        self.is_stop_loss[i] = is_stop_loss
+        self.triggered[i] = False
+        self.active[i] = active
+        self.pending[i] = not active
+        self.size += 1
+        return i
+
+    def _compact(self):
+        """Drops filled and cancelled orders, remapping parent links."""
+        live = np.flatnonzero(self.active[:self.size] | self.pending[:self.size])
+        if len(live) == self.size:
+            return
+        remap = np.full(self.size + 1, -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        for name in ('symbol', 'side', 'kind', 'quantity', 'limit', 'stop', 'parent', 'oco',
+                     'is_stop_loss', 'triggered', 'active', 'pending'):
+            arr = getattr(self, name)
+            arr[:len(live)] = arr[live]
+        n = len(live)
+        self.parent[:n] = remap[self.parent[:n]]
+        self.size = n
+
+    def add(self, symbol, side, kind, quantity, limit=np.nan, stop=np.nan, take_profit=None, stop_loss=None):
+        """Adds an order (and its bracket children) and returns its id."""
+        parent = self._push(symbol, side, kind, quantity, limit, stop)
+        if take_profit is not None or stop_loss is not None:
+            group = self._next_group
+            self._next_group += 1
+            if take_profit is not None:
+                self._push(symbol, -side, LMT, quantity, limit=take_profit, parent=parent, oco=group, active=False)
+            if stop_loss is not None:
+                self._push(symbol, -side, STP, quantity, stop=stop_loss, parent=parent, oco=group,
+                           is_stop_loss=True, active=False)
+        return parent
+
+    def cancel_symbol(self, symbol):
+        n = self.size
+        mask = self.symbol[:n] == symbol
+        self.active[:n][mask] = False
+        self.pending[:n][mask] = False
+
+    def open_orders(self):
+        return int(np.count_nonzero(self.active[:self.size] | self.pending[:self.size]))
+
+    def match(self, opens, highs, lows):
+        """
+        Matches all active orders against one bar per symbol (arrays indexed
+        by symbol code; NaN means no bar). Returns (order ids, fill prices).
+
+        Fill prices respect gaps: a market order fills at the open, a limit
+        at the better of open and limit, a stop at the worse of open and
+        stop. When both legs of a bracket trade in the same bar the stop-loss
+        wins, since the bar does not say which level was reached first.
+        """
+        n = self.size
+        idx = np.flatnonzero(self.active[:n])
+        if len(idx) == 0:
+            return idx, np.empty(0)
+
+        sym = self.symbol[idx]
+        o, h, l = opens[sym], highs[sym], lows[sym]
+        has_bar = ~np.isnan(o)
+        buy = self.side[idx] > 0
+        kind = self.kind[idx]
+        limit, stop = self.limit[idx], self.stop[idx]
+
+        # Stops (plain and stop-limit) trigger when the bar trades through them
+        stop_hit = np.where(buy, h >= stop, l <= stop)
+        stop_price = np.where(buy, np.maximum(o, stop), np.minimum(o, stop))
+        was_triggered = self.triggered[idx]
+        triggered = was_triggered | ((kind == STPLMT) & stop_hit)
+
+        limit_hit = np.where(buy, l <= limit, h >= limit)
+        limit_price = np.where(buy, np.minimum(o, limit), np.maximum(o, limit))
+        # A stop-limit triggered inside this bar cannot fill better than its stop
+        stoplimit_price = np.where(was_triggered, limit_price,
+                                   np.where(buy, np.minimum(stop_price, limit), np.maximum(stop_price, limit)))
+
+        filled = np.select(
+            [kind == MKT, kind == LMT, kind == STP, kind == STPLMT],
+            [np.ones(len(idx), dtype=bool), limit_hit, stop_hit, triggered & limit_hit],
+            default=False) & has_bar
+        price = np.select([kind == MKT, kind == LMT, kind == STP], [o, limit_price, stop_price], default=stoplimit_price)
+
+        # Resolve OCO pairs: keep one fill per group, stop-loss first
+        oco = self.oco[idx]
+        in_group = filled & (oco >= 0)
+        if in_group.any():
+            cand = np.flatnonzero(in_group)
+            order = np.lexsort((~self.is_stop_loss[idx[cand]], oco[cand]))
+            cand = cand[order]
+            _, first = np.unique(oco[cand], return_index=True)
+            losers = np.setdiff1d(cand, cand[first])
+            filled[losers] = False
+            done_groups = oco[cand[first]]
+            siblings = np.isin(self.oco[:n], done_groups)
+            self.active[:n][siblings] = False
+            self.pending[:n][siblings] = False
+
+        self.triggered[idx] = triggered & ~filled
+        filled_ids = idx[filled]
+        self.active[filled_ids] = False
+
+        # Arm the bracket children of parents that filled on this bar
+        children = np.flatnonzero(self.pending[:n] & np.isin(self.parent[:n], filled_ids))
+        self.pending[children] = False
+        self.active[children] = True
+
+        return filled_ids, price[filled]
+
+
+class IntrabarExecutionHandler(ExecutionHandler):
+    """
+    Queues orders in an OrderBook and fills them against the next bar's
+    Open/High/Low, so an order generated on a bar's close can never trade
+    at that same close. Supports MKT, LMT, STP, STPLMT, bracket orders and
+    CANCEL. A market exit also cancels the symbol's resting bracket legs.
+    """
+    def __init__(self, events, data_handler, commission=0.0):
+        self.events = events
+        self.data_handler = data_handler
+        self.commission = commission
+        self.symbol_list = data_handler.symbol_list
+        self.symbol_codes = {s: i for i, s in enumerate(self.symbol_list)}
+        self.order_book = OrderBook()
+
+    def execute_order(self, event):
+        if event.type != 'ORDER':
+            return
+        code = self.symbol_codes[event.symbol]
+        if event.order_type == 'CANCEL':
+            self.order_book.cancel_symbol(code)
+            return
+
+        side = 1 if event.direction == 'BUY' else -1
+        kind = ORDER_KINDS[event.order_type]
+        if kind == MKT and event.take_profit is None and event.stop_loss is None:
+            # A plain market order closes out the bracket legs that protected the position
+            self.order_book.cancel_symbol(code)
+        self.order_book.add(
+            code, side, kind, event.quantity,
+            limit=np.nan if event.limit_price is None else event.limit_price,
+            stop=np.nan if event.stop_price is None else event.stop_price,
+            take_profit=event.take_profit, stop_loss=event.stop_loss)
+
+    def _bar_arrays(self):
+        n = len(self.symbol_list)
+        opens, highs, lows = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        for i, s in enumerate(self.symbol_list):
+            for arr, field in ((opens, 'Open'), (highs, 'High'), (lows, 'Low')):
+                value = self.data_handler.get_latest_bar_value(s, field)
+                if value is not None:
+                    arr[i] = value
+        return opens, highs, lows
+
+    def on_bar(self, event):
+        if self.order_book.open_orders() == 0:
+            return
+        filled_ids, prices = self.order_book.match(*self._bar_arrays())
+        book = self.order_book
+        for order_id, price in zip(filled_ids, prices):
+            symbol = self.symbol_list[book.symbol[order_id]]
+            quantity = int(book.quantity[order_id])
+            direction = 'BUY' if book.side[order_id] > 0 else 'SELL'
+            timeindex = self.data_handler.get_latest_bar_datetime(symbol)
+            self.events.put(FillEvent(timeindex, symbol, 'ARCA', quantity, direction,
+                                      float(price) * quantity, self.commission))
+
+
+class _QuoteOrder:
+    __slots__ = ('id', 'symbol', 'side', 'kind', 'quantity', 'limit', 'stop', 'take_profit', 'stop_loss',
+                 'group', 'triggered', 'since')
+
+    def __init__(self, order_id, symbol, side, kind, quantity, limit=None, stop=None, take_profit=None,
+                 stop_loss=None, group=None):
+        self.id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.kind = kind
+        self.quantity = quantity
+        self.limit = limit
+        self.stop = stop
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.group = group
+        self.triggered = False
+        # First quote index the order has not been matched against yet
+        self.since = 0
+
+
+class QuoteExecutionHandler(ExecutionHandler):
+    """
+    Fills orders against level-1 quotes replayed from a
+    backtest.quotes.QuoteStore (or its directory) instead of bar prices.
+    An order reaches the market `delay` after the timestamp of the bar it
+    was generated on; set it to the bar length when bars are stamped at
+    their open (as yfinance's intraday bars are), plus any latency.
+
+    - A market order takes the touch of the prevailing quote: a buy pays
+      the ask, a sell gets the bid. So do LMT, STP and STPLMT orders that
+      are marketable when they arrive.
+    - Other orders rest and are matched quote by quote against the stream
+      up to each new bar. A resting limit fills at its price once the
+      opposite side trades through it (or touches it, `through=False`),
+      as L1 data does not show its place in the queue. A stop triggers
+      when the touch reaches it and fills at that quote's touch.
+    - Bracket legs arm after the parent fills; the leg the quotes reach
+      first wins and cancels the other.
+    - CANCEL withdraws the symbol's resting orders, and so does a plain
+      market order (as in IntrabarExecutionHandler).
+
+    Orders for a symbol without a quote yet wait for its first one and
+    arrive on it. Quote sizes are not modelled: every fill is complete. The
+    realized spread cost of each fill, its distance from the mid times the
+    quantity, is kept for `spread_costs()`. A fill taking the touch is
+    measured against that quote; a resting fill against the quote it
+    rested in just before the one that went through it, with the order
+    itself on the book, so passive fills earn (show a negative cost).
+    """
+    def __init__(self, events, data_handler, quotes, delay=None, through=True, commission=0.0):
+        self.events = events
+        self.data_handler = data_handler
+        self.quotes = quotes if isinstance(quotes, QuoteStore) else QuoteStore(quotes)
+        self.delay = pd.Timedelta(0) if delay is None else pd.Timedelta(delay)
+        self.through = through
+        self.commission = commission
+        self.resting = []
+        self._next_id = 0
+        self._next_group = 0
+        self._fills = []
+
+    def _arrival(self, symbol):
+        return to_ns(self.data_handler.get_latest_bar_datetime(symbol)) + self.delay.value
+
+    def _cancel(self, symbol):
+        self.resting = [o for o in self.resting if o.symbol != symbol]
+
+    def _new_order(self, symbol, side, kind, quantity, **prices):
+        order = _QuoteOrder(self._next_id, symbol, side, kind, quantity, **prices)
+        self._next_id += 1
+        return order
+
+    def execute_order(self, event):
+        if event.type != 'ORDER':
+            return
+        if event.order_type == 'CANCEL':
+            self._cancel(event.symbol)
+            return
+        kind = ORDER_KINDS[event.order_type]
+        if kind == MKT and event.take_profit is None and event.stop_loss is None:
+            self._cancel(event.symbol)
+        order = self._new_order(event.symbol, 1 if event.direction == 'BUY' else -1, kind, event.quantity,
+                                limit=event.limit_price, stop=event.stop_price, take_profit=event.take_profit,
+                                stop_loss=event.stop_loss)
+        _, bid, ask = self.quotes.columns(event.symbol)
+        i = int(self.quotes.locate(event.symbol, self._arrival(event.symbol)))
+        if i >= 0:
+            touch = float(ask[i]) if order.side > 0 else float(bid[i])
+            if self._takes(order, touch):
+                self.resting.extend(self._fill(order, i, touch))
+                return
+        order.since = i + 1
+        self.resting.append(order)
+
+    def _takes(self, order, touch):
+        """Whether `order` trades on arrival against a quote whose touch is `touch`."""
+        if order.kind in (STP, STPLMT) and not order.triggered:
+            if (touch - order.stop) * order.side < 0:
+                return False
+            order.triggered = True
+            if order.kind == STP:
+                return True
+        return order.kind == MKT or (touch - order.limit) * order.side <= 0
+
+    def _first_fill(self, order, touch):
+        """
+        (offset, price, passive) of the resting order's first fill in the
+        quote window `touch` (the touch from order.since on), or None;
+        `passive` is set when it fills at its limit rather than the touch.
+        Also returns the offset at which an untriggered stop-limit triggers.
+        """
+        side = order.side
+        start, trigger = 0, None
+        if order.kind == MKT:
+            return (0, float(touch[0]), False) if len(touch) else None, None
+        if order.kind in (STP, STPLMT) and not order.triggered:
+            hit = (touch - order.stop) * side >= 0
+            if not hit.any():
+                return None, None
+            trigger = int(np.argmax(hit))
+            if order.kind == STP or (touch[trigger] - order.limit) * side <= 0:
+                return (trigger, float(touch[trigger]), False), trigger
+            start = trigger + 1
+        gap = (touch[start:] - order.limit) * side
+        passive = gap < 0 if self.through else gap <= 0
+        if not passive.any():
+            return None, trigger
+        return (start + int(np.argmax(passive)), float(order.limit), True), trigger
+
+    def _sweep(self, symbol, until):
+        """Matches the symbol's resting orders against its quotes up to time `until` (ns), in quote order."""
+        orders = [o for o in self.resting if o.symbol == symbol]
+        _, bid, ask = self.quotes.columns(symbol)
+        stop = int(self.quotes.locate(symbol, until)) + 1
+        if stop > 0 and any(o.since == 0 for o in orders):
+            # Orders placed before the first quote arrive on it, as execute_order would have them
+            arrived = []
+            for order in orders:
+                if order.since > 0:
+                    arrived.append(order)
+                    continue
+                order.since = 1
+                touch = float(ask[0]) if order.side > 0 else float(bid[0])
+                if self._takes(order, touch):
+                    arrived.extend(self._fill(order, 0, touch))
+                else:
+                    arrived.append(order)
+            orders = arrived
+        while True:
+            best = None
+            for order in orders:
+                if order.since >= stop:
+                    continue
+                touch = np.asarray((ask if order.side > 0 else bid)[order.since:stop])
+                fill, _ = self._first_fill(order, touch)
+                # Ties on one quote go to the earlier order
+                if fill is not None and (best is None or order.since + fill[0] < best[0]):
+                    best = (order.since + fill[0], fill[1], fill[2], order)
+            if best is None:
+                break
+            i, price, passive, order = best
+            orders = [o for o in orders if o is not order and (order.group is None or o.group != order.group)]
+            orders.extend(self._fill(order, i, price, passive))
+        for order in orders:
+            if order.kind == STPLMT and not order.triggered and order.since < stop:
+                touch = np.asarray((ask if order.side > 0 else bid)[order.since:stop])
+                order.triggered = self._first_fill(order, touch)[1] is not None
+            order.since = max(order.since, stop)
+        self.resting = [o for o in self.resting if o.symbol != symbol] + orders
+
+    def _fill(self, order, i, price, passive=False):
+        """Emits the fill of `order` at quote `i` and returns its bracket legs, which rest from the next quote."""
+        times, bid, ask = self.quotes.columns(order.symbol)
+        if passive:
+            # Quote i only shows that the order traded; it did so against the
+            # book before it, where it was the best bid (offer) if inside the
+            # spread. Resting orders start after their arrival quote, so i > 0.
+            best_bid, best_ask = float(bid[i - 1]), float(ask[i - 1])
+            if order.side > 0:
+                best_bid = max(best_bid, price)
+            else:
+                best_ask = min(best_ask, price)
+            mid = 0.5 * (best_bid + best_ask)
+        else:
+            mid = 0.5 * (float(bid[i]) + float(ask[i]))
+        direction = 'BUY' if order.side > 0 else 'SELL'
+        self._fills.append((int(times[i]), order.symbol, direction, order.quantity, price, mid,
+                            order.side * (price - mid) * order.quantity))
+        timeindex = self.data_handler.get_latest_bar_datetime(order.symbol)
+        self.events.put(FillEvent(timeindex, order.symbol, 'ARCA', order.quantity, direction,
+                                  price * order.quantity, self.commission))
+        legs = []
+        if order.take_profit is not None or order.stop_loss is not None:
+            group = self._next_group
+            self._next_group += 1
+            if order.take_profit is not None:
+                legs.append(self._new_order(order.symbol, -order.side, LMT, order.quantity,
+                                            limit=order.take_profit, group=group))
+            if order.stop_loss is not None:
+                legs.append(self._new_order(order.symbol, -order.side, STP, order.quantity,
+                                            stop=order.stop_loss, group=group))
+            for leg in legs:
+                leg.since = i + 1
+        return legs
+
+    def on_bar(self, event):
+        if not self.resting:
+            return
+        for symbol in dict.fromkeys(o.symbol for o in self.resting):
+            self._sweep(symbol, self._arrival(symbol))
+
+    def open_orders(self):
+        return len(self.resting)
+
+    def spread_costs(self):
+        """One row per fill: quote time, symbol, direction, quantity, price, mid and realized spread cost."""
+        frame = pd.DataFrame(self._fills, columns=['quote_time', 'symbol', 'direction', 'quantity', 'price', 'mid',
+                                                  'spread_cost'])
+        frame['quote_time'] = pd.to_datetime(frame['quote_time'], unit='ns')
+        return frame
@@ -0,0 +1,341 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Batched indicators. Every function takes DataFrames shaped (bars, symbols)
+# and works down the columns, so one call covers a whole universe. The
+# formulas are the ones the strategies in strategies/ apply to a single
+# symbol's bars, NaN handling included, so each column holds the value the
+# strategy would compute for that symbol.
+
+
+def _rolling_apply(frame, window, func):
+    # rolling(window).apply(func, raw=True) for a reducer over the last
+    # axis of a (bars, symbols, window) view; windows with a NaN give NaN
+    values = frame.to_numpy(dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        windows = sliding_window_view(values, window, axis=0)
+        reduced = func(windows).astype(np.float64)
+        reduced[np.isnan(windows).any(axis=-1)] = np.nan
+        out[window - 1:] = reduced
+    return pd.DataFrame(out, index=frame.index, columns=frame.columns)
+
+
+# pandas runs rolling and ewm kernels one column at a time, which costs
+# more than the arithmetic once a frame has hundreds of symbols. The
+# kernels below step down the rows instead, every symbol per step, with
+# the same running sums, compensation terms and NaN rules as pandas, so
+# the results are bit-identical. They are used for frames wider than they
+# are long (a few hundred symbols over a lookback window); Series and long
+# narrow frames stay with pandas.
+
+def _use_kernel(data):
+    return data.ndim == 2 and data.shape[1] > len(data) > 0
+
+
+def _wrap(values, like):
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+
+def _kahan_add(total, compensation, value, mask):
+    y = value - compensation
+    t = total + y
+    return np.where(mask, t, total), np.where(mask, (t - total) - y, compensation)
+
+
+def _rolling_sum_kernel(values, window, mean):
+    # pandas roll_sum / roll_mean with min_periods=window
+    n, width = values.shape
+    out = np.empty((n, width))
+    total, add_comp, remove_comp = np.zeros(width), np.zeros(width), np.zeros(width)
+    nobs, negative, same = (np.zeros(width, dtype=np.int64) for _ in range(3))
+    prev = values[0].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(n):
+            if i >= window:
+                value = values[i - window]
+                ok = value == value
+                nobs -= ok
+                negative -= ok & np.signbit(value)
+                total, remove_comp = _kahan_add(total, remove_comp, -value, ok)
+            value = values[i]
+            ok = value == value
+            nobs += ok
+            negative += ok & np.signbit(value)
+            total, add_comp = _kahan_add(total, add_comp, value, ok)
+            # A run of equal values gives that value exactly
+            same = np.where(ok, np.where(value == prev, same + 1, 1), same)
+            prev = np.where(ok, value, prev)
+            constant = same >= nobs
+            if mean:
+                result = total / nobs
+                result[(negative == 0) & (result < 0) & ~constant] = 0.0
+                result[(negative == nobs) & (result > 0) & ~constant] = 0.0
+                result = np.where(constant, prev, result)
+            else:
+                result = np.where(constant, prev * nobs, total)
+            out[i] = np.where(nobs >= max(window, 1), result, np.nan)
+    return out
+
+
+def _rolling_std_kernel(values, window, ddof=1):
+    # pandas roll_var (Welford with compensation), then the square root
+    n, width = values.shape
+    out = np.empty((n, width))
+    mean_x, ssqdm, add_comp, remove_comp = (np.zeros(width) for _ in range(4))
+    nobs, same = np.zeros(width, dtype=np.int64), np.zeros(width, dtype=np.int64)
+    prev = values[0].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(n):
+            if i >= window:
+                value = values[i - window]
+                ok = value == value
+                nobs -= ok
+                prev_mean = mean_x - remove_comp
+                y = value - remove_comp
+                t = y - mean_x
+                new_mean = mean_x - t / nobs
+                new_ssqdm = ssqdm - (value - prev_mean) * (value - new_mean)
+                live, empty = ok & (nobs > 0), ok & (nobs == 0)
+                remove_comp = np.where(live, t + mean_x - y, remove_comp)
+                mean_x = np.where(live, new_mean, np.where(empty, 0.0, mean_x))
+                ssqdm = np.where(live, new_ssqdm, np.where(empty, 0.0, ssqdm))
+            value = values[i]
+            ok = value == value
+            same = np.where(ok, np.where(value == prev, same + 1, 1), same)
+            prev = np.where(ok, value, prev)
+            nobs += ok
+            prev_mean = mean_x - add_comp
+            y = value - add_comp
+            t = y - mean_x
+            new_mean = mean_x + t / nobs
+            new_ssqdm = ssqdm + (value - prev_mean) * (value - new_mean)
+            add_comp = np.where(ok, t + mean_x - y, add_comp)
+            mean_x = np.where(ok, new_mean, mean_x)
+            ssqdm = np.where(ok, new_ssqdm, ssqdm)
+            variance = np.where((nobs == 1) | (same >= nobs), 0.0, ssqdm / (nobs - ddof))
+            variance[variance < 0] = 0.0
+            out[i] = np.where((nobs >= window) & (nobs > ddof), np.sqrt(variance), np.nan)
+    return out
+
+
+def _ewm_kernel(values, com, min_periods=0):
+    # pandas ewm(adjust=False, ignore_na=False).mean(), which derives alpha
+    # from the center of mass
+    alpha = 1.0 / (1.0 + com)
+    minp = max(min_periods, 1)
+    out = np.empty(values.shape)
+    weighted = values[0].copy()
+    nobs = (weighted == weighted).astype(np.int64)
+    old_wt = np.ones(values.shape[1])
+    out[0] = np.where(nobs >= minp, weighted, np.nan)
+    for i in range(1, len(values)):
+        value = values[i]
+        ok = value == value
+        nobs += ok
+        started = weighted == weighted
+        old_wt = np.where(started, old_wt * (1.0 - alpha), old_wt)
+        update = started & ok & (weighted != value)
+        blended = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+        weighted = np.where(update, blended, np.where(~started & ok, value, weighted))
+        old_wt = np.where(started & ok, 1.0, old_wt)
+        out[i] = np.where(nobs >= minp, weighted, np.nan)
+    return out
+
+
+def _rolling_extreme(frame, window, reducer):
+    # Rolling max/min with min_periods=window: any NaN in the window gives NaN
+    values = frame.to_numpy(dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window, axis=0), axis=-1)
+    return _wrap(out, frame)
+
+
+def _center_of_mass(span=None, alpha=None, com=None):
+    if span is not None:
+        return (span - 1) / 2.0
+    if alpha is not None:
+        return (1 - alpha) / alpha
+    return com
+
+
+def sma(close, window):
+    if _use_kernel(close):
+        return _wrap(_rolling_sum_kernel(close.to_numpy(dtype=np.float64), window, mean=True), close)
+    return close.rolling(window=window).mean()
+
+
+def rolling_sum(values, window):
+    if _use_kernel(values):
+        return _wrap(_rolling_sum_kernel(values.to_numpy(dtype=np.float64), window, mean=False), values)
+    return values.rolling(window=window).sum()
+
+
+def rolling_std(close, window):
+    if _use_kernel(close):
+        return _wrap(_rolling_std_kernel(close.to_numpy(dtype=np.float64), window), close)
+    return close.rolling(window=window).std()
+
+
+def rolling_max(values, window):
+    if _use_kernel(values):
+        return _rolling_extreme(values, window, np.max)
+    return values.rolling(window=window).max()
+
+
+def rolling_min(values, window):
+    if _use_kernel(values):
+        return _rolling_extreme(values, window, np.min)
+    return values.rolling(window=window).min()
+
+
+def ewm_mean(values, span=None, alpha=None, com=None, min_periods=0):
+    """ewm(..., adjust=False).mean()"""
+    if _use_kernel(values):
+        com = _center_of_mass(span, alpha, com)
+        return _wrap(_ewm_kernel(values.to_numpy(dtype=np.float64), com, min_periods), values)
+    return values.ewm(span=span, alpha=alpha, com=com, min_periods=min_periods, adjust=False).mean()
+
+
+def ema(values, span=None, alpha=None):
+    return ewm_mean(values, span=span, alpha=alpha)
+
+
+def dema(close, span):
+    ema1 = ema(close, span)
+    ema2 = ema(ema1, span)
+    return 2 * ema1 - ema2
+
+
+def tema(close, span):
+    ema1 = ema(close, span)
+    ema2 = ema(ema1, span)
+    ema3 = ema(ema2, span)
+    return 3 * ema1 - 3 * ema2 + ema3
+
+
+def rsi(close, period):
+    delta = close.diff()
+    gain = ewm_mean(delta.where(delta > 0, 0), com=period - 1, min_periods=period)
+    loss = ewm_mean(-delta.where(delta < 0, 0), com=period - 1, min_periods=period)
+    return 100 - (100 / (1 + gain / loss))
+
+
+def bollinger(close, period, num_std):
+    """(lower, middle, upper)"""
+    middle = sma(close, period)
+    std = rolling_std(close, period)
+    return middle - std * num_std, middle, middle + std * num_std
+
+
+def macd(close, short_period, long_period, signal_period):
+    """(macd line, signal line)"""
+    line = ema(close, short_period) - ema(close, long_period)
+    return line, ema(line, signal_period)
+
+
+def true_range(high, low, close):
+    previous = close.shift()
+    # Row-wise max that skips NaN, as DataFrame.max(axis=1) does for the
+    # first bar where the previous close is missing
+    return np.fmax(np.fmax(high - low, (high - previous).abs()), (low - previous).abs())
+
+
+def atr(high, low, close, period):
+    """Wilder's average true range."""
+    return ema(true_range(high, low, close), alpha=1 / period)
+
+
+def stochastic_k(high, low, close, period):
+    low_k = rolling_min(low, period)
+    high_k = rolling_max(high, period)
+    return 100 * (close - low_k) / (high_k - low_k)
+
+
+def williams_r(high, low, close, period):
+    highest_high = rolling_max(high, period)
+    lowest_low = rolling_min(low, period)
+    return -100 * (highest_high - close) / (highest_high - lowest_low)
+
+
+def on_balance_volume(close, volume):
+    return (np.sign(close.diff()) * volume).fillna(0).cumsum()
+
+
+def ichimoku(high, low, tenkan_period, kijun_period):
+    """(tenkan-sen, kijun-sen)"""
+    tenkan = (rolling_max(high, tenkan_period) + rolling_min(low, tenkan_period)) / 2
+    kijun = (rolling_max(high, kijun_period) + rolling_min(low, kijun_period)) / 2
+    return tenkan, kijun
+
+
+def rate_of_change(close, period):
+    previous = close.shift(period)
+    return (close - previous) / previous * 100
+
+
+def awesome_oscillator(high, low, short_period, long_period):
+    midpoint = (high + low) / 2
+    return sma(midpoint, short_period) - sma(midpoint, long_period)
+
+
+def vwap(high, low, close, volume):
+    """Cumulative VWAP from the first bar given."""
+    return (volume * (high + low + close) / 3).cumsum() / volume.cumsum()
+
+
+def donchian(high, low, period):
+    """(upper, lower) channel of the `period` bars before each bar."""
+    return rolling_max(high.shift(1), period), rolling_min(low.shift(1), period)
+
+
+def cci(high, low, close, period):
+    tp = (high + low + close) / 3
+    mean_dev = _rolling_apply(tp, period, lambda w: np.abs(w - w.mean(axis=-1, keepdims=True)).mean(axis=-1))
+    return (tp - sma(tp, period)) / (0.015 * mean_dev)
+
+
+def chaikin_money_flow(high, low, close, volume, period):
+    multiplier = ((close - low) - (high - close)) / (high - low)
+    return rolling_sum(multiplier * volume, period) / rolling_sum(volume, period)
+
+
+def aroon(high, low, period):
+    """(aroon up, aroon down) from the position of the extreme in each window."""
+    up = _rolling_apply(high, period, lambda w: np.argmax(w, axis=-1)) / period * 100
+    down = _rolling_apply(low, period, lambda w: np.argmin(w, axis=-1)) / period * 100
+    return up, down
+
+
+def money_flow_index(high, low, close, volume, period):
+    typical_price = (high + low + close) / 3
+    raw_money_flow = typical_price * volume
+    mf_sign = np.sign(typical_price.diff(1))
+    positive = pd.DataFrame(np.where(mf_sign > 0, raw_money_flow, 0), columns=close.columns)
+    negative = pd.DataFrame(np.where(mf_sign < 0, raw_money_flow, 0), columns=close.columns)
+    ratio = rolling_sum(positive, period) / rolling_sum(negative, period)
+    mfi = 100 - (100 / (1 + ratio))
+    mfi.index = close.index
+    return mfi
+
+
+def trix(close, period, signal_period):
+    """(trix, signal line)"""
+    ema3 = ema(ema(ema(close, period), period), period)
+    line = (ema3 - ema3.shift(1)) / ema3.shift(1) * 100
+    return line, ema(line, signal_period)
+
+
+def vortex(high, low, close, period):
+    """(VI+, VI-)"""
+    previous = close.shift()
+    # Series.combine_first in the strategy: the first non-NaN of the three
+    tr = (high - low).abs()
+    tr = tr.where(tr.notna(), (high - previous).abs())
+    tr = tr.where(tr.notna(), (low - previous).abs())
+    tr_sum = rolling_sum(tr, period)
+    vi_plus = rolling_sum((high - low.shift()).abs(), period) / tr_sum
+    vi_minus = rolling_sum((low - high.shift()).abs(), period) / tr_sum
+    return vi_plus, vi_minus
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from backtest.corporate_actions import PRICE_FIELDS, VOLUME_FIELDS
+
+# Gap policies for bars without a usable close (NaN, zero or negative)
+GAP_POLICIES = ('ffill', 'drop')
+# How several symbols with different calendars are put on one index
+ALIGN_MODES = ('inner', 'outer')
+ACTION_FIELDS = ('Dividends', 'Stock Splits')
+
+
+class BarContractError(ValueError):
+    """Raised when bars cannot be brought into the form the engine expects."""
+
+
+def flatten_columns(data, symbol=None):
+    """
+    Returns `data` with one column level. yfinance puts the fields and the
+    tickers on two levels ((Price, Ticker), in either order); the ticker
+    level is dropped, selecting `symbol` when it holds several tickers.
+    """
+    if not isinstance(data.columns, pd.MultiIndex):
+        return data
+    if data.columns.nlevels != 2:
+        raise BarContractError(f"Expected at most two column levels, got {data.columns.nlevels}")
+    field_level = 0 if 'Close' in data.columns.get_level_values(0) else 1
+    ticker_level = 1 - field_level
+    tickers = data.columns.get_level_values(ticker_level).unique()
+    if len(tickers) == 1:
+        flat = data.copy(deep=False)
+        flat.columns = data.columns.get_level_values(field_level)
+        return flat
+    if symbol not in tickers:
+        raise BarContractError(f"Symbol {symbol!r} not in the data's tickers {list(tickers)}")
+    return data.xs(symbol, axis=1, level=ticker_level)
+
+
+def tickers(data):
+    """Ticker names of a multi-ticker yfinance frame, or None for one symbol."""
+    if not isinstance(data.columns, pd.MultiIndex) or data.columns.nlevels != 2:
+        return None
+    field_level = 0 if 'Close' in data.columns.get_level_values(0) else 1
+    names = list(data.columns.get_level_values(1 - field_level).unique())
+    return names if len(names) > 1 else None
+
+
+def normalize_bars(data, symbol=None, gaps='ffill'):
+    """
+    Brings one symbol's bars into the contract checked by `validate_bars`:
+
+    - flat columns with at least Open, High, Low, Close and Volume
+    - float64 price and volume columns, split/dividend columns with 0 for none
+    - a sorted DatetimeIndex without duplicates (the last row wins)
+    - a finite, positive close on every bar
+
+    Bars without a usable close are dropped at the start of the history;
+    later ones are dropped (`gaps='drop'`) or repeat the previous close
+    with zero volume (`gaps='ffill'`). Missing open/high/low values take
+    the close and missing volumes are 0. Missing calendar days are not
+    filled in. The input is never modified.
+    """
+    if gaps not in GAP_POLICIES:
+        raise ValueError(f"Unknown gap policy '{gaps}', expected one of {GAP_POLICIES}")
+    data = flatten_columns(data, symbol)
+    missing = [f for f in PRICE_FIELDS + VOLUME_FIELDS if f not in data.columns]
+    if missing:
+        raise BarContractError(f"Bars for {symbol or 'data'} are missing columns {missing}")
+    if data.columns.has_duplicates:
+        raise BarContractError(f"Bars for {symbol or 'data'} have duplicate columns")
+
+    data = data.copy()
+    if not isinstance(data.index, pd.DatetimeIndex):
+        data.index = pd.to_datetime(data.index)
+    if not data.index.is_monotonic_increasing:
+        data = data.sort_index(kind='stable')
+    if data.index.has_duplicates:
+        data = data[~data.index.duplicated(keep='last')]
+
+    for field in PRICE_FIELDS + VOLUME_FIELDS + ('Adj Close',) + ACTION_FIELDS:
+        if field in data.columns and data[field].dtype != np.float64:
+            data[field] = pd.to_numeric(data[field], errors='coerce').astype(np.float64)
+    for field in ACTION_FIELDS:
+        if field in data.columns and data[field].hasnans:
+            data[field] = data[field].fillna(0.0)
+
+    close = data['Close'].to_numpy()
+    valid = np.isfinite(close) & (close > 0)
+    if not valid.all():
+        if gaps == 'drop' or not valid.any():
+            data = data[valid]
+        else:
+            # Nothing to carry forward before the first good close
+            first = int(np.argmax(valid))
+            data = data.iloc[first:].copy()
+            bad = ~valid[first:]
+            data.loc[bad, 'Close'] = np.nan
+            data['Close'] = data['Close'].ffill()
+            for field in ('Open', 'High', 'Low'):
+                data.loc[bad, field] = np.nan
+            data.loc[bad, 'Volume'] = 0.0
+            if 'Adj Close' in data.columns:
+                data['Adj Close'] = data['Adj Close'].ffill()
+
+    for field in ('Open', 'High', 'Low'):
+        if data[field].hasnans:
+            data[field] = data[field].fillna(data['Close'])
+    if data['Volume'].hasnans:
+        data['Volume'] = data['Volume'].fillna(0.0)
+    return data
+
+
+def validate_bars(data, symbol=None):
+    """Raises BarContractError unless `data` satisfies the bar contract (see normalize_bars)."""
+    name = symbol or 'data'
+    if isinstance(data.columns, pd.MultiIndex):
+        raise BarContractError(f"Bars for {name} have multi-level columns")
+    missing = [f for f in PRICE_FIELDS + VOLUME_FIELDS if f not in data.columns]
+    if missing:
+        raise BarContractError(f"Bars for {name} are missing columns {missing}")
+    if not isinstance(data.index, pd.DatetimeIndex):
+        raise BarContractError(f"Bars for {name} need a DatetimeIndex")
+    if not data.index.is_monotonic_increasing or data.index.has_duplicates:
+        raise BarContractError(f"Bars for {name} must have sorted, unique timestamps")
+    for field in PRICE_FIELDS + VOLUME_FIELDS:
+        if data[field].dtype.kind != 'f':
+            raise BarContractError(f"Column {field} of {name} is {data[field].dtype}, expected float")
+        if data[field].isna().any():
+            raise BarContractError(f"Column {field} of {name} has missing values")
+    if not (data['Close'] > 0).all() or not np.isfinite(data['Close'].to_numpy()).all():
+        raise BarContractError(f"Bars for {name} have non-positive or infinite closes")
+
+
+def align_frames(frames, how='inner'):
+    """
+    Puts several symbols' bars on one index: the dates all of them trade
+    ('inner') or every date from the latest first bar on ('outer'), where a
+    symbol without a bar repeats its last close with zero volume.
+    """
+    if how not in ALIGN_MODES:
+        raise ValueError(f"Unknown alignment '{how}', expected one of {ALIGN_MODES}")
+    unique = {id(f): f for f in frames.values()}
+    if len(unique) <= 1:
+        return dict(frames)
+    indexes = [f.index for f in unique.values()]
+    index = indexes[0]
+    for other in indexes[1:]:
+        index = index.intersection(other) if how == 'inner' else index.union(other)
+    if how == 'outer':
+        index = index[index >= max(ix[0] for ix in indexes if len(ix))]
+
+    aligned = {}
+    for key, frame in unique.items():
+        if frame.index.equals(index):
+            aligned[key] = frame
+        elif how == 'inner':
+            aligned[key] = frame.loc[index]
+        else:
+            filled = frame.reindex(index)
+            absent = ~index.isin(frame.index)
+            filled['Close'] = filled['Close'].ffill()
+            for field in ('Open', 'High', 'Low'):
+                filled[field] = filled[field].fillna(filled['Close'])
+            filled.loc[absent, 'Volume'] = 0.0
+            for field in ACTION_FIELDS:
+                if field in filled.columns:
+                    filled[field] = filled[field].fillna(0.0)
+            if 'Adj Close' in filled.columns:
+                filled['Adj Close'] = filled['Adj Close'].ffill()
+            aligned[key] = filled
+    return {s: aligned[id(f)] for s, f in frames.items()}
+
+
+def ingest(data, symbol_list, gaps='ffill', align='inner'):
+    """
+    Normalizes the bars a data handler is given, once, and returns
+    {symbol: frame}. `data` is one frame used for every symbol (flat or
+    single-ticker yfinance columns), a multi-ticker yfinance frame, or a
+    {symbol: frame} dict. Symbols given the same frame share the result.
+    Several different frames are aligned on one index (`align_frames`).
+    """
+    if isinstance(data, dict):
+        sources = {s: data[s] for s in symbol_list}
+    elif tickers(data) is not None:
+        sources = {s: (data, s) for s in symbol_list}
+    else:
+        sources = {s: data for s in symbol_list}
+
+    normalized = {}
+    frames = {}
+    for s, source in sources.items():
+        frame, symbol = source if isinstance(source, tuple) else (source, s)
+        key = (id(frame), symbol if isinstance(source, tuple) else None)
+        if key not in normalized:
+            normalized[key] = normalize_bars(frame, symbol, gaps)
+        frames[s] = normalized[key]
+    return align_frames(frames, align)
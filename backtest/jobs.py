@@ -0,0 +1,276 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+
+JOB_STATES = ('pending', 'running', 'done', 'failed')
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the manager already holds `max_pending` unfinished jobs."""
+
+
+def normalize_request(request):
+    """
+    Validates a job request and fills in defaults. Strategies are registry
+    names or {"name": ..., "params": {...}} objects. The result is what the
+    dedupe key is computed from, so two requests that differ only in
+    spelling out a default share a job.
+    """
+    from backtest.corporate_actions import ADJUST_MODES
+    from backtest.registry import default_registry
+
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    missing = [k for k in ('ticker', 'start_date', 'end_date', 'strategies') if not request.get(k)]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    registry = default_registry()
+    strategies = []
+    for entry in request['strategies']:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        if not isinstance(entry, dict):
+            raise ValueError("Strategy entries must be names or objects")
+        name = entry.get('name')
+        if name not in registry:
+            raise ValueError(f"Unknown strategy: {name}")
+        params = dict(registry[name].params)
+        params.update(entry.get('params') or {})
+        strategies.append({'name': name, 'params': params})
+
+    adjust = request.get('adjust', 'all')
+    if adjust not in ADJUST_MODES:
+        raise ValueError(f"Unknown adjustment mode '{adjust}', expected one of {ADJUST_MODES}")
+    return {
+        'ticker': str(request['ticker']).upper(),
+        'start_date': str(pd.Timestamp(request['start_date']).date()),
+        'end_date': str(pd.Timestamp(request['end_date']).date()),
+        'initial_capital': float(request.get('initial_capital', 100000.0)),
+        'position_size': float(request.get('position_size', 0.02)),
+        'adjust': adjust,
+        'strategies': strategies,
+    }
+
+
+def request_key(request):
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+@lru_cache(maxsize=16)
+def _load_data(ticker, start_date, end_date, data_dir):
+    # Per worker process: the strategies of one job usually land on the same
+    # few processes, so each ticker is downloaded once rather than per strategy
+    if data_dir is not None:
+        from backtest.distributed import load_local_data
+        return load_local_data(data_dir, ticker, start_date, end_date)
+    from backtest.runner import load_stock_data
+    return load_stock_data(ticker, start_date, end_date)
+
+
+def _warm_worker():
+    import backtest.registry
+    import backtest.runner  # noqa: F401
+
+
+def run_job_strategy(request, name, params, data_dir=None):
+    """
+    Runs one strategy of a normalized request in a worker process and
+    returns its result record (name, params, performance, equity_curve,
+    trade_log).
+    """
+    from backtest.corporate_actions import CorporateActions
+    from backtest.registry import default_registry
+    from backtest.runner import run_strategy
+
+    data = _load_data(request['ticker'], request['start_date'], request['end_date'], data_dir)
+    if data is None or data.empty:
+        raise ValueError(f"No data for {request['ticker']}")
+    corporate_actions = CorporateActions.from_yfinance(data, request['ticker'])
+    result = run_strategy(default_registry()[name], data.copy(), request['ticker'], request['start_date'],
+                          request['initial_capital'], request['position_size'], params,
+                          corporate_actions, request['adjust'])
+    result['params'] = params
+    return result
+
+
+class Job:
+    """
+    One submitted request. Each strategy runs as its own pool task, so
+    progress is reported per finished strategy. `events` is an append-only
+    log of progress records that streaming clients read from an offset.
+    """
+    def __init__(self, job_id, key, request):
+        self.job_id = job_id
+        self.key = key
+        self.request = request
+        self.state = 'pending'
+        self.submitted = time.time()
+        self.finished = None
+        self.results = {}
+        self.errors = {}
+        self.events = []
+        self._lock = threading.Lock()
+
+    @property
+    def total(self):
+        return len(self.request['strategies'])
+
+    @property
+    def completed(self):
+        return len(self.results) + len(self.errors)
+
+    def _record(self, name, result=None, error=None):
+        with self._lock:
+            if error is not None:
+                self.errors[name] = error
+            else:
+                self.results[name] = result
+            done = self.completed == self.total
+            self.state = ('failed' if not self.results else 'done') if done else 'running'
+            # The event goes in before `finished` is set: event streams read
+            # both without the lock and stop once finished with none unread
+            self.events.append({'strategy': name, 'ok': error is None, 'error': error, **self._progress()})
+            if done:
+                self.finished = time.time()
+
+    def _progress(self):
+        return {'state': self.state, 'completed': self.completed, 'total': self.total}
+
+    def status(self):
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'request': self.request,
+                'submitted': self.submitted,
+                'finished': self.finished,
+                'errors': dict(self.errors),
+                **self._progress(),
+            }
+
+    def ordered_results(self):
+        """Results in the order the strategies were requested."""
+        return [self.results[s['name']] for s in self.request['strategies'] if s['name'] in self.results]
+
+    def summary_frame(self):
+        rows = []
+        for result in self.ordered_results():
+            row = {'ticker': self.request['ticker'], 'strategy': result['name'], 'params': json.dumps(result['params'])}
+            row.update({k: (v.item() if hasattr(v, 'item') else v) for k, v in result['performance'].items()})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def equity_frame(self):
+        """Long format: one row per (strategy, datetime) with total and equity_curve."""
+        frames = []
+        for result in self.ordered_results():
+            curve = result['equity_curve'][['total', 'equity_curve']].rename_axis('datetime').reset_index()
+            curve.insert(0, 'strategy', result['name'])
+            frames.append(curve)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['strategy', 'datetime', 'total', 'equity_curve'])
+
+    def trades_frame(self):
+        from backtest.visualization import trade_log_frame
+        frames = []
+        for result in self.ordered_results():
+            trades = trade_log_frame(result['trade_log'])
+            trades.insert(0, 'strategy', result['name'])
+            frames.append(trades)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class JobManager:
+    """
+    Runs job requests on a bounded process pool.
+
+    Identical requests submitted while a matching job is pending or running
+    are attached to that job instead of being run again; with
+    `submit(..., reuse=True)` a retained finished job is returned as well,
+    so an unchanged request is never re-run (resubmit without `reuse` to
+    retry a failed one). At most
+    `max_pending` jobs may be unfinished at once; beyond that `submit`
+    raises JobQueueFull so callers can shed load. Finished jobs are kept
+    for `retention` seconds.
+
+    `on_update(job)` is called from the pool's callback thread whenever a
+    strategy finishes; the HTTP server uses it to wake streaming clients.
+    """
+    def __init__(self, max_workers=None, max_pending=64, retention=3600.0, data_dir=None, on_update=None):
+        # spawn: the server process runs an event loop and callback threads,
+        # which do not survive a fork
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self.max_pending = max_pending
+        self.retention = retention
+        self.data_dir = data_dir
+        self.on_update = on_update
+        self.jobs = {}
+        self._inflight = {}
+        self._completed = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request, reuse=False):
+        """
+        Returns (job, created). `created` is False when the request was
+        attached to an identical unfinished job, or with `reuse` to an
+        identical finished one.
+        """
+        request = normalize_request(request)
+        key = request_key(request)
+        with self._lock:
+            self._expire()
+            job = self._inflight.get(key) or (self._completed.get(key) if reuse else None)
+            if job is not None:
+                return job, False
+            if len(self._inflight) >= self.max_pending:
+                raise JobQueueFull(f"{len(self._inflight)} jobs already queued")
+            job = Job(uuid.uuid4().hex, key, request)
+            self.jobs[job.job_id] = job
+            self._inflight[key] = job
+
+        for strategy in request['strategies']:
+            future = self.pool.submit(run_job_strategy, request, strategy['name'], strategy['params'], self.data_dir)
+            future.add_done_callback(lambda f, name=strategy['name']: self._finished(job, name, f))
+        return job, True
+
+    def _finished(self, job, name, future):
+        try:
+            job._record(name, result=future.result())
+        except Exception as exc:
+            job._record(name, error=f"{type(exc).__name__}: {exc}")
+        if job.finished is not None:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+                self._completed[job.key] = job
+        if self.on_update is not None:
+            self.on_update(job)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j for j, job in self.jobs.items() if job.finished is not None and job.finished < cutoff]:
+            job = self.jobs.pop(job_id)
+            if self._completed.get(job.key) is job:
+                del self._completed[job.key]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def warm(self):
+        """
+        Starts the worker processes and imports the engine in each, so the
+        first job does not pay for process start-up. Returns immediately.
+        """
+        for _ in range(self.max_workers):
+            self.pool.submit(_warm_worker)
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait, cancel_futures=not wait)
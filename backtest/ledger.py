@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+
+# Storage precision for bars, indicators and per-bar holdings. Cash, P&L
+# and portfolio totals are always accumulated in float64.
+PRECISIONS = {'float64': np.float64, 'float32': np.float32}
+
+
+def precision_dtype(precision):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {tuple(PRECISIONS)}")
+    return PRECISIONS[precision]
+
+
+class TradeLedger:
+    """
+    Columnar record of every FillEvent. Fills are written straight into
+    preallocated NumPy arrays (symbols and exchanges as integer codes), so
+    recording a fill allocates nothing per fill and the whole log can be
+    handed to pandas or Arrow without copying.
+
+    Iterating or indexing the ledger still yields one dict per fill (a list
+    of them for a slice), which keeps code written against the old
+    list-of-dicts trade log working.
+    """
+    COLUMNS = ('timeindex', 'symbol', 'exchange', 'quantity', 'direction', 'fill_cost', 'commission')
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        self.symbols = []
+        self._symbol_codes = {}
+        self.exchanges = []
+        self._exchange_codes = {}
+        self.timeindex = np.empty(capacity, dtype=np.int64)
+        self.symbol = np.empty(capacity, dtype=np.int32)
+        self.exchange = np.empty(capacity, dtype=np.int32)
+        self.quantity = np.empty(capacity, dtype=np.float64)
+        self.side = np.empty(capacity, dtype=np.int8)
+        self.fill_cost = np.empty(capacity, dtype=np.float64)
+        self.commission = np.empty(capacity, dtype=np.float64)
+
+    def _grow(self):
+        capacity = 2 * len(self.timeindex)
+        for name in ('timeindex', 'symbol', 'exchange', 'quantity', 'side', 'fill_cost', 'commission'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    @staticmethod
+    def _code(value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, fill):
+        if self.size == len(self.timeindex):
+            self._grow()
+        i = self.size
+        self.timeindex[i] = pd.Timestamp(fill.timeindex).value
+        self.symbol[i] = self._code(fill.symbol, self.symbols, self._symbol_codes)
+        self.exchange[i] = self._code(fill.exchange, self.exchanges, self._exchange_codes)
+        self.quantity[i] = fill.quantity
+        self.side[i] = 1 if fill.direction == 'BUY' else -1
+        self.fill_cost[i] = float(fill.fill_cost)
+        self.commission[i] = float(fill.commission)
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.size))]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return {
+            'type': 'FILL',
+            'timeindex': pd.Timestamp(self.timeindex[i]),
+            'symbol': self.symbols[self.symbol[i]],
+            'exchange': self.exchanges[self.exchange[i]],
+            'quantity': self.quantity[i],
+            'direction': 'BUY' if self.side[i] > 0 else 'SELL',
+            'fill_cost': self.fill_cost[i],
+            'commission': self.commission[i],
+        }
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def _column(self, name):
+        return getattr(self, name)[:self.size]
+
+    def to_dataframe(self):
+        n = self.size
+        return pd.DataFrame({
+            'timeindex': self._column('timeindex').view('datetime64[ns]'),
+            'symbol': pd.Categorical.from_codes(self._column('symbol'), categories=self.symbols) if n else [],
+            'exchange': pd.Categorical.from_codes(self._column('exchange'), categories=self.exchanges) if n else [],
+            'quantity': self._column('quantity'),
+            'direction': np.where(self._column('side') > 0, 'BUY', 'SELL'),
+            'fill_cost': self._column('fill_cost'),
+            'commission': self._column('commission'),
+        })
+
+    def to_arrow(self):
+        """
+        Arrow table over the ledger's buffers. Numeric columns are wrapped,
+        not copied; symbol and exchange become dictionary arrays.
+        """
+        import pyarrow as pa
+        side = self._column('side')
+        directions = pa.DictionaryArray.from_arrays(pa.array((side < 0).astype(np.int8)), pa.array(['BUY', 'SELL']))
+        return pa.table({
+            'timeindex': pa.array(self._column('timeindex').view('datetime64[ns]')),
+            'symbol': pa.DictionaryArray.from_arrays(pa.array(self._column('symbol')), pa.array(self.symbols, pa.string())),
+            'exchange': pa.DictionaryArray.from_arrays(pa.array(self._column('exchange')), pa.array(self.exchanges, pa.string())),
+            'quantity': pa.array(self._column('quantity')),
+            'direction': directions,
+            'fill_cost': pa.array(self._column('fill_cost')),
+            'commission': pa.array(self._column('commission')),
+        })
+
+    def to_parquet(self, path):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    def round_trips(self):
+        """
+        Pairs buys with later sells per symbol in FIFO order and returns one
+        row per matched lot: entry/exit time and price, quantity, holding
+        period, P&L net of pro-rated commission and return.
+
+        All symbols are matched in one pass: each symbol's cumulative bought
+        and sold quantities are laid end to end on a single axis, every
+        point where either total changes starts a new lot, and the buy and
+        sell covering each lot are found with searchsorted. Quantity still
+        open at the end of the ledger is not reported.
+        """
+        n = self.size
+        columns = ['symbol', 'entry_time', 'exit_time', 'quantity', 'entry_price', 'exit_price',
+                   'holding_period', 'pnl', 'return']
+        if n == 0:
+            return pd.DataFrame(columns=columns)
+
+        sym = self._column('symbol').astype(np.int64)
+        side = self._column('side')
+        qty = self._column('quantity')
+        price = self._column('fill_cost') / np.where(qty != 0, qty, 1.0)
+        commission_per_unit = self._column('commission') / np.where(qty != 0, qty, 1.0)
+        n_sym = len(self.symbols)
+
+        # Stable sort keeps fills of a symbol in time (arrival) order
+        buys = np.flatnonzero(side > 0)
+        sells = np.flatnonzero(side < 0)
+        buys = buys[np.argsort(sym[buys], kind='stable')]
+        sells = sells[np.argsort(sym[sells], kind='stable')]
+
+        total_bought = np.bincount(sym[buys], weights=qty[buys], minlength=n_sym)
+        total_sold = np.bincount(sym[sells], weights=qty[sells], minlength=n_sym)
+        closed = np.minimum(total_bought, total_sold)
+        base = np.r_[0.0, np.cumsum(closed)[:-1]]
+
+        def cumulative(idx):
+            # Running quantity within each symbol, clipped to what was closed
+            # and shifted to the symbol's slot on the shared axis
+            running = np.cumsum(qty[idx])
+            group_start = np.r_[0, np.flatnonzero(np.diff(sym[idx])) + 1]
+            start_totals = np.r_[0.0, running[group_start[1:] - 1]]
+            running -= np.repeat(start_totals, np.diff(np.r_[group_start, len(idx)]))
+            return base[sym[idx]] + np.minimum(running, closed[sym[idx]])
+
+        buy_cum = cumulative(buys)
+        sell_cum = cumulative(sells)
+        points = np.unique(np.concatenate((buy_cum, sell_cum, base + closed)))
+        points = points[points > 0]
+        lot_qty = np.diff(np.r_[0.0, points])
+        keep = lot_qty > 1e-12
+        points, lot_qty = points[keep], lot_qty[keep]
+
+        entry = buys[np.searchsorted(buy_cum, points, side='left')]
+        exit_ = sells[np.searchsorted(sell_cum, points, side='left')]
+
+        entry_time = self._column('timeindex')[entry].view('datetime64[ns]')
+        exit_time = self._column('timeindex')[exit_].view('datetime64[ns]')
+        cost = price[entry] * lot_qty
+        pnl = (price[exit_] - price[entry]) * lot_qty - (commission_per_unit[entry] + commission_per_unit[exit_]) * lot_qty
+
+        return pd.DataFrame({
+            'symbol': np.asarray(self.symbols, dtype=object)[sym[entry]],
+            'entry_time': entry_time,
+            'exit_time': exit_time,
+            'quantity': lot_qty,
+            'entry_price': price[entry],
+            'exit_price': price[exit_],
+            'holding_period': exit_time - entry_time,
+            'pnl': pnl,
+            'return': np.where(cost != 0, pnl / np.where(cost != 0, cost, 1.0), 0.0),
+        }, columns=columns)
+
+
+class CompactLedger:
+    """
+    Per-bar portfolio rows (positions or holdings) in NumPy columns: one
+    `dtype` column per symbol, float64 for the portfolio-level `fields`
+    (cash, commission, total). Used by Portfolio in float32 mode in place
+    of a list of dicts; appending and iterating still speak dicts.
+    """
+    def __init__(self, symbols, fields=(), dtype=np.float32, capacity=1024):
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.size = 0
+        self.tz = None
+        self.datetime = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, len(self.symbols)), dtype=dtype)
+        self.totals = np.empty((capacity, len(self.fields)), dtype=np.float64)
+
+    def _grow(self):
+        for name in ('datetime', 'values', 'totals'):
+            old = getattr(self, name)
+            new = np.empty((2 * len(old),) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, row):
+        if self.size == len(self.datetime):
+            self._grow()
+        i = self.size
+        timestamp = pd.Timestamp(row['datetime'])
+        if i == 0:
+            self.tz = timestamp.tz
+        self.datetime[i] = timestamp.value
+        self.values[i] = [row[s] for s in self.symbols]
+        self.totals[i] = [row[f] for f in self.fields]
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.size))]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        row = dict(zip(self.symbols, self.values[i].tolist()))
+        row['datetime'] = pd.Timestamp(self.datetime[i], tz=self.tz) if self.tz else pd.Timestamp(self.datetime[i])
+        row.update(zip(self.fields, self.totals[i].tolist()))
+        return row
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def to_frame(self):
+        """Same layout as pd.DataFrame(list_of_dicts): symbols, datetime, fields."""
+        frame = pd.DataFrame(self.values[:self.size], columns=self.symbols)
+        datetime = pd.DatetimeIndex(self.datetime[:self.size].view('datetime64[ns]'))
+        frame['datetime'] = datetime.tz_localize('UTC').tz_convert(self.tz) if self.tz else datetime
+        for j, field in enumerate(self.fields):
+            frame[field] = self.totals[:self.size, j]
+        return frame
@@ -0,0 +1,287 @@
+import itertools
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class ParamSpace:
+    """
+    Search space for a strategy's parameters. Each entry is either a list
+    of choices or a (low, high) range; ranges of ints stay ints.
+
+        ParamSpace({'ema_period': (10, 60), 'atr_period': (5, 30), 'atr_multiplier': (1.0, 3.5)})
+
+    `constraint(params)` rejects invalid combinations, e.g. unordered
+    moving average periods.
+    """
+    def __init__(self, space, constraint=None):
+        self.space = dict(space)
+        self.constraint = constraint
+
+    def _valid(self, params):
+        return self.constraint is None or self.constraint(params)
+
+    def _draw(self, name, rng):
+        values = self.space[name]
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                return int(rng.integers(low, high + 1))
+            return float(rng.uniform(low, high))
+        return values[int(rng.integers(len(values)))]
+
+    def sample(self, rng, max_tries=1000):
+        for _ in range(max_tries):
+            params = {name: self._draw(name, rng) for name in self.space}
+            if self._valid(params):
+                return params
+        raise ValueError("No valid parameters found; check the constraint")
+
+    def mutate(self, params, rng, scale=0.2, max_tries=100):
+        """
+        Moves each parameter with probability 1/2: ranges by a Gaussian step
+        of `scale` times their width, choices to a neighbouring value.
+        """
+        for _ in range(max_tries):
+            child = dict(params)
+            for name, values in self.space.items():
+                if rng.random() >= 0.5:
+                    continue
+                if isinstance(values, tuple):
+                    low, high = values
+                    value = child[name] + rng.normal(0.0, scale * (high - low))
+                    value = min(max(value, low), high)
+                    child[name] = int(round(value)) if isinstance(low, int) and isinstance(high, int) else float(value)
+                else:
+                    i = values.index(child[name]) + int(rng.choice((-1, 1)))
+                    child[name] = values[min(max(i, 0), len(values) - 1)]
+            if child != params and self._valid(child):
+                return child
+        return self.sample(rng)
+
+    def crossover(self, a, b, rng, max_tries=100):
+        for _ in range(max_tries):
+            child = {name: (a if rng.random() < 0.5 else b)[name] for name in self.space}
+            if self._valid(child):
+                return child
+        return dict(a)
+
+    def grid(self, points=5):
+        """Full grid; ranges are split into `points` values."""
+        axes = []
+        for values in self.space.values():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    axes.append(sorted(set(np.linspace(low, high, points).round().astype(int).tolist())))
+                else:
+                    axes.append(np.linspace(low, high, points).tolist())
+            else:
+                axes.append(list(values))
+        grid = [dict(zip(self.space, combo)) for combo in itertools.product(*axes)]
+        return [p for p in grid if self._valid(p)]
+
+
+def _key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+# Worker processes receive the data once through the pool initializer
+_WORKER = {}
+
+
+def _init_worker(data, ticker, spec_args, start_date, initial_capital, position_size, metric):
+    _WORKER.update(data=data, ticker=ticker, spec_args=spec_args, start_date=start_date,
+                   initial_capital=initial_capital, position_size=position_size, metric=metric)
+
+
+def _worker_evaluate(params, n_bars):
+    from backtest.registry import StrategySpec
+    w = _WORKER
+    return evaluate(StrategySpec(*w['spec_args']), params, w['data'], w['ticker'], n_bars, w['start_date'],
+                    w['initial_capital'], w['position_size'], w['metric'])
+
+
+def evaluate(spec, params, data, ticker, n_bars, start_date=None, initial_capital=100000.0, position_size=0.02,
+             metric='Sharpe Ratio'):
+    """
+    Backtests `params` on the first `n_bars` bars of `data` and returns the
+    metric from get_performance_metrics (NaN counts as -inf). The run is
+    metrics-only: no equity curve is built.
+    """
+    from backtest.runner import run_metrics
+
+    prefix = data.iloc[:n_bars].copy()
+    start_date = prefix.index[0] if start_date is None else start_date
+    score = float(run_metrics(prefix, ticker, spec.load(), params, start_date, initial_capital, position_size)[metric])
+    return score if np.isfinite(score) else -np.inf
+
+
+class Optimizer:
+    """
+    Adaptive parameter search for one registry strategy on one symbol.
+
+    Candidates are scored on a prefix of the history (the budget, in bars);
+    only the best 1/eta of each rung is re-run on an eta-times longer
+    prefix, so bad parameter sets are dropped after a fraction of the cost
+    of a full run. `hyperband` repeats successive halving with different
+    trade-offs between the number of candidates and the starting prefix.
+
+    `sampler='evolutionary'` draws part of each new bracket by mutating and
+    recombining the best candidates seen at the longest prefix so far;
+    'random' samples the space uniformly.
+
+    Every evaluation is memoised per (params, bars), and `cost` counts the
+    bars simulated so runs can be compared with a full grid
+    (`grid_cost`).
+    """
+    def __init__(self, spec, space, data, ticker, start_date=None, initial_capital=100000.0, position_size=0.02,
+                 metric='Sharpe Ratio', min_bars=None, eta=3, sampler='evolutionary', seed=None, n_jobs=1):
+        if isinstance(spec, str):
+            from backtest.registry import default_registry
+            spec = default_registry()[spec]
+        if sampler not in ('random', 'evolutionary'):
+            raise ValueError(f"Unknown sampler '{sampler}', expected 'random' or 'evolutionary'")
+        self.spec = spec
+        self.space = space
+        self.data = data
+        self.ticker = ticker
+        self.start_date = start_date
+        self.initial_capital = initial_capital
+        self.position_size = position_size
+        self.metric = metric
+        self.eta = eta
+        self.sampler = sampler
+        self.rng = np.random.default_rng(seed)
+        self.max_bars = len(data)
+        self.min_bars = min_bars or max(60, self.max_bars // eta ** 3)
+        self.n_jobs = n_jobs
+        self.trials = []
+        self.cost = 0
+        self._scores = {}
+        self._pool = None
+
+    def _warmup(self, params):
+        # A prefix shorter than the lookback can never trade, so it says
+        # nothing about the parameters
+        lookback = self.spec.required_lookback(params) or 1
+        return lookback + 20
+
+    def _run(self, candidates, n_bars, bracket, rung):
+        jobs = []
+        for params in candidates:
+            bars = min(self.max_bars, max(n_bars, self._warmup(params)))
+            jobs.append((params, bars))
+        todo = list({(_key(p), b): (p, b) for p, b in jobs if (_key(p), b) not in self._scores}.values())
+
+        if self.n_jobs != 1 and len(todo) > 1:
+            if self._pool is None:
+                spec_args = (self.spec.name, self.spec.module, self.spec.class_name, self.spec.params)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=None if self.n_jobs == -1 else self.n_jobs, initializer=_init_worker,
+                    initargs=(self.data, self.ticker, spec_args, self.start_date, self.initial_capital,
+                              self.position_size, self.metric))
+            scores = list(self._pool.map(_worker_evaluate, *zip(*todo)))
+        else:
+            scores = [evaluate(self.spec, p, self.data, self.ticker, b, self.start_date, self.initial_capital,
+                               self.position_size, self.metric) for p, b in todo]
+        for (params, bars), score in zip(todo, scores):
+            self._scores[(_key(params), bars)] = score
+            self.cost += bars
+
+        results = []
+        for params, bars in jobs:
+            score = self._scores[(_key(params), bars)]
+            self.trials.append({'bracket': bracket, 'rung': rung, 'bars': bars, 'score': score, 'params': params})
+            results.append(score)
+        return results
+
+    def _sample(self, n):
+        if self.sampler == 'random' or not self.trials:
+            return [self.space.sample(self.rng) for _ in range(n)]
+        # Parents: the best tenth of the candidates at the longest prefix
+        # reached so far, at least two
+        longest = max(t['bars'] for t in self.trials)
+        ranked = sorted((t for t in self.trials if t['bars'] == longest), key=lambda t: -t['score'])
+        parents = [t['params'] for t in ranked[:max(2, len(ranked) // 10)]]
+        candidates = []
+        for _ in range(n):
+            # Keep a third random to avoid collapsing onto one region
+            u = self.rng.random()
+            if u < 1 / 3 or len(parents) < 2:
+                candidates.append(self.space.sample(self.rng))
+            elif u < 2 / 3:
+                candidates.append(self.space.mutate(parents[int(self.rng.integers(len(parents)))], self.rng))
+            else:
+                a, b = self.rng.choice(len(parents), 2, replace=False)
+                candidates.append(self.space.mutate(self.space.crossover(parents[a], parents[b], self.rng), self.rng, 0.1))
+        return candidates
+
+    def successive_halving(self, candidates, min_bars=None, bracket=0):
+        """
+        Runs `candidates` through rungs of growing prefixes until the full
+        history; returns the survivors of the last rung with their scores.
+        """
+        n_bars = min_bars or self.min_bars
+        # Rung budgets are max_bars / eta**k so the last rung is the full
+        # history rather than a rounded-down multiple of the first
+        n_rungs = max(0, int(math.floor(math.log(self.max_bars / n_bars, self.eta) + 1e-9)))
+        for rung in range(n_rungs + 1):
+            bars = int(round(self.max_bars * self.eta ** (rung - n_rungs)))
+            scores = self._run(candidates, bars, bracket, rung)
+            if rung == n_rungs or len(candidates) <= 1:
+                break
+            keep = max(1, len(candidates) // self.eta)
+            order = np.argsort(-np.asarray(scores), kind='stable')[:keep]
+            candidates = [candidates[i] for i in order]
+        return sorted(zip(scores, candidates), key=lambda x: -x[0])
+
+    def hyperband(self, iterations=1):
+        """
+        Runs `iterations` sweeps of Hyperband brackets and returns
+        (best_params, best_score) at the full history.
+        """
+        try:
+            s_max = max(0, int(math.floor(math.log(self.max_bars / self.min_bars, self.eta) + 1e-9)))
+            for _ in range(iterations):
+                for s in range(s_max, -1, -1):
+                    n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                    self.successive_halving(self._sample(n), self.max_bars / self.eta ** s, bracket=s)
+        finally:
+            self.close()
+        return self.best()
+
+    def best(self):
+        full = [t for t in self.trials if t['bars'] == self.max_bars]
+        if not full:
+            return None, -np.inf
+        top = max(full, key=lambda t: t['score'])
+        return top['params'], top['score']
+
+    def grid_cost(self, points=5):
+        """Bars a full grid search over the same space would simulate."""
+        return len(self.space.grid(points)) * self.max_bars
+
+    def trials_frame(self):
+        return pd.DataFrame(self.trials)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def grid_search(spec, space, data, ticker, points=5, **kwargs):
+    """
+    Exhaustive baseline: every grid point on the full history. Returns a
+    DataFrame of params and scores sorted best first.
+    """
+    if isinstance(spec, str):
+        from backtest.registry import default_registry
+        spec = default_registry()[spec]
+    grid = space.grid(points)
+    scores = [evaluate(spec, params, data, ticker, len(data), **kwargs) for params in grid]
+    return pd.DataFrame({'params': grid, 'score': scores}).sort_values('score', ascending=False, ignore_index=True)
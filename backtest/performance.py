@@ -59,4 +59,61 @@ def get_performance_metrics(equity_curve, trade_log, initial_capital):
         "Total Trades": len(trade_log)
     }
     
-    return metrics
\ No newline at end of file
+    return metrics
+
+class MetricsAccumulator:
+    """
+    The metrics of get_performance_metrics, updated one bar at a time so
+    they are known without keeping the equity curve: Welford mean and
+    variance of the bar returns for the Sharpe ratio, the running peak for
+    the maximum drawdown, and a fill counter. Memory stays constant however
+    long the run.
+    """
+    def __init__(self, initial_capital, trading_days=252):
+        self.initial_capital = float(initial_capital)
+        self.trading_days = trading_days
+        self.bars = 0
+        self.fills = 0
+        self.last = self.initial_capital
+        self.peak = self.initial_capital
+        self.max_drawdown = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, total):
+        """Adds the portfolio total of a new bar."""
+        if self.last:
+            r = total / self.last - 1.0
+            self.bars += 1
+            delta = r - self._mean
+            self._mean += delta / self.bars
+            self._m2 += delta * (r - self._mean)
+        if total > self.peak:
+            self.peak = total
+        elif self.peak:
+            drawdown = (total - self.peak) / self.peak
+            if drawdown < self.max_drawdown:
+                self.max_drawdown = drawdown
+        self.last = total
+
+    def record_fill(self):
+        self.fills += 1
+
+    def sharpe_ratio(self):
+        if self.bars < 2:
+            return 0.0
+        std = np.sqrt(self._m2 / (self.bars - 1))
+        if not std > 0:
+            return 0.0
+        sharpe = np.sqrt(self.trading_days) * self._mean / std
+        return 0.0 if not np.isfinite(sharpe) else float(sharpe)
+
+    def metrics(self):
+        """Same keys and units as get_performance_metrics."""
+        return {
+            "Total Return": (self.last / self.initial_capital - 1) * 100,
+            "Net Profit": self.last - self.initial_capital,
+            "Max Drawdown": self.max_drawdown * 100,
+            "Sharpe Ratio": self.sharpe_ratio(),
+            "Total Trades": self.fills
+        }
@@ -1,8 +1,12 @@
 import pandas as pd
 from backtest.event import OrderEvent
+from backtest.ledger import CompactLedger, precision_dtype
+from backtest.performance import MetricsAccumulator
 
 class Portfolio:
-    def __init__(self, data_handler, events, start_date, initial_capital=100000.0, position_size=0.02):
+    def __init__(self, data_handler, events, start_date, initial_capital=100000.0, position_size=0.02,
+                 order_type='MKT', entry_offset=0.0, take_profit_pct=None, stop_loss_pct=None, risk_manager=None,
+                 precision='float64', sizer=None, metrics_only=False):
         self.data_handler = data_handler
         self.events = events
         self.symbol_list = data_handler.symbol_list
@@ -10,6 +14,36 @@ class Portfolio:
         self.initial_capital = float(initial_capital)  # Force to float
         self.position_size = float(position_size)  # Position size as percentage of portfolio (default 2%)
 
+        # Entry order settings. Anything but plain market orders needs an
+        # execution handler with an order book (IntrabarExecutionHandler or
+        # QuoteExecutionHandler).
+        # 'LMT' entries rest entry_offset below the signal bar's close, 'STP'
+        # entries entry_offset above it; take_profit_pct/stop_loss_pct attach
+        # a bracket around the entry.
+        self.order_type = order_type
+        self.entry_offset = float(entry_offset)
+        self.take_profit_pct = take_profit_pct
+        self.stop_loss_pct = stop_loss_pct
+
+        # Optional RiskManager that trims or rejects orders before they are sent
+        self.risk_manager = risk_manager
+
+        # Optional PositionSizer (backtest.sizing) that replaces the fixed
+        # position_size fraction for new entries
+        self.sizer = sizer
+
+        # 'float32' keeps the per-bar positions and market values in compact
+        # NumPy columns instead of lists of dicts; cash, commission and
+        # totals stay float64 either way
+        self.precision = precision
+        self.dtype = precision_dtype(precision)
+
+        # Summary metrics are accumulated bar by bar (self.metrics); with
+        # metrics_only the per-bar positions and holdings are not kept at
+        # all, so a run needs the same memory however many bars it has
+        self.metrics_only = metrics_only
+        self.metrics = MetricsAccumulator(self.initial_capital)
+
         self.all_positions = self._construct_all_positions()
         self.current_positions = {s: 0.0 for s in self.symbol_list}
 
@@ -21,7 +55,7 @@ class Portfolio:
     def _construct_all_positions(self):
         d = {s: 0 for s in self.symbol_list}
         d['datetime'] = self.start_date
-        return [d]
+        return self._rows(d)
 
     def _construct_all_holdings(self):
         d = {s: 0.0 for s in self.symbol_list}
@@ -29,7 +63,14 @@ class Portfolio:
         d['cash'] = self.initial_capital
         d['commission'] = 0.0
         d['total'] = self.initial_capital
-        return [d]
+        return self._rows(d, ('cash', 'commission', 'total'))
+
+    def _rows(self, first, fields=()):
+        if self.precision == 'float64':
+            return [first]
+        rows = CompactLedger(self.symbol_list, fields, self.dtype)
+        rows.append(first)
+        return rows
 
     def _construct_current_holdings(self):
         d = {s: 0.0 for s in self.symbol_list}
@@ -39,11 +80,12 @@ class Portfolio:
         return d
 
     def update_timeindex(self, event):
-        latest_datetime = self.data_handler.get_latest_bar(self.symbol_list[0]).index[0]
+        latest_datetime = self.data_handler.get_latest_bar_datetime(self.symbol_list[0])
 
-        dp = {s: self.current_positions[s] for s in self.symbol_list}
-        dp['datetime'] = latest_datetime
-        self.all_positions.append(dp)
+        if not self.metrics_only:
+            dp = {s: self.current_positions[s] for s in self.symbol_list}
+            dp['datetime'] = latest_datetime
+            self.all_positions.append(dp)
 
         dh = {s: 0.0 for s in self.symbol_list}
         dh['datetime'] = latest_datetime
@@ -51,15 +93,21 @@ class Portfolio:
         dh['commission'] = self.current_holdings['commission']
         dh['total'] = self.current_holdings['cash']
 
-        for s in self.symbol_list:
-            close_price = self.data_handler.get_latest_bar_value(s, 'Close')
+        prices = self.data_handler.get_latest_bar_values('Close')
+        for s, close_price in zip(self.symbol_list, prices):
             if close_price is not None:
                 # Force everything to a basic Python float
                 market_value = float(self.current_positions[s]) * float(close_price)
                 dh[s] = market_value
                 dh['total'] = float(dh['total']) + market_value
 
-        self.all_holdings.append(dh)
+        if not self.metrics_only:
+            self.all_holdings.append(dh)
+        self.metrics.update(dh['total'])
+
+        if self.risk_manager is not None:
+            self.risk_manager.update([dh[s] for s in self.symbol_list],
+                                     [float(p) if p is not None else float('nan') for p in prices], dh['total'])
 
     def update_positions_from_fill(self, fill):
         fill_dir = 1 if fill.direction == 'BUY' else -1
@@ -78,40 +126,31 @@ class Portfolio:
         if event.type == 'FILL':
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
+            self.metrics.record_fill()
 
     def generate_naive_order(self, signal):
         order = None
         symbol = signal.symbol
         direction = signal.signal_type
         
-        # Get the current price of the stock
+        # Bars are validated on ingestion, so a close is always a positive
+        # number once the first bar is out
         price = self.data_handler.get_latest_bar_value(symbol, 'Close')
-        
-        # Fix for Series vs scalar value issue - handle pandas Series properly
-        # If price is a pandas Series, get its first value
-        if hasattr(price, 'iloc'):
-            try:
-                price = price.iloc[-1]  # Get the last value in the Series
-            except:
-                # If any issues, try another approach
-                try:
-                    price = float(price)
-                except:
-                    price = None
-                    
-        # Now check if price is valid
-        if price is None or pd.isna(price) or float(price) <= 0:
+        if price is None:
             return None
-            
-        # Ensure price is a float
         price = float(price)
-            
+
         # Calculate total portfolio value
         portfolio_value = float(self.current_holdings['total'])
         
         # Calculate order size based on position sizing
         # Use a percentage of the portfolio for each position
-        capital_per_trade = portfolio_value * self.position_size
+        weight = self.position_size
+        if self.sizer is not None and direction == 'LONG':
+            weight = self.sizer.size(signal, self)
+            if weight <= 0:
+                return None
+        capital_per_trade = portfolio_value * weight
         
         # Calculate quantity, ensuring it's an integer
         mkt_quantity = int(capital_per_trade / price)
@@ -125,19 +164,46 @@ class Portfolio:
         order_type = 'MKT'
 
         if direction == 'LONG' and cur_quantity == 0:
-            order = OrderEvent(symbol, order_type, mkt_quantity, 'BUY')
+            order = self._entry_order(symbol, mkt_quantity, price)
         elif direction == 'EXIT' and cur_quantity > 0:
             order = OrderEvent(symbol, order_type, abs(cur_quantity), 'SELL')
         return order
 
+    def _entry_order(self, symbol, quantity, price):
+        limit_price = stop_price = take_profit = stop_loss = None
+        if self.order_type in ('LMT', 'STPLMT'):
+            limit_price = price * (1.0 - self.entry_offset)
+        if self.order_type == 'STP':
+            stop_price = price * (1.0 + self.entry_offset)
+        if self.order_type == 'STPLMT':
+            # Buy on a break above the close, but pay no more than the stop
+            stop_price = price * (1.0 + self.entry_offset)
+            limit_price = stop_price
+        if self.take_profit_pct is not None:
+            take_profit = price * (1.0 + self.take_profit_pct)
+        if self.stop_loss_pct is not None:
+            stop_loss = price * (1.0 - self.stop_loss_pct)
+        return OrderEvent(symbol, self.order_type, quantity, 'BUY', limit_price, stop_price, take_profit, stop_loss)
+
     def update_signal(self, event):
         if event.type == 'SIGNAL':
+            if event.signal_type == 'EXIT' and self.order_type != 'MKT' and self.current_positions[event.symbol] == 0:
+                # The entry never filled: withdraw it instead of selling
+                self.events.put(OrderEvent(event.symbol, 'CANCEL', 0, 'SELL'))
+                return
             order_event = self.generate_naive_order(event)
+            if order_event and self.risk_manager is not None:
+                order_event = self.risk_manager.refine_order(order_event)
             if order_event:
                 self.events.put(order_event)
 
     def create_equity_curve_dataframe(self):
-        curve = pd.DataFrame(self.all_holdings)
+        if self.metrics_only:
+            raise ValueError("A metrics_only Portfolio keeps no equity curve; use portfolio.metrics.metrics()")
+        if isinstance(self.all_holdings, CompactLedger):
+            curve = self.all_holdings.to_frame()
+        else:
+            curve = pd.DataFrame(self.all_holdings)
         curve.set_index('datetime', inplace=True)
         # Ensure the 'total' column is numeric before calculations
         curve['total'] = pd.to_numeric(curve['total'], errors='coerce')
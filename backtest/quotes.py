@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns of a stored quote stream: time (int64 ns) plus top of book prices
+QUOTE_FIELDS = ('Bid', 'Ask')
+
+
+def to_ns(when):
+    """Nanoseconds of a timestamp as stored by QuoteStore (UTC for tz-aware times)."""
+    return pd.Timestamp(when).value
+
+
+class QuoteStore:
+    """
+    Level-1 quotes (bid and ask per update) on disk, one directory per
+    symbol holding time.npy, bid.npy and ask.npy. Columns are opened
+    memory-mapped, so a lookup only reads the pages it touches and a day
+    of quotes for hundreds of symbols is never loaded as a whole.
+
+    Times are int64 nanoseconds, UTC for tz-aware input; bars and quotes
+    must both be tz-aware or both naive in the same zone.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._columns = {}
+
+    def __getstate__(self):
+        # Memory maps are reopened after unpickling (e.g. snapshot resume)
+        state = self.__dict__.copy()
+        state['_columns'] = {}
+        return state
+
+    def _path(self, symbol, name):
+        return os.path.join(self.root, symbol, f"{name}.npy")
+
+    def write(self, symbol, quotes):
+        """
+        Stores `quotes`, a frame with a DatetimeIndex and Bid/Ask columns,
+        replacing any stored stream for `symbol`. Rows are sorted by time
+        (ties keep their order); rows with a missing, non-positive or
+        crossed (bid above ask) quote are dropped.
+        """
+        missing = [f for f in QUOTE_FIELDS if f not in quotes.columns]
+        if missing:
+            raise ValueError(f"Quotes for {symbol} are missing columns {missing}")
+        index = quotes.index if isinstance(quotes.index, pd.DatetimeIndex) else pd.to_datetime(quotes.index)
+        times = index.asi8
+        bid = quotes['Bid'].to_numpy(dtype=np.float64)
+        ask = quotes['Ask'].to_numpy(dtype=np.float64)
+        valid = np.isfinite(bid) & np.isfinite(ask) & (bid > 0) & (bid <= ask)
+        times, bid, ask = times[valid], bid[valid], ask[valid]
+        if len(times) and (np.diff(times) < 0).any():
+            order = np.argsort(times, kind='stable')
+            times, bid, ask = times[order], bid[order], ask[order]
+
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+        self._columns.pop(symbol, None)
+        for name, column in (('time', times), ('bid', bid), ('ask', ask)):
+            np.save(self._path(symbol, name), column)
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(s for s in os.listdir(self.root) if os.path.exists(self._path(s, 'time')))
+
+    def columns(self, symbol):
+        """(time, bid, ask) memory-mapped arrays of `symbol`; empty if it has no quotes."""
+        columns = self._columns.get(symbol)
+        if columns is None:
+            if os.path.exists(self._path(symbol, 'time')):
+                columns = tuple(np.load(self._path(symbol, name), mmap_mode='r') for name in ('time', 'bid', 'ask'))
+            else:
+                columns = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+            self._columns[symbol] = columns
+        return columns
+
+    def locate(self, symbol, times):
+        """
+        Index of the quote prevailing at each of `times` (ns, scalar or
+        array): the last one stamped at or before it, -1 if none.
+        """
+        return np.searchsorted(self.columns(symbol)[0], times, side='right') - 1
+
+    def prevailing(self, symbol, times):
+        """(bid, ask) prevailing at each of `times`, NaN before the first quote."""
+        _, bid, ask = self.columns(symbol)
+        i = np.atleast_1d(self.locate(symbol, times))
+        has = i >= 0
+        out_bid, out_ask = np.full(len(i), np.nan), np.full(len(i), np.nan)
+        out_bid[has], out_ask[has] = bid[i[has]], ask[i[has]]
+        return out_bid, out_ask
+
+    def frame(self, symbol, start=None, stop=None):
+        """Quotes of `symbol` in [start, stop) as a DataFrame (for inspection)."""
+        times, bid, ask = self.columns(symbol)
+        lo = 0 if start is None else np.searchsorted(times, to_ns(start), side='left')
+        hi = len(times) if stop is None else np.searchsorted(times, to_ns(stop), side='left')
+        return pd.DataFrame({'Bid': np.asarray(bid[lo:hi]), 'Ask': np.asarray(ask[lo:hi])},
+                            index=pd.to_datetime(np.asarray(times[lo:hi])))
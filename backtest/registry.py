@@ -0,0 +1,342 @@
+import ast
+import importlib
+import importlib.util
+import os
+import subprocess
+import sys
+
+# Third-party packages can expose strategies under this entry point group,
+# e.g. in pyproject.toml:
+#   [project.entry-points."backtest.strategies"]
+#   my_strategy = "my_package.module:MyStrategy"
+ENTRY_POINT_GROUP = 'backtest.strategies'
+
+# Arguments every strategy receives from the engine; never user parameters
+ENGINE_ARGS = ('self', 'data_handler', 'events')
+
+# Import-time budget (seconds) for headless runs, which must not pull in
+# Streamlit, yfinance or any strategy module until a backtest needs it.
+HEADLESS_MODULES = ('backtest.registry', 'backtest.runner')
+IMPORT_TIME_BUDGET = 1.5
+
+_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.FloorDiv: lambda a, b: a // b,
+}
+
+
+class StrategySpec:
+    """
+    Metadata for one strategy. Everything except `load()` is answered from
+    the module source, so building the registry never imports a strategy.
+    """
+    def __init__(self, name, module, class_name, params=None, lookback=None, description=None):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self._params = dict(params) if params is not None else None
+        self._lookback = lookback
+        self._description = description
+        self._source = None
+        self._class = None
+
+    def __repr__(self):
+        return f"StrategySpec({self.name!r}, {self.module}:{self.class_name})"
+
+    @property
+    def params(self):
+        """Default parameters shown to the user."""
+        if self._params is None:
+            self._params = {k: v for k, v in self.source_info['defaults'].items() if v is not None}
+        return dict(self._params)
+
+    @property
+    def description(self):
+        if self._description is None:
+            self._description = self.source_info['doc']
+        return self._description
+
+    @property
+    def source_info(self):
+        if self._source is None:
+            self._source = _inspect_strategy_source(self.module, self.class_name)
+        return self._source
+
+    def load(self):
+        """Imports the strategy class on first use."""
+        if self._class is None:
+            self._class = getattr(importlib.import_module(self.module), self.class_name)
+        return self._class
+
+    @property
+    def loaded(self):
+        return self._class is not None
+
+    def required_lookback(self, params=None):
+        """
+        Number of bars the strategy needs before it can emit a signal, for
+        the given parameter overrides. Returns None if it cannot be derived.
+        """
+        values = dict(self.source_info['defaults'])
+        values.update(self.params)
+        if params:
+            values.update(params)
+
+        if callable(self._lookback):
+            return int(self._lookback(values))
+        if self._lookback is not None:
+            return int(self._lookback)
+
+        expr = self.source_info['lookback']
+        if expr is None:
+            return 1
+        attrs = {}
+        for attr, node in self.source_info['attributes'].items():
+            try:
+                attrs[attr] = _evaluate(node, values, attrs)
+            except (KeyError, TypeError, ValueError):
+                continue
+        try:
+            return int(_evaluate(expr, values, attrs))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+class StrategyRegistry:
+    """
+    An ordered name -> StrategySpec mapping.
+    """
+    def __init__(self, specs=()):
+        self._specs = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec):
+        self._specs[spec.name] = spec
+        return spec
+
+    def __getitem__(self, name):
+        return self._specs[name]
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def names(self):
+        return list(self._specs)
+
+    def items(self):
+        return self._specs.items()
+
+    def load(self, name):
+        return self._specs[name].load()
+
+    def find_class(self, class_name):
+        for spec in self._specs.values():
+            if spec.class_name == class_name:
+                return spec
+        raise KeyError(class_name)
+
+    def discover_modules(self, package='strategies'):
+        """
+        Registers every Strategy subclass found in `package` by parsing the
+        module files. Strategies already registered (by class) are skipped.
+        """
+        spec = importlib.util.find_spec(package)
+        if spec is None or not spec.submodule_search_locations:
+            return self
+
+        known = {(s.module, s.class_name) for s in self._specs.values()}
+        for location in spec.submodule_search_locations:
+            for filename in sorted(os.listdir(location)):
+                if not filename.endswith('.py') or filename.startswith('_'):
+                    continue
+                module = f"{package}.{filename[:-3]}"
+                with open(os.path.join(location, filename), encoding='utf-8') as f:
+                    tree = ast.parse(f.read())
+                for node in tree.body:
+                    if isinstance(node, ast.ClassDef) and _is_strategy_class(node):
+                        if (module, node.name) not in known:
+                            self.register(StrategySpec(node.name, module, node.name))
+        return self
+
+    def discover_entry_points(self, group=ENTRY_POINT_GROUP):
+        """
+        Registers strategies published by installed packages. Entry points
+        carry 'module:Class', so nothing is imported here either.
+        """
+        from importlib.metadata import entry_points
+        for ep in entry_points(group=group):
+            module, _, class_name = ep.value.partition(':')
+            self.register(StrategySpec(ep.name, module.strip(), class_name.strip()))
+        return self
+
+
+# Built-in strategies with the display names and defaults used by the app
+BUILTIN_STRATEGIES = [
+    ("Buy and Hold", "strategies.buy_and_hold", "BuyAndHoldStrategy", {}),
+    ("SMA Crossover (50/200)", "strategies.sma_crossover", "SMACrossoverStrategy", {"short_window": 50, "long_window": 200}),
+    ("DEMA Crossover (50/200)", "strategies.dema_crossover_strategy", "DEMACrossoverStrategy", {"short_period": 50, "long_period": 200}),
+    ("TEMA Crossover (50/200)", "strategies.tema_crossover_strategy", "TEMACrossoverStrategy", {"short_period": 50, "long_period": 200}),
+    ("RSI (14/30/70)", "strategies.rsi_strategy", "RSIStrategy", {"rsi_period": 14, "oversold_threshold": 30, "overbought_threshold": 70}),
+    ("Bollinger Bands (20/2)", "strategies.bollinger_bands_strategy", "BollingerBandsStrategy", {"bb_period": 20, "bb_std_dev": 2.0}),
+    ("MACD (12/26/9)", "strategies.macd_strategy", "MACDStrategy", {"short_ema_period": 12, "long_ema_period": 26, "signal_ema_period": 9}),
+    ("Parabolic SAR (0.02/0.2)", "strategies.parabolic_sar_strategy", "ParabolicSARStrategy", {"initial_af": 0.02, "max_af": 0.2}),
+    ("Stochastic Oscillator (14/20/80)", "strategies.stochastic_oscillator_strategy", "StochasticOscillatorStrategy", {"k_period": 14, "oversold_threshold": 20, "overbought_threshold": 80}),
+    ("OBV Crossover (20)", "strategies.on_balance_volume_strategy", "OnBalanceVolumeStrategy", {"obv_ma_period": 20}),
+    ("Ichimoku Cloud (9/26)", "strategies.ichimoku_cloud_strategy", "IchimokuCloudStrategy", {"tenkan_period": 9, "kijun_period": 26}),
+    ("ATR Channel Breakout (20/14/2)", "strategies.atr_channel_strategy", "ATRChannelStrategy", {"sma_period": 20, "atr_period": 14, "atr_multiplier": 2.0}),
+    ("Rate of Change (12/20)", "strategies.rate_of_change_strategy", "RateOfChangeStrategy", {"roc_period": 12, "ma_period": 20}),
+    ("Awesome Oscillator (5/34)", "strategies.awesome_oscillator_strategy", "AwesomeOscillatorStrategy", {"short_period": 5, "long_period": 34}),
+    ("Keltner Channel (20/10/2)", "strategies.keltner_channel_strategy", "KeltnerChannelStrategy", {"ema_period": 20, "atr_period": 10, "atr_multiplier": 2.0}),
+    ("VWAP Crossover (20)", "strategies.vwap_crossover_strategy", "VWAPCrossoverStrategy", {"vwap_ma_period": 20}),
+    ("Donchian Channel (20)", "strategies.donchian_channel_strategy", "DonchianChannelStrategy", {"period": 20}),
+    ("CCI (20/-100/100)", "strategies.cci_strategy", "CCIStrategy", {"period": 20, "oversold": -100, "overbought": 100}),
+    ("MA Ribbon (5/10/20)", "strategies.ma_ribbon_strategy", "MARibbonStrategy", {"short_period": 5, "medium_period": 10, "long_period": 20}),
+    ("Chaikin Money Flow (20)", "strategies.chaikin_money_flow_strategy", "ChaikinMoneyFlowStrategy", {"period": 20}),
+    ("Williams %R (14/-80/-20)", "strategies.williams_r_strategy", "WilliamsRStrategy", {"period": 14, "oversold": -80, "overbought": -20}),
+    ("Aroon Indicator (25)", "strategies.aroon_indicator_strategy", "AroonIndicatorStrategy", {"period": 25}),
+    ("Money Flow Index (14/20/80)", "strategies.money_flow_index_strategy", "MoneyFlowIndexStrategy", {"period": 14, "oversold": 20, "overbought": 80}),
+    ("TRIX (15/9)", "strategies.trix_strategy", "TrixStrategy", {"period": 15, "signal_period": 9}),
+    ("Vortex Indicator (14)", "strategies.vortex_indicator_strategy", "VortexIndicatorStrategy", {"period": 14}),
+]
+
+_default_registry = None
+
+
+def default_registry(discover=True):
+    """
+    The built-in strategies plus any found in the `strategies` package or
+    published through entry points. Built once per process.
+    """
+    global _default_registry
+    if _default_registry is None:
+        registry = StrategyRegistry(StrategySpec(*entry) for entry in BUILTIN_STRATEGIES)
+        if discover:
+            registry.discover_modules('strategies')
+            registry.discover_entry_points()
+        _default_registry = registry
+    return _default_registry
+
+
+def measure_import_time(modules=HEADLESS_MODULES, runs=3):
+    """
+    Wall time (seconds, best of `runs`) to import `modules` in a fresh
+    interpreter, plus the heavy packages that ended up loaded.
+    """
+    code = (
+        "import sys, time; t = time.perf_counter(); "
+        + "; ".join(f"import {m}" for m in modules)
+        + "; print(time.perf_counter() - t); "
+        "print(','.join(sorted({k.split('.')[0] for k in sys.modules "
+        "if k.split('.')[0] in ('streamlit', 'yfinance', 'plotly') or k.startswith('strategies.')})))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best, heavy = None, []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root)
+        lines = out.stdout.strip().splitlines()
+        elapsed = float(lines[0])
+        heavy = [m for m in (lines[1].split(',') if len(lines) > 1 else []) if m]
+        best = elapsed if best is None else min(best, elapsed)
+    return best, heavy
+
+
+def check_import_budget(budget=IMPORT_TIME_BUDGET, modules=HEADLESS_MODULES):
+    """
+    Raises RuntimeError if importing the headless entry points exceeds the
+    budget or loads UI/network packages or strategy modules eagerly.
+    """
+    elapsed, heavy = measure_import_time(modules)
+    if heavy:
+        raise RuntimeError(f"Headless import loaded {', '.join(heavy)} eagerly")
+    if elapsed > budget:
+        raise RuntimeError(f"Headless import took {elapsed:.3f}s, budget is {budget:.3f}s")
+    return elapsed
+
+
+def _is_strategy_class(node):
+    for base in node.bases:
+        name = base.id if isinstance(base, ast.Name) else getattr(base, 'attr', None)
+        if name == 'Strategy':
+            return True
+    return False
+
+
+def _inspect_strategy_source(module, class_name):
+    """
+    Reads constructor defaults, the attributes set from them, the
+    get_latest_bars() window and the docstring of a strategy class without
+    executing its module.
+    """
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        raise ImportError(f"Cannot find strategy module {module}")
+    with open(spec.origin, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    info = {'defaults': {}, 'attributes': {}, 'lookback': None, 'doc': ''}
+    cls = next((n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == class_name), None)
+    if cls is None:
+        raise ImportError(f"{module} does not define {class_name}")
+    info['doc'] = ' '.join((ast.get_docstring(cls) or '').split())
+
+    for item in cls.body:
+        if not isinstance(item, ast.FunctionDef):
+            continue
+        if item.name == '__init__':
+            args = item.args.args
+            defaults = [None] * (len(args) - len(item.args.defaults)) + list(item.args.defaults)
+            for arg, default in zip(args, defaults):
+                if arg.arg in ENGINE_ARGS:
+                    continue
+                info['defaults'][arg.arg] = ast.literal_eval(default) if default is not None else None
+            for stmt in ast.walk(item):
+                if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                    target = stmt.targets[0]
+                    if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == 'self':
+                        info['attributes'][target.attr] = stmt.value
+        elif item.name == 'calculate_signals':
+            for call in ast.walk(item):
+                if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                        and call.func.attr == 'get_latest_bars' and len(call.args) >= 2):
+                    info['lookback'] = call.args[1]
+                    break
+    return info
+
+
+def _evaluate(node, params, attrs):
+    """
+    Evaluates the small expressions strategies use for windows and
+    parameter aliases (`self.period + 1`, `a if a is not None else b`).
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return params[node.id]
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'self':
+        return attrs[node.attr]
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left, params, attrs), _evaluate(node.right, params, attrs))
+    if isinstance(node, ast.IfExp):
+        test = node.test
+        if (isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.ops[0], ast.IsNot)
+                and isinstance(test.comparators[0], ast.Constant) and test.comparators[0].value is None):
+            branch = node.body if _evaluate(test.left, params, attrs) is not None else node.orelse
+            return _evaluate(branch, params, attrs)
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+if __name__ == '__main__':
+    registry = default_registry()
+    for name, spec in registry.items():
+        print(f"{name:<36} {spec.module}:{spec.class_name:<30} lookback={spec.required_lookback()}")
+    elapsed = check_import_budget()
+    print(f"Headless import time: {elapsed:.3f}s (budget {IMPORT_TIME_BUDGET:.1f}s)")
@@ -0,0 +1,160 @@
+import numpy as np
+
+from backtest import trace
+
+_rejected = trace.site('backtest.risk.rejected', "Rejected BUY {} x{}", trace.INFO)
+_trimmed = trace.site('backtest.risk.trimmed', "Trimmed BUY {} from {} to {}", trace.INFO)
+
+
+class RiskManager:
+    """
+    Sits between SignalEvent and OrderEvent: the Portfolio sizes an order,
+    then the RiskManager trims or rejects it so that the book stays within
+
+    - max_gross_exposure: sum of long market values as a fraction of equity
+    - max_position_weight: market value of any one symbol / equity
+    - max_sector_weight: market value per sector / equity (needs `sectors`)
+    - max_positions: number of symbols held at once
+    - derisk_drawdown / derisk_scale: new entries are scaled down while the
+      equity is this far below its peak; halt_drawdown blocks them entirely.
+
+    Exposure is kept as a vector over all symbols and every check is a
+    vector operation over that vector and the batch of proposed orders.
+    Orders that reduce a position always pass.
+    """
+    def __init__(self, symbol_list, max_gross_exposure=1.0, max_position_weight=None, max_positions=None,
+                 sectors=None, max_sector_weight=None, derisk_drawdown=None, derisk_scale=0.5, halt_drawdown=None):
+        self.symbol_list = list(symbol_list)
+        self.codes = {s: i for i, s in enumerate(self.symbol_list)}
+        self.max_gross_exposure = max_gross_exposure
+        self.max_position_weight = max_position_weight
+        self.max_positions = max_positions
+        self.max_sector_weight = max_sector_weight
+        self.derisk_drawdown = derisk_drawdown
+        self.derisk_scale = derisk_scale
+        self.halt_drawdown = halt_drawdown
+
+        # Sectors are integer codes so that per-sector sums are a bincount
+        sectors = sectors or {}
+        names = sorted({sectors.get(s, 'UNKNOWN') for s in self.symbol_list})
+        sector_ids = {name: i for i, name in enumerate(names)}
+        self.sector_names = names
+        self.sector_codes = np.array([sector_ids[sectors.get(s, 'UNKNOWN')] for s in self.symbol_list], dtype=np.int64)
+
+        n = len(self.symbol_list)
+        self.exposure = np.zeros(n)
+        self.prices = np.full(n, np.nan)
+        self.equity = None
+        self.peak_equity = None
+        self.rejected = 0
+
+    def update(self, market_values, prices, equity):
+        """
+        Refreshes the position vector from the portfolio's mark-to-market.
+        Called once per bar, after Portfolio.update_timeindex.
+        """
+        self.exposure = np.abs(np.asarray(market_values, dtype=np.float64))
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.equity = float(equity)
+        self.peak_equity = self.equity if self.peak_equity is None else max(self.peak_equity, self.equity)
+
+    @property
+    def drawdown(self):
+        if not self.peak_equity:
+            return 0.0
+        return 1.0 - self.equity / self.peak_equity
+
+    def refine_order(self, order):
+        return self.refine_orders([order])[0]
+
+    def refine_orders(self, orders):
+        """
+        Applies the limits to a batch of orders in arrival order. Returns a
+        list aligned with `orders` holding the (possibly reduced) order or
+        None where it was rejected.
+        """
+        result = list(orders)
+        if self.equity is None:
+            return result
+
+        entries = [i for i, o in enumerate(orders) if o is not None and o.direction == 'BUY']
+        if not entries:
+            return result
+
+        sym = np.array([self.codes[orders[i].symbol] for i in entries], dtype=np.int64)
+        qty = np.array([orders[i].quantity for i in entries], dtype=np.float64)
+        price = self.prices[sym]
+        notional = np.where(np.isnan(price), 0.0, qty * price)
+        equity = self.equity
+
+        # Drawdown-based de-risking applies to the whole batch
+        dd = self.drawdown
+        if self.halt_drawdown is not None and dd >= self.halt_drawdown:
+            notional[:] = 0.0
+        elif self.derisk_drawdown is not None and dd >= self.derisk_drawdown:
+            notional *= self.derisk_scale
+
+        if self.max_positions is not None:
+            held = np.count_nonzero(self.exposure > 0)
+            is_new = self.exposure[sym] <= 0
+            # Several orders for the same new symbol only take one slot
+            first_for_symbol = np.zeros(len(sym), dtype=bool)
+            first_for_symbol[np.unique(sym, return_index=True)[1]] = True
+            slot = np.cumsum(is_new & first_for_symbol)
+            notional[is_new & (slot > self.max_positions - held)] = 0.0
+
+        if self.max_position_weight is not None:
+            room = np.maximum(self.max_position_weight * equity - self.exposure, 0.0)
+            notional = _greedy_fill(notional, sym, room)
+
+        if self.max_sector_weight is not None:
+            sector_exposure = np.bincount(self.sector_codes, weights=self.exposure, minlength=len(self.sector_names))
+            room = np.maximum(self.max_sector_weight * equity - sector_exposure, 0.0)
+            notional = _greedy_fill(notional, self.sector_codes[sym], room)
+
+        if self.max_gross_exposure is not None:
+            room = np.array([max(self.max_gross_exposure * equity - self.exposure.sum(), 0.0)])
+            notional = _greedy_fill(notional, np.zeros(len(sym), dtype=np.int64), room)
+
+        allowed = np.floor(np.where(price > 0, notional / np.where(price > 0, price, 1.0), 0.0) + 1e-9)
+        allowed = np.minimum(allowed, qty).astype(np.int64)
+
+        # Reserve what was accepted so later orders in this bar see it
+        np.add.at(self.exposure, sym, np.where(np.isnan(price), 0.0, allowed * price))
+
+        for k, i in enumerate(entries):
+            if allowed[k] <= 0:
+                result[i] = None
+                self.rejected += 1
+                if _rejected.enabled:
+                    _rejected(orders[i].symbol, orders[i].quantity)
+            elif allowed[k] < orders[i].quantity:
+                if _trimmed.enabled:
+                    _trimmed(orders[i].symbol, orders[i].quantity, int(allowed[k]))
+                orders[i].quantity = int(allowed[k])
+        return result
+
+
+def _greedy_fill(notional, groups, room):
+    """
+    Accepts orders in sequence until each group's room is used up: the
+    accepted amounts are the increments of min(running total, room) within
+    each group, computed for all groups at once.
+    """
+    if len(notional) == 0:
+        return notional
+    order = np.argsort(groups, kind='stable')
+    g = groups[order]
+    amounts = notional[order]
+    running = np.cumsum(amounts)
+    # Restart the running total at each group boundary
+    starts = np.r_[0, np.flatnonzero(np.diff(g)) + 1]
+    offsets = np.repeat(np.r_[0.0, running[starts[1:] - 1]], np.diff(np.r_[starts, len(g)]))
+    running -= offsets
+    capped = np.minimum(running, room[g])
+    accepted = np.diff(np.r_[0.0, capped])
+    # First order of each group starts from zero, not from the previous group
+    accepted[starts] = capped[starts]
+    out = np.empty_like(notional)
+    out[order] = np.maximum(accepted, 0.0)
+    return out
@@ -0,0 +1,137 @@
+import os
+import queue
+
+import pandas as pd
+
+from backtest.data import HistoricDataHandler
+from backtest.portfolio import Portfolio
+from backtest.execution import SimulatedExecutionHandler
+from backtest.engine import Backtest
+from backtest.performance import get_performance_metrics
+
+
+def load_stock_data(ticker, start_date, end_date):
+    """
+    Downloads daily bars from Yahoo Finance. yfinance is imported here so
+    that headless runs on local data never pay for it.
+    """
+    import yfinance as yf
+    # Prices without dividend adjustment plus the split/dividend columns.
+    # yfinance split-adjusts prices and volume regardless; the remaining
+    # adjustment is done by the data handler (see backtest.corporate_actions)
+    data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=False, actions=True)
+    if data is None or data.empty:
+        return None
+    return data
+
+
+def build_backtest(data, ticker, strategy_class, params, start_date, initial_capital=100000.0, position_size=0.02,
+                   corporate_actions=None, adjust='all', precision='float64', sizer=None, matrix=False, events=None, metrics_only=False):
+    """
+    Wires the standard components into a Backtest that has not been run
+    yet. `ticker` is one symbol or a list of them (with `data` a {symbol:
+    frame} dict or a multi-ticker frame). `precision='float32'` stores bars
+    and per-bar holdings in float32 (see backtest.ledger.PRECISIONS);
+    `sizer` is a backtest.sizing.PositionSizer replacing the fixed
+    position_size; `matrix=True` evaluates all symbols per bar in one
+    Strategy.signals_matrix call. `events` replaces the event queue, e.g.
+    with a backtest.scheduler.EventScheduler for order latency and timers.
+    `metrics_only=True` keeps only the summary metrics (see run_metrics).
+    """
+    events = queue.Queue() if events is None else events
+    symbols = [ticker] if isinstance(ticker, str) else list(ticker)
+    data_handler = HistoricDataHandler(events, symbols, data, corporate_actions, adjust, precision)
+    strategy = strategy_class(data_handler, events, **params)
+    portfolio = Portfolio(data_handler, events, start_date, initial_capital, position_size, precision=precision,
+                          sizer=sizer, metrics_only=metrics_only)
+    execution_handler = SimulatedExecutionHandler(events, data_handler)
+    return Backtest(data_handler, strategy, portfolio, execution_handler, matrix)
+
+
+def run_backtest(data, ticker, strategy_class, params, start_date, initial_capital=100000.0, position_size=0.02,
+                 corporate_actions=None, adjust='all', precision='float64', sizer=None, matrix=False, events=None):
+    """
+    Runs one strategy over `data` and returns (equity_curve, trade_log).
+    """
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions, adjust, precision, sizer, matrix, events)
+    return backtest.simulate_trading()
+
+
+def run_metrics(data, ticker, strategy_class, params, start_date, initial_capital=100000.0, position_size=0.02,
+                corporate_actions=None, adjust='all', precision='float64', sizer=None, matrix=False):
+    """
+    Runs one strategy and returns only its get_performance_metrics-style
+    summary, accumulated bar by bar. No equity curve or trade log is built,
+    so memory does not grow with the number of bars or trades; use it for
+    sweeps that keep the numbers alone.
+    """
+    backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                              corporate_actions, adjust, precision, sizer, matrix, metrics_only=True)
+    backtest.simulate_trading()
+    return backtest.portfolio.metrics.metrics()
+
+
+def run_strategy(spec, data, ticker, start_date, initial_capital=100000.0, position_size=0.02, params=None,
+                 corporate_actions=None, adjust='all', sizer=None, metrics_only=False):
+    """
+    Runs a registry entry (importing its class on first use) and returns the
+    result record used by the app: name, performance, equity_curve, trade_log.
+    With `metrics_only` the curve and the log are None (see run_metrics).
+    """
+    params = spec.params if params is None else params
+    if metrics_only:
+        performance = run_metrics(data, ticker, spec.load(), params, start_date, initial_capital, position_size,
+                                  corporate_actions, adjust, sizer=sizer)
+        return {"name": spec.name, "performance": performance, "equity_curve": None, "trade_log": None}
+    equity_curve, trade_log = run_backtest(data, ticker, spec.load(), params, start_date, initial_capital, position_size,
+                                           corporate_actions, adjust, sizer=sizer)
+    return {
+        "name": spec.name,
+        "performance": get_performance_metrics(equity_curve, trade_log, initial_capital),
+        "equity_curve": equity_curve,
+        "trade_log": trade_log
+    }
+
+
+def run_incremental(snapshot_path, data, ticker, strategy_class, params, start_date, initial_capital=100000.0,
+                    position_size=0.02, corporate_actions=None, adjust='all'):
+    """
+    Resumes the run saved at `snapshot_path` with the bars of `data` it has
+    not seen yet, or runs from scratch if there is no snapshot, then saves
+    the new state. The ticker, strategy, params, start date, capital and
+    position size are saved with the snapshot and must be the same on
+    resume, otherwise ValueError is raised (delete the snapshot to start
+    over). `corporate_actions` and `adjust` apply on resume too; ValueError
+    is raised if they re-adjust bars the snapshot has processed.
+    Returns (equity_curve, trade_log).
+    """
+    inputs = _run_inputs(ticker, strategy_class, params, start_date, initial_capital, position_size)
+    if os.path.exists(snapshot_path):
+        backtest = Backtest.load_snapshot(snapshot_path)
+        saved = getattr(backtest, 'run_inputs', None)
+        if saved is not None and saved != inputs:
+            changed = [k for k in inputs if saved.get(k) != inputs[k]]
+            raise ValueError(f"Snapshot {snapshot_path} was started with different {', '.join(changed)}; "
+                             "delete it to start over")
+        result = backtest.resume(data, corporate_actions, adjust)
+    else:
+        backtest = build_backtest(data, ticker, strategy_class, params, start_date, initial_capital, position_size,
+                                  corporate_actions, adjust)
+        backtest.run_inputs = inputs
+        result = backtest.simulate_trading()
+    backtest.save_snapshot(snapshot_path)
+    return result
+
+
+def _run_inputs(ticker, strategy_class, params, start_date, initial_capital, position_size):
+    # What defines a run for run_incremental; resuming with other values
+    # would silently continue a different run
+    return {
+        'ticker': list(ticker) if isinstance(ticker, (list, tuple)) else ticker,
+        'strategy': f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        'params': dict(params or {}),
+        'start_date': pd.Timestamp(start_date),
+        'initial_capital': float(initial_capital),
+        'position_size': float(position_size),
+    }
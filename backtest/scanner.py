@@ -0,0 +1,194 @@
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.corporate_actions import CorporateActions, adjust_frame
+from backtest.data import BarPanel
+from backtest.ingest import normalize_bars
+from backtest.ledger import precision_dtype
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# Bars replayed for strategies whose signal depends on state carried from
+# bar to bar (Strategy.matrix_stateful, e.g. Parabolic SAR) rather than on
+# a fixed window
+STATEFUL_BARS = 250
+
+
+class UniversePanel(BarPanel):
+    """
+    The last `bars` bars of many symbols as a BarPanel. The last row is
+    each symbol's latest bar, whatever its date (`as_of`), so symbols that
+    stopped trading are scanned on their final bar.
+    """
+    def __init__(self, arrays, symbols, as_of, counts):
+        super().__init__(arrays, symbols, counts)
+        self.as_of = pd.Series(as_of, index=self.symbols, name='as_of')
+
+    @classmethod
+    def from_frames(cls, frames, bars, date=None, adjust='all', precision='float64'):
+        """
+        `frames` maps symbol -> daily bars (flat or yfinance-style columns).
+        Split/dividend columns, if present, are applied with the same
+        backward adjustment as the backtest. `date` scans as of that day.
+        """
+        dtype = precision_dtype(precision)
+        symbols = list(frames)
+        arrays = {f: np.full((bars, len(symbols)), np.nan, dtype=dtype) for f in FIELDS}
+        as_of, counts = [], []
+        for j, symbol in enumerate(symbols):
+            frame = _prepare(frames[symbol], symbol, bars, date, adjust)
+            n = len(frame)
+            counts.append(n)
+            as_of.append(frame.index[-1] if n else pd.NaT)
+            for f in FIELDS:
+                if n and f in frame.columns:
+                    arrays[f][bars - n:, j] = frame[f].to_numpy(dtype=np.float64)
+        return cls(arrays, symbols, as_of, counts)
+
+    @classmethod
+    def load(cls, symbols, loader, bars, date=None, adjust='all', precision='float64', max_workers=16):
+        """
+        Reads every symbol with `loader(symbol)` (e.g. a data store reader)
+        on a thread pool; symbols that fail to load are left out.
+        """
+        def read(symbol):
+            try:
+                return symbol, loader(symbol)
+            except (OSError, ValueError, KeyError):
+                return symbol, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = {s: f for s, f in pool.map(read, symbols) if f is not None and len(f)}
+        return cls.from_frames(frames, bars, date, adjust, precision)
+
+
+def _prepare(frame, symbol, bars, date, adjust):
+    # Same ingestion as HistoricDataHandler, so the panel holds the bars a
+    # backtest would see
+    frame = normalize_bars(frame, symbol)
+    if date is not None:
+        frame = frame.loc[:date]
+    if adjust != 'none' and len(frame) and ('Stock Splits' in frame.columns or 'Dividends' in frame.columns):
+        # Factors depend on the whole history; compute them before cutting
+        price_factor, volume_factor = CorporateActions.from_yfinance(frame, symbol).factors(
+            symbol, frame.index, frame['Close'], adjust)
+        frame = adjust_frame(frame.iloc[-bars:], price_factor[-bars:], volume_factor[-bars:])
+    return frame.iloc[-bars:]
+
+
+class _PanelHandler:
+    # Strategies only read symbol_list from their data handler when built
+    def __init__(self, symbols):
+        self.symbol_list = list(symbols)
+
+
+def _signals(strategy, panel):
+    # A stateful strategy is replayed over the panel's last STATEFUL_BARS
+    # rows with its own position check, as it would have traded them
+    if not strategy.matrix_stateful:
+        return strategy.signals_matrix(panel)
+    long = exit_ = np.zeros(len(panel), dtype=bool)
+    for stop in range(max(2, panel.stop - STATEFUL_BARS + 2), panel.stop + 1):
+        long, exit_ = strategy.gate_signals(*strategy.signals_matrix(panel.upto(stop)))
+    return long, exit_
+
+
+def scan(panel, strategies=None, positions=None, registry=None, wide=False):
+    """
+    Evaluates each strategy's signal on the latest bar of every symbol in
+    `panel`, all symbols at once with Strategy.signals_matrix.
+
+    `strategies` are registry names (default: every entry with a matrix
+    form). `positions` applies the strategies' own position check: a set
+    of symbols currently held, or {strategy name: set of symbols}. LONG is
+    then only reported for flat symbols and EXIT only for held ones;
+    without it, both conditions are reported as they fire.
+
+    Returns the fired signals as rows of (symbol, as_of, strategy, signal),
+    or with `wide=True` a symbols x strategies table ('' where nothing
+    fires).
+    """
+    if registry is None:
+        from backtest.registry import default_registry
+        registry = default_registry()
+    if strategies is None:
+        strategies = [name for name in registry.names() if _supports_matrix(registry[name])]
+    missing = [name for name in strategies if not _supports_matrix(registry[name])]
+    if missing:
+        raise KeyError(f"No signals_matrix for: {', '.join(missing)}")
+
+    symbols = np.asarray(panel.symbols, dtype=object)
+    handler = _PanelHandler(panel.symbols)
+    table = {}
+    for name in strategies:
+        spec = registry[name]
+        long, exit_ = _signals(spec.load()(handler, None, **spec.params), panel)
+        if positions is not None:
+            held = positions.get(name, ()) if isinstance(positions, dict) else positions
+            held = np.isin(symbols, list(held))
+            long, exit_ = long & ~held, exit_ & held
+        table[name] = np.where(long, 'LONG', np.where(exit_, 'EXIT', ''))
+
+    wide_table = pd.DataFrame(table, index=pd.Index(panel.symbols, name='symbol'))
+    if wide:
+        return wide_table
+    fired = wide_table.rename_axis(columns='strategy').stack().rename('signal').reset_index()
+    fired = fired[fired['signal'] != '']
+    fired.insert(1, 'as_of', panel.as_of.reindex(fired['symbol']).to_numpy())
+    return fired.reset_index(drop=True)
+
+
+def required_bars(strategies=None, registry=None):
+    """Bars to load so every strategy sees its full lookback."""
+    if registry is None:
+        from backtest.registry import default_registry
+        registry = default_registry()
+    names = registry.names() if strategies is None else strategies
+    bars = []
+    for name in names:
+        spec = registry[name]
+        if _supports_matrix(spec):
+            bars.append(STATEFUL_BARS if spec.load().matrix_stateful else spec.required_lookback() or 1)
+    return max(bars, default=1)
+
+
+def _supports_matrix(spec):
+    try:
+        return spec.load().supports_matrix()
+    except (ImportError, AttributeError):
+        return False
+
+
+def main(argv=None):
+    from backtest.distributed import load_local_data
+
+    parser = argparse.ArgumentParser(description="End-of-day signal scan over a universe in a local data store")
+    parser.add_argument('--data-dir', required=True, help="directory of <symbol>.parquet / .csv files")
+    parser.add_argument('--symbols', nargs='*', help="default: every file in --data-dir")
+    parser.add_argument('--strategy', action='append', help="registry strategy name (repeatable, default all)")
+    parser.add_argument('--date', help="scan as of this date instead of the latest bar")
+    parser.add_argument('--wide', action='store_true', help="symbols x strategies table")
+    parser.add_argument('--output', help="write CSV here instead of printing")
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols or sorted({os.path.splitext(os.path.basename(p))[0]
+                                      for p in glob.glob(os.path.join(args.data_dir, '*.parquet'))
+                                      + glob.glob(os.path.join(args.data_dir, '*.csv'))})
+    panel = UniversePanel.load(symbols, lambda s: load_local_data(args.data_dir, s), required_bars(args.strategy),
+                               date=args.date)
+    table = scan(panel, args.strategy, wide=args.wide)
+    if args.output:
+        table.to_csv(args.output)
+    else:
+        print(table.to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
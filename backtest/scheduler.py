@@ -0,0 +1,202 @@
+import heapq
+import itertools
+import queue
+import time
+from collections import deque
+
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from backtest.event import TimerEvent
+
+
+def _ns(value):
+    return pd.Timestamp(value).value
+
+
+class _Timer:
+    # Fire times of one timer: `rule` occurrences (or the explicit `times`)
+    # shifted by `offset`
+    def __init__(self, name, rule, times, offset, callback):
+        self.name = name
+        self.rule = to_offset(rule) if rule is not None else None
+        self.times = sorted(pd.Timestamp(t) for t in times) if times is not None else None
+        self.offset = pd.Timedelta(offset) if offset is not None else pd.Timedelta(0)
+        self.callback = callback
+        self._base = None
+        self._k = 0
+
+    def first(self, now):
+        """First fire time at or after `now`, or None."""
+        if self.times is not None:
+            while self._k < len(self.times) and self.times[self._k] + self.offset < now:
+                self._k += 1
+            return self._next_explicit()
+        base = self.rule.rollforward(now.normalize()) if not isinstance(self.rule, pd.offsets.Tick) else now.normalize()
+        while base + self.offset < now:
+            base = base + self.rule
+        self._base = base
+        return base + self.offset
+
+    def following(self):
+        if self.times is not None:
+            self._k += 1
+            return self._next_explicit()
+        self._base = self._base + self.rule
+        return self._base + self.offset
+
+    def _next_explicit(self):
+        return self.times[self._k] + self.offset if self._k < len(self.times) else None
+
+
+class EventScheduler:
+    """
+    Event queue ordered by simulated time, usable wherever the engine's
+    queue.Queue is (put / get(False) / empty, raising queue.Empty).
+
+    The clock is the timestamp of the latest MarketEvent put. Events put
+    without a time are due now and are handed out first in, first out, so
+    with no latencies and no timers a run is identical to one on a
+    queue.Queue. Events due later wait on a heap keyed by (due time,
+    sequence number):
+
+    - `latency` delays events by type, e.g. {'ORDER': '150ms', 'FILL': '1D'},
+      each value a Timedelta or a callable(event) returning one.
+    - `put(event, at=...)` or `put(event, delay=...)` schedules one event.
+    - `add_timer` fires TimerEvents on a calendar.
+
+    Bars are the only moments the simulation observes, so an event due at
+    time t is delivered on the first bar stamped at or after t, right after
+    that bar's MarketEvent. It therefore never sees a bar it would not have
+    seen when it arrived, and is never earlier than its due time. Ties are
+    broken by scheduling order, which makes every run deterministic.
+    """
+    def __init__(self, latency=None):
+        self.latency = {k: v if callable(v) else pd.Timedelta(v) for k, v in (latency or {}).items()}
+        self.now = None
+        self._now_ns = None
+        self._ready = deque()
+        self._future = []
+        self._timers = []
+        self._sequence = itertools.count()
+
+    # -- queue.Queue interface -------------------------------------------
+
+    def put(self, event, block=True, timeout=None, at=None, delay=None):
+        if event.type == 'MARKET' and getattr(event, 'datetime', None) is not None:
+            self._ready.append(event)
+            self.advance(event.datetime)
+            return
+        if at is None and delay is None and event.type in self.latency:
+            delay = self.latency[event.type]
+            delay = delay(event) if callable(delay) else delay
+        if at is not None:
+            due = _ns(at)
+        elif delay is not None and self._now_ns is not None:
+            due = self._now_ns + pd.Timedelta(delay).value
+        else:
+            self._ready.append(event)
+            return
+        if self._now_ns is not None and due <= self._now_ns:
+            self._ready.append(event)
+        else:
+            heapq.heappush(self._future, (due, next(self._sequence), event))
+
+    def put_nowait(self, event):
+        self.put(event)
+
+    def get(self, block=True, timeout=None):
+        """Next event due now; never blocks, as nothing else can make one due."""
+        try:
+            return self._ready.popleft()
+        except IndexError:
+            raise queue.Empty from None
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        return not self._ready
+
+    def qsize(self):
+        return len(self._ready)
+
+    # -- scheduling --------------------------------------------------------
+
+    def pending(self):
+        """Events and timer firings scheduled after the current time."""
+        return len(self._future)
+
+    def advance(self, when):
+        """Moves the clock to `when` and releases everything due by then, in (due time, sequence) order."""
+        when = pd.Timestamp(when)
+        if self.now is None:
+            self.now, self._now_ns = when, when.value
+            for timer in self._timers:
+                self._arm(timer, timer.first(when))
+        elif when.value > self._now_ns:
+            self.now, self._now_ns = when, when.value
+        future = self._future
+        while future and future[0][0] <= self._now_ns:
+            due, _, item = heapq.heappop(future)
+            if isinstance(item, _Timer):
+                self._ready.append(TimerEvent(item.name, pd.Timestamp(due, tz=self.now.tz), item.callback))
+                self._arm(item, item.following())
+            else:
+                self._ready.append(item)
+
+    def add_timer(self, name, rule=None, times=None, offset=None, callback=None):
+        """
+        Fires TimerEvent(name) at every `rule` occurrence, a pandas
+        frequency such as 'B' (each business day), 'W-FRI' or 'BME'
+        (business month-ends), or at the explicit `times` of a custom
+        calendar. `offset` shifts each time, e.g. rule='B', offset='16h'
+        for a daily session close on intraday bars. The engine calls
+        `callback(event)` when the timer event is processed; it must be
+        picklable (e.g. a bound method) for snapshots.
+        """
+        if (rule is None) == (times is None):
+            raise ValueError("Give exactly one of rule and times")
+        timer = _Timer(name, rule, times, offset, callback)
+        self._timers.append(timer)
+        if self.now is not None:
+            self._arm(timer, timer.first(self.now))
+        return timer
+
+    def _arm(self, timer, when):
+        if when is not None:
+            heapq.heappush(self._future, (when.value, next(self._sequence), timer))
+
+
+def benchmark(n_events=200_000, fanout=4):
+    """
+    Raw throughput of the event loop's queue operations: per simulated bar,
+    one MarketEvent followed by `fanout` events put and drained, as in
+    _run_backtest. Returns events per second for queue.Queue and for
+    EventScheduler with no latency and with every ORDER delayed.
+    """
+    from backtest.event import MarketEvent, OrderEvent
+
+    index = pd.date_range('2000-01-03', periods=n_events // (fanout + 1) + 1, freq='min')
+    order = OrderEvent('SYM', 'MKT', 1, 'BUY')
+
+    def run(events):
+        start = time.perf_counter()
+        count = 0
+        for ts in index:
+            events.put(MarketEvent(ts))
+            for _ in range(fanout):
+                events.put(order)
+            while True:
+                try:
+                    events.get(False)
+                except queue.Empty:
+                    break
+                count += 1
+        return count / (time.perf_counter() - start)
+
+    return {
+        'queue.Queue': run(queue.Queue()),
+        'EventScheduler': run(EventScheduler()),
+        'EventScheduler (ORDER latency)': run(EventScheduler(latency={'ORDER': '30s'})),
+    }
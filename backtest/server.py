@@ -0,0 +1,163 @@
+import argparse
+import json
+from datetime import timedelta
+
+import pyarrow as pa
+import tornado.ioloop
+import tornado.locks
+import tornado.web
+from tornado.iostream import StreamClosedError
+
+from backtest.jobs import JobManager, JobQueueFull
+
+RESULT_TABLES = ('summary', 'equity', 'trades')
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+KEEPALIVE = timedelta(seconds=15)
+
+
+class _JobHandler(tornado.web.RequestHandler):
+    def initialize(self, manager, updated):
+        self.manager = manager
+        self.updated = updated
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(payload, default=str))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({'error': self._reason}, status_code)
+
+    def _job(self, job_id):
+        job = self.manager.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason=f"Unknown job {job_id}")
+        return job
+
+
+class JobsHandler(_JobHandler):
+    def get(self):
+        self.write_json([job.status() for job in self.manager.jobs.values()])
+
+    def post(self):
+        try:
+            request = json.loads(self.request.body or b'{}')
+            job, created = self.manager.submit(request)
+        except JobQueueFull as exc:
+            raise tornado.web.HTTPError(503, reason=str(exc))
+        except (ValueError, TypeError) as exc:
+            raise tornado.web.HTTPError(400, reason=str(exc))
+        self.set_header('Location', f"/jobs/{job.job_id}")
+        self.write_json({'job_id': job.job_id, 'created': created, **job.status()}, 202 if created else 200)
+
+
+class JobHandler(_JobHandler):
+    def get(self, job_id):
+        self.write_json(self._job(job_id).status())
+
+
+class JobEventsHandler(_JobHandler):
+    """
+    Server-sent events: one `data:` record per finished strategy, starting
+    after `?since=N` (or the Last-Event-ID header) so clients can reconnect
+    without missing or repeating progress. The stream ends with the job.
+    """
+    async def get(self, job_id):
+        job = self._job(job_id)
+        try:
+            cursor = int(self.get_argument('since', self.request.headers.get('Last-Event-ID', 0)))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="since and Last-Event-ID must be integers")
+        self.set_header('Content-Type', 'text/event-stream')
+        self.set_header('Cache-Control', 'no-cache')
+        try:
+            while True:
+                events = job.events[cursor:]
+                for event in events:
+                    cursor += 1
+                    self.write(f"id: {cursor}\ndata: {json.dumps(event)}\n\n")
+                if job.finished is not None and cursor >= len(job.events):
+                    break
+                if not events and not await self.updated.wait(timeout=KEEPALIVE):
+                    self.write(": keepalive\n\n")
+                await self.flush()
+        except StreamClosedError:
+            return
+        self.finish()
+
+
+class JobResultHandler(_JobHandler):
+    """
+    `?format=json` (default) returns the summary, equity curves and trades;
+    `?format=arrow&table=summary|equity|trades` returns one of them as an
+    Arrow IPC stream. Finished jobs only.
+    """
+    def get(self, job_id):
+        job = self._job(job_id)
+        if job.finished is None:
+            raise tornado.web.HTTPError(409, reason=f"Job {job_id} is {job.state}")
+
+        fmt = self.get_argument('format', 'json')
+        tables = self.get_arguments('table') or (list(RESULT_TABLES) if fmt == 'json' else ['summary'])
+        unknown = [t for t in tables if t not in RESULT_TABLES]
+        if unknown:
+            raise tornado.web.HTTPError(400, reason=f"Unknown table {unknown[0]}, expected one of {RESULT_TABLES}")
+        frames = {t: getattr(job, f"{t}_frame")() for t in tables}
+
+        if fmt == 'json':
+            payload = {'job_id': job.job_id, 'state': job.state, 'errors': job.errors}
+            for name, frame in frames.items():
+                payload[name] = json.loads(frame.to_json(orient='records', date_format='iso'))
+            self.write_json(payload)
+        elif fmt == 'arrow':
+            if len(tables) != 1:
+                raise tornado.web.HTTPError(400, reason="format=arrow takes exactly one table")
+            table = pa.Table.from_pandas(frames[tables[0]], preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            self.set_header('Content-Type', ARROW_STREAM)
+            self.finish(sink.getvalue().to_pybytes())
+        else:
+            raise tornado.web.HTTPError(400, reason=f"Unknown format {fmt}, expected json or arrow")
+
+
+def make_app(manager):
+    """
+    Builds the tornado application. `manager.on_update` is wired to wake the
+    event streams, so pass a manager that is not shared with another app.
+    """
+    updated = tornado.locks.Condition()
+    loop = tornado.ioloop.IOLoop.current()
+    # Pool callbacks run on a background thread; hand the wake-up to the loop
+    manager.on_update = lambda job: loop.add_callback(updated.notify_all)
+    kwargs = {'manager': manager, 'updated': updated}
+    return tornado.web.Application([
+        (r'/jobs', JobsHandler, kwargs),
+        (r'/jobs/([0-9a-f]+)', JobHandler, kwargs),
+        (r'/jobs/([0-9a-f]+)/events', JobEventsHandler, kwargs),
+        (r'/jobs/([0-9a-f]+)/result', JobResultHandler, kwargs),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for submitting and polling backtest jobs")
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--max-pending', type=int, default=64, help="unfinished jobs before new ones are refused")
+    parser.add_argument('--data-dir', help="read <ticker>.parquet/.csv from here instead of Yahoo Finance")
+    args = parser.parse_args(argv)
+
+    manager = JobManager(max_workers=args.workers, max_pending=args.max_pending, data_dir=args.data_dir)
+    app = make_app(manager)
+    app.listen(args.port, args.address)
+    print(f"Backtest job server listening on http://{args.address}:{args.port}")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    finally:
+        manager.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import itertools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+PERIODS_PER_YEAR = 252
+EULER_GAMMA = 0.5772156649015329
+
+_erfc = np.vectorize(math.erfc, otypes=[np.float64])
+
+
+def _norm_cdf(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=np.float64) / math.sqrt(2.0))
+
+
+def _matrix(returns):
+    x = np.asarray(returns, dtype=np.float64)
+    return x.reshape(len(x), -1)
+
+
+def _columns(returns, n):
+    return returns.columns if isinstance(returns, pd.DataFrame) else pd.RangeIndex(n)
+
+
+def _sharpe(x):
+    # Per-bar Sharpe ratio of each column; 0 for a column that never moves
+    std = x.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, x.mean(axis=0) / std, 0.0)
+
+
+def expected_max_sharpe(n_trials, variance):
+    """
+    Expected largest of `n_trials` Sharpe ratios (per bar) whose true value
+    is 0 and whose estimates have cross-trial `variance`: what the best of
+    a search scores by luck alone.
+    """
+    if n_trials < 2 or variance <= 0:
+        return 0.0
+    z = NormalDist().inv_cdf
+    return math.sqrt(variance) * ((1.0 - EULER_GAMMA) * z(1.0 - 1.0 / n_trials)
+                                  + EULER_GAMMA * z(1.0 - 1.0 / (n_trials * math.e)))
+
+
+def probabilistic_sharpe(sharpe, benchmark, n_bars, skew=0.0, kurtosis=3.0):
+    """
+    Probability that the true per-bar Sharpe ratio exceeds `benchmark`,
+    given `sharpe` estimated from `n_bars` returns with the given skew and
+    (non-excess) kurtosis, which widen the estimate's error.
+    """
+    sharpe = np.asarray(sharpe, dtype=np.float64)
+    spread = 1.0 - skew * sharpe + (kurtosis - 1.0) / 4.0 * sharpe ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (sharpe - benchmark) * math.sqrt(n_bars - 1) / np.sqrt(np.maximum(spread, 1e-12))
+    return _norm_cdf(z)
+
+
+def deflated_sharpe(returns, n_trials=None, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Deflated Sharpe ratio of every column of `returns` (bars x strategies).
+    The benchmark is the Sharpe ratio the best of `n_trials` skill-less
+    strategies would reach (default: one trial per column; pass the full
+    count when the columns were picked from a larger sweep). Returns a
+    DataFrame with the annualised Sharpe ratio, the probabilistic Sharpe
+    ratio against 0 and the deflated Sharpe ratio, both probabilities.
+    """
+    x = _matrix(returns)
+    n_bars, n = x.shape
+    n_trials = n if n_trials is None else n_trials
+    sharpe = _sharpe(x)
+    centered = x - x.mean(axis=0)
+    squared = centered * centered
+    variance = squared.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew = np.where(variance > 0, (squared * centered).mean(axis=0) / variance ** 1.5, 0.0)
+        kurtosis = np.where(variance > 0, (squared * squared).mean(axis=0) / variance ** 2, 3.0)
+    benchmark = expected_max_sharpe(n_trials, sharpe.var(ddof=1) if n > 1 else 0.0)
+    return pd.DataFrame({
+        'sharpe': sharpe * math.sqrt(periods_per_year),
+        'psr': probabilistic_sharpe(sharpe, 0.0, n_bars, skew, kurtosis),
+        'dsr': probabilistic_sharpe(sharpe, benchmark, n_bars, skew, kurtosis),
+    }, index=_columns(returns, n))
+
+
+def backtest_overfitting(returns, n_blocks=16, chunk=2048):
+    """
+    Probability of backtest overfitting by combinatorially symmetric
+    cross-validation. The bars are cut into `n_blocks` blocks; for every
+    way of choosing half of them as in-sample, the strategy with the best
+    in-sample Sharpe ratio is ranked out of sample. Returns a dict with
+    'pbo' (the share of splits where it ranks in the bottom half),
+    'logits' (the logit of its out-of-sample rank per split) and
+    'degradation' (the in- and out-of-sample Sharpe ratios per split).
+
+    Blocks are summarised once and every split's Sharpe ratios come from
+    one matrix product, `chunk` splits at a time.
+    """
+    x = _matrix(returns)
+    if n_blocks % 2 or n_blocks < 2:
+        raise ValueError("n_blocks must be a positive even number")
+    blocks = np.array_split(np.arange(len(x)), n_blocks)
+    count = np.array([len(b) for b in blocks], dtype=np.float64)
+    sums = np.array([x[b].sum(axis=0) for b in blocks])
+    squares = np.array([(x[b] ** 2).sum(axis=0) for b in blocks])
+
+    def sharpe(mask):
+        n = mask @ count
+        mean = (mask @ sums) / n[:, None]
+        var = ((mask @ squares) - n[:, None] * mean ** 2) / (n[:, None] - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(var > 0, mean / np.sqrt(np.maximum(var, 0.0)), 0.0)
+
+    combos = itertools.combinations(range(n_blocks), n_blocks // 2)
+    logits, in_best, out_best = [], [], []
+    n = x.shape[1]
+    while True:
+        batch = list(itertools.islice(combos, chunk))
+        if not batch:
+            break
+        mask = np.zeros((len(batch), n_blocks))
+        mask[np.repeat(np.arange(len(batch)), n_blocks // 2), np.concatenate(batch)] = 1.0
+        in_sample, out_sample = sharpe(mask), sharpe(1.0 - mask)
+        best = np.argmax(in_sample, axis=1)
+        rows = np.arange(len(batch))
+        chosen = out_sample[rows, best]
+        rank = (out_sample < chosen[:, None]).sum(axis=1) + 1
+        omega = rank / (n + 1.0)
+        logits.append(np.log(omega / (1.0 - omega)))
+        in_best.append(in_sample[rows, best])
+        out_best.append(chosen)
+    logits = np.concatenate(logits)
+    return {
+        'pbo': float((logits <= 0).mean()),
+        'logits': logits,
+        'degradation': pd.DataFrame({'in_sample': np.concatenate(in_best), 'out_of_sample': np.concatenate(out_best)}),
+    }
+
+
+def _stationary_indices(rng, n_boot, n_bars, block):
+    # Politis-Romano stationary bootstrap: runs of consecutive bars (wrapping
+    # around) with geometric lengths of mean `block`, for n_boot resamples
+    start = rng.integers(0, n_bars, size=(n_boot, n_bars))
+    restart = rng.random((n_boot, n_bars)) < 1.0 / block
+    restart[:, 0] = True
+    steps = np.arange(n_bars)
+    last = np.maximum.accumulate(np.where(restart, steps, 0), axis=1)
+    return (np.take_along_axis(start, last, axis=1) + steps - last) % n_bars
+
+
+def _bootstrap_means(seed, x, n_boot, block):
+    # Mean of every column under n_boot resamples, as resample counts @ x
+    n_bars = len(x)
+    idx = _stationary_indices(np.random.default_rng(seed), n_boot, n_bars, block)
+    offsets = (np.arange(n_boot) * n_bars)[:, None]
+    counts = np.bincount((idx + offsets).ravel(), minlength=n_boot * n_bars).reshape(n_boot, n_bars)
+    return (counts @ x) / n_bars
+
+
+def bootstrap_means(returns, n_boot=1000, block=None, seed=0, workers=None, chunk=100):
+    """
+    (n_boot x strategies) column means of stationary-bootstrap resamples of
+    `returns`, resampling whole rows so the strategies' correlation is
+    kept. `block` is the mean block length (default n_bars ** (1/3)).
+    Chunks of `chunk` resamples run on `workers` threads (NumPy releases
+    the GIL); each chunk has its own seed, so the result does not depend on
+    the number of workers.
+    """
+    x = _matrix(returns)
+    block = max(1.0, round(len(x) ** (1.0 / 3.0))) if block is None else block
+    sizes = [min(chunk, n_boot - i) for i in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(lambda args: _bootstrap_means(args[0], x, args[1], block), zip(seeds, sizes)))
+    return np.vstack(parts)
+
+
+def reality_check(returns, benchmark=None, n_boot=1000, block=None, seed=0, workers=None):
+    """
+    Tests whether the best strategy beats `benchmark` (a series or column
+    of per-bar returns aligned with `returns`; default cash, i.e. zero) by
+    more than data snooping over all the strategies explains, with White's
+    Reality Check and Hansen's Superior Predictive Ability test sharing one
+    stationary bootstrap (see bootstrap_means). Returns a dict with the
+    best strategy and the p-values: 'reality_check', 'spa' (Hansen's
+    consistent p-value) and its bounds 'spa_lower' and 'spa_upper'.
+    Small p-values mean the best strategy's edge is unlikely to be luck.
+    """
+    x = _matrix(returns)
+    if benchmark is not None:
+        x = x - np.asarray(benchmark, dtype=np.float64).reshape(len(x), -1)
+    n_bars, n = x.shape
+    mean = x.mean(axis=0)
+    boot = bootstrap_means(x, n_boot, block, seed, workers)
+    root = math.sqrt(n_bars)
+
+    statistic = root * mean.max()
+    p_rc = float((root * (boot - mean).max(axis=1) >= statistic).mean())
+
+    omega = root * boot.std(axis=0)
+    omega = np.where(omega > 0, omega, np.inf)
+    studentized = root * mean / omega
+    spa_statistic = max(studentized.max(), 0.0)
+    # Strategies far below the benchmark do not count against the best one
+    threshold = -np.sqrt(2.0 * math.log(math.log(n_bars))) if n_bars > 2 else -np.inf
+    p = {}
+    for name, centre in (('spa_lower', np.maximum(mean, 0.0)),
+                         ('spa', np.where(studentized >= threshold, mean, 0.0)),
+                         ('spa_upper', mean)):
+        z = root * (boot - centre) / omega
+        p[name] = float((np.maximum(z.max(axis=1), 0.0) >= spa_statistic).mean())
+    return {
+        'best': _columns(returns, n)[int(np.argmax(mean))],
+        'reality_check': p_rc,
+        'spa': p['spa'],
+        'spa_lower': p['spa_lower'],
+        'spa_upper': p['spa_upper'],
+    }
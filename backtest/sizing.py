@@ -0,0 +1,164 @@
+import numpy as np
+
+from backtest import indicators as ind
+
+
+class PositionSizer:
+    """
+    Decides what fraction of equity a new long entry commits; the Portfolio
+    turns it into a share quantity. Exits always close the whole position.
+
+    The rolling inputs (volatilities, return moments) are computed once per
+    symbol over the full adjusted history by `compute` and looked up by bar
+    index when a signal arrives, so sizing adds no per-bar work. Row i only
+    uses bars up to i, as a strategy would see them. The arrays are rebuilt
+    when the history grows (Backtest.resume).
+
+    The result is scaled by SignalEvent.strength when `use_strength` is set
+    and capped at `max_weight`. While an input is still NaN (the first
+    `window` bars) the Portfolio's position_size is used instead.
+    """
+    def __init__(self, max_weight=1.0, use_strength=True):
+        self.max_weight = max_weight
+        self.use_strength = use_strength
+        self._arrays = {}
+
+    def compute(self, bars):
+        """Returns {name: array aligned with `bars`} for one symbol."""
+        return {}
+
+    def arrays(self, data_handler, symbol):
+        n_bars = len(data_handler.symbol_data[symbol])
+        cached = self._arrays.get(symbol)
+        if cached is None or cached[0] != n_bars:
+            cached = (n_bars, self.compute(data_handler.adjusted_data(symbol)))
+            self._arrays[symbol] = cached
+        return cached[1]
+
+    def value(self, portfolio, symbol, name):
+        bar = portfolio.data_handler.bar_index - 1
+        return float(self.arrays(portfolio.data_handler, symbol)[name][bar])
+
+    def target_weight(self, symbol, portfolio):
+        raise NotImplementedError("Should implement target_weight()")
+
+    def size(self, signal, portfolio):
+        weight = self.target_weight(signal.symbol, portfolio)
+        if not np.isfinite(weight):
+            weight = portfolio.position_size
+        if self.use_strength and signal.strength is not None:
+            weight *= float(signal.strength)
+        return float(min(max(weight, 0.0), self.max_weight))
+
+
+class FixedFractionSizer(PositionSizer):
+    """`fraction` of equity per entry (default: the Portfolio's position_size), scaled by signal strength."""
+    def __init__(self, fraction=None, max_weight=1.0, use_strength=True):
+        super().__init__(max_weight, use_strength)
+        self.fraction = fraction
+
+    def target_weight(self, symbol, portfolio):
+        return portfolio.position_size if self.fraction is None else self.fraction
+
+
+def _volatility(bars, window, estimator, periods_per_year):
+    # Annualised volatility from close-to-close returns ('std') or from
+    # Wilder's ATR as a fraction of the close ('atr')
+    close = bars['Close'].astype(np.float64)
+    if estimator == 'std':
+        vol = close.pct_change().rolling(window=window).std()
+    elif estimator == 'atr':
+        atr = ind.atr(bars['High'].astype(np.float64), bars['Low'].astype(np.float64), close, window)
+        # The recursive ATR has a value from the first bar; treat it as
+        # unreliable until a full window has gone in
+        vol = (atr / close).where(np.arange(len(close)) >= window - 1)
+    else:
+        raise ValueError(f"Unknown volatility estimator '{estimator}', expected 'std' or 'atr'")
+    return (vol * np.sqrt(periods_per_year)).to_numpy()
+
+
+class VolatilityTargetSizer(PositionSizer):
+    """
+    Sizes each entry so that the position alone would run at
+    `target_volatility` (annualised): weight = target / realised volatility
+    over the last `window` bars.
+    """
+    def __init__(self, target_volatility=0.10, window=20, estimator='std', periods_per_year=252, max_weight=1.0,
+                 use_strength=True):
+        super().__init__(max_weight, use_strength)
+        self.target_volatility = target_volatility
+        self.window = window
+        self.estimator = estimator
+        self.periods_per_year = periods_per_year
+
+    def compute(self, bars):
+        return {'volatility': _volatility(bars, self.window, self.estimator, self.periods_per_year)}
+
+    def target_weight(self, symbol, portfolio):
+        vol = self.value(portfolio, symbol, 'volatility')
+        return self.target_volatility / vol if vol > 0 else np.nan
+
+
+class KellySizer(PositionSizer):
+    """
+    Fractional Kelly from the symbol's own returns: weight = `fraction` x
+    mean / variance of the last `window` bars' returns. A negative edge
+    sizes to zero, so the entry is skipped.
+    """
+    def __init__(self, window=252, fraction=0.5, max_weight=1.0, use_strength=True):
+        super().__init__(max_weight, use_strength)
+        self.window = window
+        self.fraction = fraction
+
+    def compute(self, bars):
+        returns = bars['Close'].astype(np.float64).pct_change()
+        rolling = returns.rolling(window=self.window)
+        return {'mean': rolling.mean().to_numpy(), 'variance': rolling.var().to_numpy()}
+
+    def target_weight(self, symbol, portfolio):
+        variance = self.value(portfolio, symbol, 'variance')
+        if not variance > 0:
+            return np.nan
+        return self.fraction * self.value(portfolio, symbol, 'mean') / variance
+
+
+class RiskParitySizer(PositionSizer):
+    """
+    Inverse-volatility weights across the open positions plus the new
+    entry: the entry gets gross_exposure x (1/vol) / sum(1/vol) of equity,
+    so every holding contributes about the same risk. Positions already
+    open are not rebalanced.
+    """
+    def __init__(self, gross_exposure=1.0, window=60, estimator='std', periods_per_year=252, max_weight=1.0,
+                 use_strength=True):
+        super().__init__(max_weight, use_strength)
+        self.gross_exposure = gross_exposure
+        self.window = window
+        self.estimator = estimator
+        self.periods_per_year = periods_per_year
+
+    def compute(self, bars):
+        return {'volatility': _volatility(bars, self.window, self.estimator, self.periods_per_year)}
+
+    def target_weight(self, symbol, portfolio):
+        held = [s for s in portfolio.symbol_list if s != symbol and portfolio.current_positions[s] > 0]
+        vols = np.array([self.value(portfolio, s, 'volatility') for s in [symbol] + held])
+        if not vols[0] > 0:
+            return np.nan
+        inverse = 1.0 / vols[vols > 0]
+        return self.gross_exposure * (1.0 / vols[0]) / inverse.sum()
+
+
+SIZERS = {
+    'fixed': FixedFractionSizer,
+    'volatility': VolatilityTargetSizer,
+    'kelly': KellySizer,
+    'risk_parity': RiskParitySizer,
+}
+
+
+def make_sizer(method, **params):
+    """Builds a sizer from its SIZERS name, e.g. make_sizer('volatility', target_volatility=0.15)."""
+    if method not in SIZERS:
+        raise ValueError(f"Unknown sizing method '{method}', expected one of {tuple(SIZERS)}")
+    return SIZERS[method](**params)
@@ -1,3 +1,8 @@
+import numpy as np
+
+from backtest.event import SignalEvent
+
+
 class Strategy:
     """
     Strategy is an abstract base class providing an interface for
@@ -9,7 +14,14 @@ class Strategy:
 
     This is designed to work with both historic and live data as
     the Strategy object is agnostic to the data source.
+
+    A strategy may also implement `signals_matrix`, which evaluates every
+    symbol at once on (bars, symbols) arrays; Backtest(matrix=True) and the
+    universe scanner use it instead of the per-symbol loop.
     """
+    # True when signals_matrix carries state from one bar to the next
+    # (e.g. Parabolic SAR) and must see every bar in order
+    matrix_stateful = False
 
     def calculate_signals(self, event):
         """
@@ -17,3 +29,62 @@ class Strategy:
         This method is implemented by all inheriting classes.
         """
         raise NotImplementedError("Should implement calculate_signals()")
+
+    def signals_matrix(self, panel):
+        """
+        Optional matrix form of calculate_signals. Receives a
+        backtest.data.BarPanel and returns two boolean arrays over its
+        symbols: the LONG and EXIT conditions on the latest bar, before the
+        check against `self.bought`. Symbols with too few bars must be
+        False in both.
+        """
+        raise NotImplementedError("Should implement signals_matrix()")
+
+    @classmethod
+    def supports_matrix(cls):
+        return cls.signals_matrix is not Strategy.signals_matrix
+
+    def gate_signals(self, long, exit_):
+        """
+        Applies the position check to signals_matrix's conditions, LONG
+        only for flat symbols and EXIT only for held ones, and updates
+        `self.bought`. Returns the (long, exit) arrays that fire.
+        """
+        bought = np.fromiter((self.bought[s] for s in self.symbol_list), dtype=bool, count=len(self.symbol_list))
+        long = long & ~bought
+        exit_ = exit_ & bought
+        for i in np.flatnonzero(long | exit_):
+            self.bought[self.symbol_list[i]] = bool(long[i])
+        return long, exit_
+
+    def calculate_signals_matrix(self, event):
+        """calculate_signals for all symbols in one signals_matrix call."""
+        if event.type == 'MARKET':
+            long, exit_ = self.gate_signals(*self.signals_matrix(self.data_handler.get_latest_panel()))
+            for i in np.flatnonzero(long | exit_):
+                s = self.symbol_list[i]
+                dt = self.data_handler.get_latest_bar_datetime(s)
+                signal = SignalEvent(self.__class__.__name__, s, dt, 'LONG' if long[i] else 'EXIT', 1.0)
+                self.events.put(signal)
+
+
+def latest(frame):
+    """Last row of a (bars, symbols) frame as a float64 array."""
+    return frame.iloc[-1].to_numpy(dtype=np.float64)
+
+
+def previous(frame):
+    """Second to last row of a (bars, symbols) frame as a float64 array."""
+    return frame.iloc[-2].to_numpy(dtype=np.float64)
+
+
+def crosses(a, b):
+    """(crossed above, crossed below) of `a` against `b` between the last two rows."""
+    a_last, a_prev, b_last, b_prev = latest(a), previous(a), latest(b), previous(b)
+    return (a_last > b_last) & (a_prev <= b_prev), (a_last < b_last) & (a_prev >= b_prev)
+
+
+def crosses_level(a, level):
+    """(crossed above, crossed below) of `a` against a constant."""
+    a_last, a_prev = latest(a), previous(a)
+    return (a_last > level) & (a_prev <= level), (a_last < level) & (a_prev >= level)
@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+def _level(level):
+    if isinstance(level, str):
+        names = {v: k for k, v in LEVEL_NAMES.items()}
+        if level.upper() not in names:
+            raise ValueError(f"Unknown trace level '{level}', expected one of {tuple(names)}")
+        return names[level.upper()]
+    return int(level)
+
+
+class TraceSite:
+    """
+    One place in the code that emits records, created once at import with
+    `site()`. Calling it stores the raw arguments; `fmt` is only applied
+    when records are read, dumped or echoed. `enabled` is a plain attribute
+    kept in sync with the tracer's level, so hot loops can skip even the
+    call:
+
+        _fill = trace.site('backtest.engine.fill', "FILL {} {} {} @ {:.2f}")
+        ...
+        if _fill.enabled:
+            _fill(symbol, direction, quantity, cost)
+
+    `rate` caps the records kept per second; the rest are counted in
+    `suppressed`. Records hold their arguments until the ring overwrites
+    them, so pass plain values (e.g. an exception's type name and message,
+    not the exception, whose traceback keeps its frames alive).
+    """
+    __slots__ = ('tracer', 'id', 'name', 'fmt', 'level', 'rate', 'enabled', 'suppressed', '_window', '_count')
+
+    def __init__(self, tracer, site_id, name, fmt, level, rate):
+        self.tracer = tracer
+        self.id = site_id
+        self.name = name
+        self.fmt = fmt
+        self.level = level
+        self.rate = rate
+        self.enabled = level >= tracer.level
+        self.suppressed = 0
+        self._window = 0.0
+        self._count = 0
+
+    def __call__(self, *args):
+        if not self.enabled:
+            return
+        if self.rate is not None:
+            now = time.monotonic()
+            if now - self._window >= 1.0:
+                self._window = now
+                self._count = 0
+            if self._count >= self.rate:
+                self.suppressed += 1
+                return
+            self._count += 1
+        self.tracer._record(self, args)
+
+    def format(self, args):
+        try:
+            return self.fmt.format(*args)
+        except (IndexError, KeyError, ValueError, TypeError):
+            return f"{self.fmt} {args!r}"
+
+
+class Tracer:
+    """
+    Keeps the last `capacity` records in a ring buffer of preallocated
+    arrays (timestamp, site id, argument tuple) and formats nothing until
+    they are read. Records at `echo_level` or above are also written to
+    `stream` as they happen (None to disable).
+    """
+    def __init__(self, level=WARNING, capacity=65536, stream=sys.stderr, echo_level=WARNING):
+        self.level = _level(level)
+        self.stream = stream
+        self.echo_level = _level(echo_level)
+        self.sites = {}
+        self._by_id = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = int(capacity)
+        self._time = np.zeros(self.capacity, dtype=np.int64)
+        self._site = np.zeros(self.capacity, dtype=np.int32)
+        self._args = np.empty(self.capacity, dtype=object)
+        self._written = 0
+
+    def site(self, name, fmt, level=DEBUG, rate=None):
+        """Registers (or returns the existing) site called `name`."""
+        if name in self.sites:
+            return self.sites[name]
+        site = TraceSite(self, len(self._by_id), name, fmt, _level(level), rate)
+        self.sites[name] = site
+        self._by_id.append(site)
+        return site
+
+    def set_level(self, level):
+        self.level = _level(level)
+        for site in self._by_id:
+            site.enabled = site.level >= self.level
+
+    def configure(self, level=None, capacity=None, stream=False, echo_level=None):
+        """Changes settings in place; `stream=False` keeps the current stream."""
+        if level is not None:
+            self.set_level(level)
+        if capacity is not None and int(capacity) != self.capacity:
+            self._allocate(capacity)
+        if stream is not False:
+            self.stream = stream
+        if echo_level is not None:
+            self.echo_level = _level(echo_level)
+
+    def _record(self, site, args):
+        i = self._written % self.capacity
+        self._time[i] = time.time_ns()
+        self._site[i] = site.id
+        self._args[i] = args
+        self._written += 1
+        if self.stream is not None and site.level >= self.echo_level:
+            self.stream.write(f"{LEVEL_NAMES.get(site.level, site.level)} {site.name}: {site.format(args)}\n")
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def dropped(self):
+        """Records overwritten because the ring was full."""
+        return max(0, self._written - self.capacity)
+
+    def clear(self):
+        self._args[:] = None
+        self._written = 0
+        for site in self._by_id:
+            site.suppressed = 0
+
+    def records(self, prefix=None):
+        """Yields (time_ns, site, args) oldest first, optionally only for sites starting with `prefix`."""
+        n = len(self)
+        start = self._written - n
+        for k in range(start, self._written):
+            i = k % self.capacity
+            site = self._by_id[self._site[i]]
+            if prefix is None or site.name.startswith(prefix):
+                yield int(self._time[i]), site, self._args[i]
+
+    def to_frame(self, prefix=None):
+        """Formatted records as a DataFrame (time, level, site, message)."""
+        rows = [(t, LEVEL_NAMES.get(site.level, site.level), site.name, site.format(args))
+                for t, site, args in self.records(prefix)]
+        frame = pd.DataFrame(rows, columns=['time', 'level', 'site', 'message'])
+        frame['time'] = pd.to_datetime(frame['time'], unit='ns')
+        return frame
+
+    def dump(self, path, prefix=None):
+        """Writes the formatted records to `path` as JSON lines."""
+        with open(path, 'w') as f:
+            for t, site, args in self.records(prefix):
+                f.write(json.dumps({'time_ns': t, 'level': LEVEL_NAMES.get(site.level, site.level),
+                                    'site': site.name, 'message': site.format(args)}) + '\n')
+
+    def stats(self):
+        """Records suppressed by rate limits, per site."""
+        return {site.name: site.suppressed for site in self._by_id if site.suppressed}
+
+
+# Process-wide tracer; BACKTEST_TRACE=DEBUG enables everything
+_TRACER = Tracer(level=os.environ.get('BACKTEST_TRACE', 'WARNING'))
+
+
+def get_tracer():
+    return _TRACER
+
+
+def site(name, fmt, level=DEBUG, rate=None):
+    return _TRACER.site(name, fmt, level, rate)
+
+
+def configure(level=None, capacity=None, stream=False, echo_level=None):
+    _TRACER.configure(level, capacity, stream, echo_level)
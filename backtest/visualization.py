@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the positions of the points to keep so that a line drawn through
+    them keeps the visual shape of the full series (peaks and troughs survive,
+    unlike plain striding). The first and last points are always kept.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Positions are used as the x axis so that irregular timestamps do not
+    # bias the triangle areas towards long gaps (weekends, holidays).
+    x = np.arange(n, dtype=np.float64)
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(np.nanmean(y)) else 0.0, y)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs((x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max bucketing: keeps the lowest and highest point of every bucket.
+    Cheaper than LTTB and guarantees that no extreme is dropped.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    filled = np.where(np.isnan(y), np.inf, y)
+    mins = np.minimum.reduceat(filled, edges[:-1])
+    filled = np.where(np.isnan(y), -np.inf, y)
+    maxs = np.maximum.reduceat(filled, edges[:-1])
+
+    # Map the bucket extremes back to positions; bucket ids come from the edges
+    bucket_id = np.repeat(np.arange(n_buckets), np.diff(edges))
+    is_min = np.flatnonzero(y == mins[bucket_id])
+    is_max = np.flatnonzero(y == maxs[bucket_id])
+    # Keep only the first hit in each bucket
+    first_min = is_min[np.unique(bucket_id[is_min], return_index=True)[1]]
+    first_max = is_max[np.unique(bucket_id[is_max], return_index=True)[1]]
+
+    return np.unique(np.concatenate(([0, n - 1], first_min, first_max)))
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+
+def downsample_frame(df, max_points=1000, start=None, end=None, method='lttb'):
+    """
+    Returns a view of `df` (indexed by datetime, one column per curve) that
+    fits in `max_points` rows. `start`/`end` select a zoom window which is
+    cut from the full-resolution data before downsampling, so zooming in
+    always reveals the detail that was hidden at the wider range.
+    """
+    if df is None or df.empty:
+        return df
+
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    if len(df) <= max_points:
+        return df
+
+    pick = DOWNSAMPLERS[method]
+    # Share the point budget between the curves and keep the union of the
+    # selected rows, so every curve keeps its own peaks and troughs.
+    per_curve = max(3, max_points // max(1, len(df.columns)))
+    keep = [pick(df[col].to_numpy(dtype=np.float64, na_value=np.nan), per_curve) for col in df.columns]
+    keep = np.unique(np.concatenate(keep))
+    return df.iloc[keep]
+
+
+def paginate(df, page=1, page_size=100):
+    """
+    Returns (rows for the 1-based `page`, number of pages). Only the requested
+    slice is sent to the browser.
+    """
+    if df is None or len(df) == 0:
+        return df, 1
+
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, int(page)), n_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], n_pages
+
+
+def trade_log_frame(trade_log):
+    """
+    Converts a backtest trade log into a DataFrame for display.
+    """
+    if isinstance(trade_log, pd.DataFrame):
+        return trade_log
+    if hasattr(trade_log, 'to_dataframe'):
+        return trade_log.to_dataframe()
+    return pd.DataFrame(trade_log)
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class AroonIndicatorStrategy(Strategy):
     """
@@ -22,6 +25,12 @@ class AroonIndicatorStrategy(Strategy):
             bought[s] = False
         return bought
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period + 1)
+        up, down = (latest(x) for x in ind.aroon(bars['High'], bars['Low'], self.period))
+        enough = panel.has(self.period + 1)
+        return enough & (up > down), enough & (up < down)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -37,20 +46,10 @@ class AroonIndicatorStrategy(Strategy):
                     aroon_down = (low_series.rolling(window=self.period).apply(np.argmin, raw=True) / self.period) * 100
                     
                     # Extract scalar values
-                    aroon_up_last = float(aroon_up.iloc[-1])
-                    aroon_down_last = float(aroon_down.iloc[-1])
+                    aroon_up_last = aroon_up.iloc[-1]
+                    aroon_down_last = aroon_down.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if np.isnan(aroon_up_last) or np.isnan(aroon_down_last):
@@ -66,5 +65,5 @@ class AroonIndicatorStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
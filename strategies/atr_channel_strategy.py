@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class ATRChannelStrategy(Strategy):
     def __init__(self, data_handler, events, sma_period=20, atr_period=14, atr_multiplier=2.0):
@@ -16,6 +20,13 @@ class ATRChannelStrategy(Strategy):
     def _calculate_initial_bought(self):
         return {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.sma_period)
+        sma = latest(ind.sma(bars['Close'], self.sma_period))
+        atr = latest(ind.atr(bars['High'], bars['Low'], bars['Close'], self.atr_period))
+        buy = panel.has(self.sma_period) & (latest(bars['Close']) > sma + atr * self.atr_multiplier)
+        return buy, np.zeros(len(panel), dtype=bool)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -38,22 +49,12 @@ class ATRChannelStrategy(Strategy):
                     sma_last = float(sma.iloc[-1])
                     upper_channel = sma_last + (atr_last * self.atr_multiplier)
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     price = self.data_handler.get_latest_bar_value(s, 'Close')
                     
                     # Check for NaN values
-                    if np.isnan(upper_channel) or np.isnan(price):
+                    if np.isnan(upper_channel):
                         continue
 
                     if price > upper_channel and not self.bought[s]:
@@ -62,5 +63,5 @@ class ATRChannelStrategy(Strategy):
                         self.bought[s] = True
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
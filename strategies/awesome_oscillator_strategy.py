@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses_level
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class AwesomeOscillatorStrategy(Strategy):
     def __init__(self, data_handler, events, short_period=5, long_period=34):
@@ -12,6 +15,13 @@ class AwesomeOscillatorStrategy(Strategy):
         self.long_period = long_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.long_period)
+        ao = ind.awesome_oscillator(bars['High'], bars['Low'], self.short_period, self.long_period)
+        buy, sell = crosses_level(ao, 0)
+        enough = panel.has(self.long_period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -26,20 +36,10 @@ class AwesomeOscillatorStrategy(Strategy):
                     ao = short_ma - long_ma
                     
                     # Extract scalar values
-                    ao_last = float(ao.iloc[-1])
-                    ao_prev = float(ao.iloc[-2])
+                    ao_last = ao.iloc[-1]
+                    ao_prev = ao.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if np.isnan(ao_last) or np.isnan(ao_prev):
@@ -55,5 +55,5 @@ class AwesomeOscillatorStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
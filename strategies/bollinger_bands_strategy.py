@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class BollingerBandsStrategy(Strategy):
     def __init__(self, data_handler, events, bb_period=20, bb_std_dev=2.0):
@@ -12,6 +15,13 @@ class BollingerBandsStrategy(Strategy):
         self.bb_std_dev = bb_std_dev
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.bb_period)['Close']
+        lower, _, upper = ind.bollinger(close, self.bb_period, self.bb_std_dev)
+        price = latest(close)
+        enough = panel.has(self.bb_period)
+        return enough & (price < latest(lower)), enough & (price > latest(upper))
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -26,22 +36,12 @@ class BollingerBandsStrategy(Strategy):
                     lower_band = middle_band - (std_dev * self.bb_std_dev)
                     upper_band = middle_band + (std_dev * self.bb_std_dev)
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     price = self.data_handler.get_latest_bar_value(s, 'Close')
                     
                     # Check for NaN values
-                    if np.isnan(lower_band) or np.isnan(upper_band) or np.isnan(price):
+                    if np.isnan(lower_band) or np.isnan(upper_band):
                         continue
 
                     if price < lower_band and not self.bought[s]:
@@ -54,5 +54,5 @@ class BollingerBandsStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,3 +1,4 @@
+import numpy as np
 from backtest.strategy import Strategy
 from backtest.event import SignalEvent
 
@@ -11,11 +12,14 @@ class BuyAndHoldStrategy(Strategy):
         self.symbol_list = self.data_handler.symbol_list
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        return np.ones(len(panel), dtype=bool), np.zeros(len(panel), dtype=bool)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
                 if not self.bought[s]:
-                    dt = self.data_handler.get_latest_bar(s).index[0]
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     signal = SignalEvent(self.__class__.__name__, s, dt, 'LONG', 1.0)
                     self.events.put(signal)
                     self.bought[s] = True
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses_level
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class CCIStrategy(Strategy):
     def __init__(self, data_handler, events, period=20, oversold=-100, overbought=100):
@@ -13,6 +16,12 @@ class CCIStrategy(Strategy):
         self.overbought = overbought
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period)
+        cci = ind.cci(bars['High'], bars['Low'], bars['Close'], self.period)
+        enough = panel.has(self.period)
+        return enough & crosses_level(cci, self.oversold)[0], enough & crosses_level(cci, self.overbought)[1]
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -27,20 +36,10 @@ class CCIStrategy(Strategy):
                     cci = (tp - sma_tp) / (0.015 * mean_dev)
                     
                     # Extract scalar values
-                    cci_last = float(cci.iloc[-1])
-                    cci_prev = float(cci.iloc[-2])
+                    cci_last = cci.iloc[-1]
+                    cci_prev = cci.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if np.isnan(cci_last) or np.isnan(cci_prev):
@@ -56,5 +55,5 @@ class CCIStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
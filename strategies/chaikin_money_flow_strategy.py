@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses_level
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class ChaikinMoneyFlowStrategy(Strategy):
     def __init__(self, data_handler, events, period=20):
@@ -11,6 +14,13 @@ class ChaikinMoneyFlowStrategy(Strategy):
         self.period = period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period)
+        cmf = ind.chaikin_money_flow(bars['High'], bars['Low'], bars['Close'], bars['Volume'], self.period)
+        buy, sell = crosses_level(cmf, 0)
+        enough = panel.has(self.period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -24,20 +34,10 @@ class ChaikinMoneyFlowStrategy(Strategy):
                     cmf = mf_volume.rolling(window=self.period).sum() / bars['Volume'].rolling(window=self.period).sum()
                     
                     # Extract scalar values
-                    cmf_last = float(cmf.iloc[-1])
-                    cmf_prev = float(cmf.iloc[-2])
+                    cmf_last = cmf.iloc[-1]
+                    cmf_prev = cmf.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if np.isnan(cmf_last) or np.isnan(cmf_prev):
@@ -53,5 +53,5 @@ class ChaikinMoneyFlowStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class DEMACrossoverStrategy(Strategy):
     def __init__(self, data_handler, events, short_window=50, long_window=200, short_period=None, long_period=None):
@@ -27,6 +30,12 @@ class DEMACrossoverStrategy(Strategy):
         dema = 2 * ema1 - ema2
         return dema
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.long_window)['Close']
+        buy, sell = crosses(ind.dema(close, self.short_window), ind.dema(close, self.long_window))
+        enough = panel.has(self.long_window)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -41,22 +50,12 @@ class DEMACrossoverStrategy(Strategy):
                     long_dema = self.calculate_dema(bars['Close'], self.long_window)
                     
                     # Extract scalar values
-                    short_dema_last = float(short_dema.iloc[-1])
-                    short_dema_prev = float(short_dema.iloc[-2])
-                    long_dema_last = float(long_dema.iloc[-1])
-                    long_dema_prev = float(long_dema.iloc[-2])
+                    short_dema_last = short_dema.iloc[-1]
+                    short_dema_prev = short_dema.iloc[-2]
+                    long_dema_last = long_dema.iloc[-1]
+                    long_dema_prev = long_dema.iloc[-2]
                     
-                    # Get datetime
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(short_dema_last) or np.isnan(short_dema_prev) or 
@@ -78,5 +77,5 @@ class DEMACrossoverStrategy(Strategy):
                             self.bought[s] = False
                             
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class DonchianChannelStrategy(Strategy):
     def __init__(self, data_handler, events, period=20):
@@ -11,6 +14,13 @@ class DonchianChannelStrategy(Strategy):
         self.period = period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period + 1)
+        upper, lower = (latest(x) for x in ind.donchian(bars['High'], bars['Low'], self.period))
+        price = latest(bars['Close'])
+        enough = panel.has(self.period + 1) & ~(np.isnan(upper) | np.isnan(lower))
+        return enough & (price > upper), enough & (price < lower)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -20,25 +30,15 @@ class DonchianChannelStrategy(Strategy):
                         continue
 
                     # Extract scalar values
-                    upper_channel = float(bars['High'].shift(1).rolling(window=self.period).max().iloc[-1])
-                    lower_channel = float(bars['Low'].shift(1).rolling(window=self.period).min().iloc[-1])
+                    upper_channel = bars['High'].shift(1).rolling(window=self.period).max().iloc[-1]
+                    lower_channel = bars['Low'].shift(1).rolling(window=self.period).min().iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     price = self.data_handler.get_latest_bar_value(s, 'Close')
                     
                     # Check for NaN values
-                    if np.isnan(upper_channel) or np.isnan(lower_channel) or np.isnan(price):
+                    if np.isnan(upper_channel) or np.isnan(lower_channel):
                         continue
 
                     if price > upper_channel and not self.bought[s]:
@@ -51,5 +51,5 @@ class DonchianChannelStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
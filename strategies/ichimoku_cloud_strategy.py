@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class IchimokuCloudStrategy(Strategy):
     def __init__(self, data_handler, events, tenkan_period=9, kijun_period=26):
@@ -12,6 +15,12 @@ class IchimokuCloudStrategy(Strategy):
         self.kijun_period = kijun_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.kijun_period)
+        buy, sell = crosses(*ind.ichimoku(bars['High'], bars['Low'], self.tenkan_period, self.kijun_period))
+        enough = panel.has(self.kijun_period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -29,22 +38,12 @@ class IchimokuCloudStrategy(Strategy):
                     kijun_sen = (kijun_high + kijun_low) / 2
                     
                     # Extract scalar values
-                    tenkan_sen_last = float(tenkan_sen.iloc[-1])
-                    tenkan_sen_prev = float(tenkan_sen.iloc[-2])
-                    kijun_sen_last = float(kijun_sen.iloc[-1])
-                    kijun_sen_prev = float(kijun_sen.iloc[-2])
+                    tenkan_sen_last = tenkan_sen.iloc[-1]
+                    tenkan_sen_prev = tenkan_sen.iloc[-2]
+                    kijun_sen_last = kijun_sen.iloc[-1]
+                    kijun_sen_prev = kijun_sen.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(tenkan_sen_last) or np.isnan(tenkan_sen_prev) or
@@ -61,5 +60,5 @@ class IchimokuCloudStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
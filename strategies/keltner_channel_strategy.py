@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class KeltnerChannelStrategy(Strategy):
     def __init__(self, data_handler, events, ema_period=20, atr_period=10, atr_multiplier=2.0):
@@ -13,6 +17,14 @@ class KeltnerChannelStrategy(Strategy):
         self.atr_multiplier = atr_multiplier
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.ema_period)
+        middle = latest(ind.ema(bars['Close'], self.ema_period))
+        upper = middle + latest(ind.atr(bars['High'], bars['Low'], bars['Close'], self.atr_period)) * self.atr_multiplier
+        price = latest(bars['Close'])
+        enough = panel.has(self.ema_period) & ~np.isnan(upper)
+        return enough & (price > upper), enough & (price < middle)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -32,22 +44,12 @@ class KeltnerChannelStrategy(Strategy):
                     middle_line = float(bars['Close'].ewm(span=self.ema_period, adjust=False).mean().iloc[-1])
                     upper_channel = middle_line + (atr * self.atr_multiplier)
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     price = self.data_handler.get_latest_bar_value(s, 'Close')
                     
                     # Check for NaN values
-                    if np.isnan(upper_channel) or np.isnan(middle_line) or np.isnan(price):
+                    if np.isnan(upper_channel) or np.isnan(middle_line):
                         continue
 
                     if price > upper_channel and not self.bought[s]:
@@ -60,5 +62,5 @@ class KeltnerChannelStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
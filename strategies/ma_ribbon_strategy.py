@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class MARibbonStrategy(Strategy):
     def __init__(self, data_handler, events, short_period=5, medium_period=10, long_period=20):
@@ -13,6 +16,14 @@ class MARibbonStrategy(Strategy):
         self.long_period = long_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.long_period)['Close']
+        medium = ind.sma(close, self.medium_period)
+        long_last = latest(ind.sma(close, self.long_period))
+        buy, sell = crosses(ind.sma(close, self.short_period), medium)
+        enough = panel.has(self.long_period) & ~np.isnan(long_last)
+        return enough & buy & (latest(medium) > long_last), enough & sell
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -26,23 +37,13 @@ class MARibbonStrategy(Strategy):
                     long_ma = bars['Close'].rolling(window=self.long_period).mean()
                     
                     # Extract scalar values
-                    short_ma_last = float(short_ma.iloc[-1])
-                    short_ma_prev = float(short_ma.iloc[-2])
-                    medium_ma_last = float(medium_ma.iloc[-1])
-                    medium_ma_prev = float(medium_ma.iloc[-2])
-                    long_ma_last = float(long_ma.iloc[-1])
+                    short_ma_last = short_ma.iloc[-1]
+                    short_ma_prev = short_ma.iloc[-2]
+                    medium_ma_last = medium_ma.iloc[-1]
+                    medium_ma_prev = medium_ma.iloc[-2]
+                    long_ma_last = long_ma.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(short_ma_last) or np.isnan(short_ma_prev) or
@@ -64,5 +65,5 @@ class MARibbonStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class MACDStrategy(Strategy):
     def __init__(self, data_handler, events, short_ema_period=12, long_ema_period=26, signal_ema_period=9):
@@ -13,6 +16,12 @@ class MACDStrategy(Strategy):
         self.signal_ema_period = signal_ema_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.long_ema_period + self.signal_ema_period)['Close']
+        buy, sell = crosses(*ind.macd(close, self.short_ema_period, self.long_ema_period, self.signal_ema_period))
+        enough = panel.has(self.long_ema_period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -27,22 +36,12 @@ class MACDStrategy(Strategy):
                     signal_line = macd_line.ewm(span=self.signal_ema_period, adjust=False).mean()
                     
                     # Extract scalar values
-                    macd_line_last = float(macd_line.iloc[-1])
-                    macd_line_prev = float(macd_line.iloc[-2])
-                    signal_line_last = float(signal_line.iloc[-1])
-                    signal_line_prev = float(signal_line.iloc[-2])
+                    macd_line_last = macd_line.iloc[-1]
+                    macd_line_prev = macd_line.iloc[-2]
+                    signal_line_last = signal_line.iloc[-1]
+                    signal_line_prev = signal_line.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(macd_line_last) or np.isnan(macd_line_prev) or
@@ -59,5 +58,5 @@ class MACDStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
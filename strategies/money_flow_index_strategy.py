@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class MoneyFlowIndexStrategy(Strategy):
     def __init__(self, data_handler, events, period=14, oversold=20, overbought=80):
@@ -13,6 +17,12 @@ class MoneyFlowIndexStrategy(Strategy):
         self.overbought = overbought
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period + 1)
+        mfi = latest(ind.money_flow_index(bars['High'], bars['Low'], bars['Close'], bars['Volume'], self.period))
+        enough = panel.has(self.period + 1)
+        return enough & (mfi < self.oversold), enough & (mfi > self.overbought)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -35,19 +45,9 @@ class MoneyFlowIndexStrategy(Strategy):
                     mfi = 100 - (100 / (1 + money_ratio))
                     
                     # Extract scalar value
-                    mfi_last = float(mfi.iloc[-1])
+                    mfi_last = mfi.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN value
                     if np.isnan(mfi_last):
@@ -63,5 +63,5 @@ class MoneyFlowIndexStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
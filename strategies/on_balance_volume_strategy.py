@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class OnBalanceVolumeStrategy(Strategy):
     def __init__(self, data_handler, events, obv_ma_period=20):
@@ -11,6 +14,13 @@ class OnBalanceVolumeStrategy(Strategy):
         self.obv_ma_period = obv_ma_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.obv_ma_period + 1)
+        obv = ind.on_balance_volume(bars['Close'], bars['Volume'])
+        buy, sell = crosses(obv, ind.sma(obv, self.obv_ma_period))
+        enough = panel.has(self.obv_ma_period + 1)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -23,22 +33,12 @@ class OnBalanceVolumeStrategy(Strategy):
                     obv_ma = obv.rolling(window=self.obv_ma_period).mean()
                     
                     # Extract scalar values
-                    obv_last = float(obv.iloc[-1])
-                    obv_prev = float(obv.iloc[-2])
-                    obv_ma_last = float(obv_ma.iloc[-1])
-                    obv_ma_prev = float(obv_ma.iloc[-2])
+                    obv_last = obv.iloc[-1]
+                    obv_prev = obv.iloc[-2]
+                    obv_ma_last = obv_ma.iloc[-1]
+                    obv_ma_prev = obv_ma.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(obv_last) or np.isnan(obv_prev) or
@@ -55,5 +55,5 @@ class OnBalanceVolumeStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,9 +1,13 @@
-import pandas as pd
 import numpy as np
 from backtest.strategy import Strategy
 from backtest.event import SignalEvent
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class ParabolicSARStrategy(Strategy):
+    matrix_stateful = True
+
     def __init__(self, data_handler, events, initial_af=0.02, max_af=0.2):
         self.data_handler = data_handler
         self.events = events
@@ -14,6 +18,44 @@ class ParabolicSARStrategy(Strategy):
         self.sar = {s: None for s in self.symbol_list}
         self.ep = {s: None for s in self.symbol_list}
         self.af = {s: self.initial_af for s in self.symbol_list}
+        # (sar, ep, af) arrays over symbol_list for signals_matrix
+        self.matrix_state = None
+
+    def signals_matrix(self, panel):
+        # The recursion of calculate_signals on arrays; `bought` is the
+        # trend in both forms and gate_signals flips it on reversals
+        n = len(self.symbol_list)
+        if self.matrix_state is None:
+            self.matrix_state = (np.full(n, np.nan), np.full(n, np.nan), np.full(n, self.initial_af))
+        sar, ep, af = self.matrix_state
+        bars = panel.bars(2)
+        high, low, close = (bars[f].to_numpy(dtype=np.float64) for f in ('High', 'Low', 'Close'))
+        bought = np.fromiter((self.bought[s] for s in self.symbol_list), dtype=bool, count=n)
+
+        # Initialize on the first valid bar
+        valid = panel.has(2)
+        start = valid & np.isnan(sar)
+        up = close[1] > close[0]
+        sar[start] = np.where(up, low[0], high[0])[start]
+        ep[start] = np.where(up, high[1], low[1])[start]
+        for i in np.flatnonzero(start):
+            self.bought[self.symbol_list[i]] = bool(up[i])
+
+        uptrend = valid & ~start & bought
+        downtrend = valid & ~start & ~bought
+        sar[uptrend] += af[uptrend] * (ep[uptrend] - sar[uptrend])
+        sar[downtrend] -= af[downtrend] * (sar[downtrend] - ep[downtrend])
+        new_extreme = (uptrend & (high[1] > ep)) | (downtrend & (low[1] < ep))
+        ep[new_extreme] = np.where(uptrend, high[1], low[1])[new_extreme]
+        af[new_extreme] = np.minimum(af[new_extreme] + self.initial_af, self.max_af)
+
+        exit_ = uptrend & (sar > low[1])
+        long = downtrend & (sar < high[1])
+        reversal = exit_ | long
+        sar[reversal] = ep[reversal]
+        ep[reversal] = np.where(exit_, low[1], high[1])[reversal]
+        af[reversal] = self.initial_af
+        return long, exit_
 
     def calculate_signals(self, event):
         if event.type == 'MARKET':
@@ -23,15 +65,12 @@ class ParabolicSARStrategy(Strategy):
                     if len(bars) < 2:
                         continue
 
-                    # Extract scalar values
+                    # Extract scalar values; Python floats keep the SAR state
+                    # in float64 when bars are stored as float32
                     high = float(bars['High'].iloc[-1])
                     low = float(bars['Low'].iloc[-1])
                     prev_high = float(bars['High'].iloc[-2])
                     prev_low = float(bars['Low'].iloc[-2])
-                    
-                    # Check for NaN values
-                    if np.isnan(high) or np.isnan(low) or np.isnan(prev_high) or np.isnan(prev_low):
-                        continue
 
                     # Initialize on the first valid bar
                     if self.sar[s] is None:
@@ -47,17 +86,7 @@ class ParabolicSARStrategy(Strategy):
 
                     prev_sar = self.sar[s]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     if self.bought[s]: # Uptrend
                         self.sar[s] = prev_sar + self.af[s] * (self.ep[s] - prev_sar)
@@ -87,5 +116,5 @@ class ParabolicSARStrategy(Strategy):
                             self.af[s] = self.initial_af
                             
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
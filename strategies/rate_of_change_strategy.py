@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class RateOfChangeStrategy(Strategy):
     def __init__(self, data_handler, events, roc_period=12, ma_period=20):
@@ -12,6 +15,12 @@ class RateOfChangeStrategy(Strategy):
         self.ma_period = ma_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        roc = ind.rate_of_change(panel.bars(self.roc_period + self.ma_period)['Close'], self.roc_period)
+        buy, sell = crosses(roc, ind.sma(roc, self.ma_period))
+        enough = panel.has(self.roc_period + self.ma_period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -24,22 +33,12 @@ class RateOfChangeStrategy(Strategy):
                     roc_ma = roc.rolling(window=self.ma_period).mean()
                     
                     # Extract scalar values
-                    roc_last = float(roc.iloc[-1])
-                    roc_prev = float(roc.iloc[-2])
-                    roc_ma_last = float(roc_ma.iloc[-1])
-                    roc_ma_prev = float(roc_ma.iloc[-2])
+                    roc_last = roc.iloc[-1]
+                    roc_prev = roc.iloc[-2]
+                    roc_ma_last = roc_ma.iloc[-1]
+                    roc_ma_prev = roc_ma.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(roc_last) or np.isnan(roc_prev) or
@@ -56,5 +55,5 @@ class RateOfChangeStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class RSIStrategy(Strategy):
     def __init__(self, data_handler, events, rsi_period=14, oversold_threshold=30, overbought_threshold=70, 
@@ -16,6 +19,11 @@ class RSIStrategy(Strategy):
         self.overbought_threshold = overbought_threshold
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        rsi = latest(ind.rsi(panel.bars(self.rsi_period + 1)['Close'], self.rsi_period))
+        enough = panel.has(self.rsi_period + 1)
+        return enough & (rsi < self.oversold_threshold), enough & (rsi > self.overbought_threshold)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -33,19 +41,9 @@ class RSIStrategy(Strategy):
                     rsi = 100 - (100 / (1 + rs))
                     
                     # Extract scalar RSI value
-                    current_rsi = float(rsi.iloc[-1])
+                    current_rsi = rsi.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN value
                     if np.isnan(current_rsi):
@@ -64,5 +62,5 @@ class RSIStrategy(Strategy):
                         self.bought[s] = False
                 
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,13 @@
 import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest, previous
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
+_debug = trace.site(__name__ + '.debug', "Symbol: {}, Latest bar date: {}, Short SMA: {}, Long SMA: {}")
+_signal = trace.site(__name__ + '.signal', "GENERATE {} SIGNAL for {} at {}", trace.INFO)
 
 class SMACrossoverStrategy(Strategy):
     def __init__(self, data_handler, events, short_window=50, long_window=200):
@@ -11,8 +17,6 @@ class SMACrossoverStrategy(Strategy):
         self.short_window = short_window
         self.long_window = long_window
         self.bought = self._calculate_initial_bought()
-        # Add debug counter
-        self.debug_count = 0
 
     def _calculate_initial_bought(self):
         bought = {}
@@ -20,6 +24,17 @@ class SMACrossoverStrategy(Strategy):
             bought[s] = False
         return bought
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.long_window)['Close']
+        short_sma, long_sma = ind.sma(close, self.short_window), ind.sma(close, self.long_window)
+        # A NaN previous value falls back to the latest one, as above
+        short_last, long_last = latest(short_sma), latest(long_sma)
+        short_prev = np.where(np.isnan(previous(short_sma)), short_last, previous(short_sma))
+        long_prev = np.where(np.isnan(previous(long_sma)), long_last, previous(long_sma))
+        enough = panel.has(self.long_window)
+        return (enough & (short_last > long_last) & (short_prev <= long_prev),
+                enough & (short_last < long_last) & (short_prev >= long_prev))
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -31,34 +46,27 @@ class SMACrossoverStrategy(Strategy):
                     short_sma = bars['Close'].rolling(window=self.short_window).mean()
                     long_sma = bars['Close'].rolling(window=self.long_window).mean()
                     
-                    # Add debug print to see what's happening
-                    self.debug_count += 1
-                    if self.debug_count % 10 == 0:  # Print every 10th check to avoid flooding logs
-                        print(f"DEBUG - Symbol: {s}, Latest bar date: {bars.index[-1]}")
-                        print(f"Short SMA: {short_sma.iloc[-1]}, Long SMA: {long_sma.iloc[-1]}")
-                    
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
+                    if _debug.enabled:
+                        _debug(s, bars.index[-1], short_sma.iloc[-1], long_sma.iloc[-1])
                     
-                    dt = latest_bar.index[0]
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Extract scalar values but with less restrictive NaN handling
                     # Only check the current values, not previous ones
-                    short_sma_last = float(short_sma.iloc[-1]) if not pd.isna(short_sma.iloc[-1]) else None
-                    long_sma_last = float(long_sma.iloc[-1]) if not pd.isna(long_sma.iloc[-1]) else None
+                    short_sma_last = short_sma.iloc[-1] if not pd.isna(short_sma.iloc[-1]) else None
+                    long_sma_last = long_sma.iloc[-1] if not pd.isna(long_sma.iloc[-1]) else None
                     
                     if short_sma_last is None or long_sma_last is None:
                         continue
                         
-                    short_sma_prev = float(short_sma.iloc[-2]) if not pd.isna(short_sma.iloc[-2]) else short_sma_last
-                    long_sma_prev = float(long_sma.iloc[-2]) if not pd.isna(long_sma.iloc[-2]) else long_sma_last
+                    short_sma_prev = short_sma.iloc[-2] if not pd.isna(short_sma.iloc[-2]) else short_sma_last
+                    long_sma_prev = long_sma.iloc[-2] if not pd.isna(long_sma.iloc[-2]) else long_sma_last
 
                     # Buy signal: short SMA crosses above long SMA
                     if short_sma_last > long_sma_last and short_sma_prev <= long_sma_prev:
                         if not self.bought[s]:
-                            print(f"GENERATE BUY SIGNAL for {s} at {dt}")
+                            if _signal.enabled:
+                                _signal('BUY', s, dt)
                             signal = SignalEvent(self.__class__.__name__, s, dt, 'LONG', 1.0)
                             self.events.put(signal)
                             self.bought[s] = True
@@ -66,11 +74,12 @@ class SMACrossoverStrategy(Strategy):
                     # Sell signal: short SMA crosses below long SMA
                     elif short_sma_last < long_sma_last and short_sma_prev >= long_sma_prev:
                         if self.bought[s]:
-                            print(f"GENERATE SELL SIGNAL for {s} at {dt}")
+                            if _signal.enabled:
+                                _signal('SELL', s, dt)
                             signal = SignalEvent(self.__class__.__name__, s, dt, 'EXIT', 1.0)
                             self.events.put(signal)
                             self.bought[s] = False
                             
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class StochasticOscillatorStrategy(Strategy):
     def __init__(self, data_handler, events, k_period=14, oversold_threshold=20, overbought_threshold=80):
@@ -13,6 +16,12 @@ class StochasticOscillatorStrategy(Strategy):
         self.overbought_threshold = overbought_threshold
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.k_period)
+        k = latest(ind.stochastic_k(bars['High'], bars['Low'], bars['Close'], self.k_period))
+        enough = panel.has(self.k_period)
+        return enough & (k < self.oversold_threshold), enough & (k > self.overbought_threshold)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -26,19 +35,9 @@ class StochasticOscillatorStrategy(Strategy):
                     percent_k = 100 * (bars['Close'] - low_k) / (high_k - low_k)
                     
                     # Extract scalar value
-                    percent_k_last = float(percent_k.iloc[-1])
+                    percent_k_last = percent_k.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN value
                     if np.isnan(percent_k_last):
@@ -54,5 +53,5 @@ class StochasticOscillatorStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
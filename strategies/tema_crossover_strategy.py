@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class TEMACrossoverStrategy(Strategy):
     def __init__(self, data_handler, events, short_window=50, long_window=200, short_period=None, long_period=None):
@@ -29,6 +32,12 @@ class TEMACrossoverStrategy(Strategy):
         tema = 3 * ema1 - 3 * ema2 + ema3
         return tema
 
+    def signals_matrix(self, panel):
+        close = panel.bars(self.long_window)['Close']
+        buy, sell = crosses(ind.tema(close, self.short_window), ind.tema(close, self.long_window))
+        enough = panel.has(self.long_window)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -43,22 +52,12 @@ class TEMACrossoverStrategy(Strategy):
                     long_tema = self.calculate_tema(bars['Close'], self.long_window)
                     
                     # Extract scalar values
-                    short_tema_last = float(short_tema.iloc[-1])
-                    short_tema_prev = float(short_tema.iloc[-2])
-                    long_tema_last = float(long_tema.iloc[-1])
-                    long_tema_prev = float(long_tema.iloc[-2])
+                    short_tema_last = short_tema.iloc[-1]
+                    short_tema_prev = short_tema.iloc[-2]
+                    long_tema_last = long_tema.iloc[-1]
+                    long_tema_prev = long_tema.iloc[-2]
                     
-                    # Get datetime
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(short_tema_last) or np.isnan(short_tema_prev) or 
@@ -80,5 +79,5 @@ class TEMACrossoverStrategy(Strategy):
                             self.bought[s] = False
                             
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class TrixStrategy(Strategy):
     def __init__(self, data_handler, events, period=15, signal_period=9):
@@ -12,6 +15,11 @@ class TrixStrategy(Strategy):
         self.signal_period = signal_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        buy, sell = crosses(*ind.trix(panel.bars(self.period * 3)['Close'], self.period, self.signal_period))
+        enough = panel.has(self.period * 3)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -27,22 +35,12 @@ class TrixStrategy(Strategy):
                     trix_signal = trix.ewm(span=self.signal_period, adjust=False).mean()
                     
                     # Extract scalar values
-                    trix_last = float(trix.iloc[-1])
-                    trix_prev = float(trix.iloc[-2])
-                    trix_signal_last = float(trix_signal.iloc[-1])
-                    trix_signal_prev = float(trix_signal.iloc[-2])
+                    trix_last = trix.iloc[-1]
+                    trix_prev = trix.iloc[-2]
+                    trix_signal_last = trix_signal.iloc[-1]
+                    trix_signal_prev = trix_signal.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(trix_last) or np.isnan(trix_prev) or
@@ -59,5 +57,5 @@ class TrixStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class VortexIndicatorStrategy(Strategy):
     def __init__(self, data_handler, events, period=14):
@@ -11,6 +14,12 @@ class VortexIndicatorStrategy(Strategy):
         self.period = period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period + 1)
+        buy, sell = crosses(*ind.vortex(bars['High'], bars['Low'], bars['Close'], self.period))
+        enough = panel.has(self.period + 1)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -29,22 +38,12 @@ class VortexIndicatorStrategy(Strategy):
                     vi_minus = vm_minus.rolling(window=self.period).sum() / tr_sum
                     
                     # Extract scalar values
-                    vi_plus_last = float(vi_plus.iloc[-1])
-                    vi_plus_prev = float(vi_plus.iloc[-2])
-                    vi_minus_last = float(vi_minus.iloc[-1])
-                    vi_minus_prev = float(vi_minus.iloc[-2])
+                    vi_plus_last = vi_plus.iloc[-1]
+                    vi_plus_prev = vi_plus.iloc[-2]
+                    vi_minus_last = vi_minus.iloc[-1]
+                    vi_minus_prev = vi_minus.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(vi_plus_last) or np.isnan(vi_plus_prev) or
@@ -61,5 +60,5 @@ class VortexIndicatorStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
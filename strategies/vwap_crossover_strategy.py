@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, crosses
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class VWAPCrossoverStrategy(Strategy):
     def __init__(self, data_handler, events, vwap_ma_period=20):
@@ -11,6 +14,13 @@ class VWAPCrossoverStrategy(Strategy):
         self.vwap_ma_period = vwap_ma_period
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.vwap_ma_period)
+        vwap = ind.vwap(bars['High'], bars['Low'], bars['Close'], bars['Volume'])
+        buy, sell = crosses(vwap, ind.sma(vwap, self.vwap_ma_period))
+        enough = panel.has(self.vwap_ma_period)
+        return buy & enough, sell & enough
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -25,22 +35,12 @@ class VWAPCrossoverStrategy(Strategy):
                     vwap_ma = vwap.rolling(window=self.vwap_ma_period).mean()
                     
                     # Extract scalar values
-                    vwap_last = float(vwap.iloc[-1])
-                    vwap_prev = float(vwap.iloc[-2])
-                    vwap_ma_last = float(vwap_ma.iloc[-1])
-                    vwap_ma_prev = float(vwap_ma.iloc[-2])
+                    vwap_last = vwap.iloc[-1]
+                    vwap_prev = vwap.iloc[-2]
+                    vwap_ma_last = vwap_ma.iloc[-1]
+                    vwap_ma_prev = vwap_ma.iloc[-2]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN values
                     if (np.isnan(vwap_last) or np.isnan(vwap_prev) or
@@ -57,5 +57,5 @@ class VWAPCrossoverStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
@@ -1,7 +1,10 @@
-import pandas as pd
 import numpy as np
-from backtest.strategy import Strategy
+from backtest.strategy import Strategy, latest
 from backtest.event import SignalEvent
+from backtest import indicators as ind
+from backtest import trace
+
+_error = trace.site(__name__ + '.error', "Error in calculate_signals for symbol {}: {}: {}", trace.ERROR, rate=5)
 
 class WilliamsRStrategy(Strategy):
     def __init__(self, data_handler, events, period=14, oversold=-80, overbought=-20):
@@ -13,6 +16,12 @@ class WilliamsRStrategy(Strategy):
         self.overbought = overbought
         self.bought = {s: False for s in self.symbol_list}
 
+    def signals_matrix(self, panel):
+        bars = panel.bars(self.period)
+        wr = latest(ind.williams_r(bars['High'], bars['Low'], bars['Close'], self.period))
+        enough = panel.has(self.period)
+        return enough & (wr < self.oversold), enough & (wr > self.overbought)
+
     def calculate_signals(self, event):
         if event.type == 'MARKET':
             for s in self.symbol_list:
@@ -26,19 +35,9 @@ class WilliamsRStrategy(Strategy):
                     williams_r = -100 * (highest_high - bars['Close']) / (highest_high - lowest_low)
                     
                     # Extract scalar value
-                    williams_r_last = float(williams_r.iloc[-1])
+                    williams_r_last = williams_r.iloc[-1]
                     
-                    # Get datetime safely
-                    latest_bar = self.data_handler.get_latest_bar(s)
-                    if latest_bar is None or latest_bar.empty:
-                        continue
-                        
-                    try:
-                        dt = latest_bar.index[0]
-                        if isinstance(dt, pd.Series):
-                            dt = dt.iloc[0]
-                    except (IndexError, AttributeError):
-                        continue
+                    dt = self.data_handler.get_latest_bar_datetime(s)
                     
                     # Check for NaN value
                     if np.isnan(williams_r_last):
@@ -54,5 +53,5 @@ class WilliamsRStrategy(Strategy):
                         self.bought[s] = False
                         
                 except Exception as e:
-                    print(f"Error in calculate_signals for symbol {s}: {e}")
+                    _error(s, type(e).__name__, str(e))
                     continue
\ No newline at end of file
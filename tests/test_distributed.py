@@ -0,0 +1,29 @@
+from backtest.distributed import Coordinator, SQLiteBroker, start_local_workers
+from backtest.equivalence import synthetic_bars
+
+STRATEGIES = ['Buy and Hold', 'RSI (14/30/70)', 'MACD (12/26/9)']
+
+
+def test_local_workers_complete_sweep(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for seed, ticker in enumerate(['AAA', 'BBB']):
+        synthetic_bars(n_bars=300, seed=seed).to_csv(data_dir / f"{ticker}.csv")
+    # Relative paths, as in the README, from a directory other than the repository root
+    monkeypatch.chdir(tmp_path)
+    broker = SQLiteBroker('sweep.db')
+    coordinator = Coordinator(broker)
+    job_id = coordinator.submit_sweep(['AAA', 'BBB'], STRATEGIES, '2015-01-01', '2016-12-31', chunk_size=2)
+
+    workers = start_local_workers('sweep.db', n_workers=2, data_dir='data')
+    try:
+        status = coordinator.wait(job_id, timeout=300, poll_interval=0.2)
+    finally:
+        for worker in workers:
+            worker.wait(timeout=60)
+
+    assert status['failed'] == 0
+    assert status['done'] == 4
+    results = coordinator.collect(job_id)
+    assert sorted(zip(results['ticker'], results['strategy'])) == sorted(
+        (ticker, name) for ticker in ['AAA', 'BBB'] for name in STRATEGIES)
@@ -0,0 +1,24 @@
+from backtest.equivalence import (CANDIDATES, _with_actions, _yfinance_with_actions, run_harness, summarize,
+                                  synthetic_bars)
+
+STRATEGIES = ['RSI (14/30/70)', 'MACD (12/26/9)', 'Bollinger Bands (20/2)']
+
+# Short versions of the synthetic bank: plain bars, gaps, and both layouts
+# of split/dividend data, so every candidate runs on at least one dataset
+DATASETS = {
+    'trend': lambda ticker: (synthetic_bars(n_bars=300, seed=1, drift=0.0008), None),
+    'gaps': lambda ticker: (synthetic_bars(n_bars=300, seed=4, gaps=0.1), None),
+    'corporate_actions': lambda ticker: _with_actions(synthetic_bars(n_bars=300, seed=7), ticker),
+    'yfinance_actions': lambda ticker: _yfinance_with_actions(synthetic_bars(n_bars=300, seed=8), ticker),
+}
+
+
+def test_every_candidate_matches_the_reference():
+    report = run_harness(strategies=STRATEGIES, datasets=DATASETS)
+    failures = report[report['status'].isin(('different', 'error'))]
+    assert failures.empty, failures[['candidate', 'dataset', 'strategy', 'difference']].to_string()
+
+    summary = summarize(report)
+    assert set(summary.index) == set(CANDIDATES)
+    # A candidate skipped everywhere would pass without being checked
+    assert (summary['comparisons'] > summary['skipped']).all(), summary.to_string()
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from backtest.event import FillEvent
+from backtest.ledger import TradeLedger
+
+
+def _ledger(n):
+    ledger = TradeLedger(capacity=2)
+    for i in range(n):
+        ledger.append(FillEvent(pd.Timestamp('2020-01-01') + pd.Timedelta(days=i), 'AAPL', 'ARCA', i + 1,
+                                'BUY' if i % 2 == 0 else 'SELL', 100.0 * (i + 1)))
+    return ledger
+
+
+def test_trade_ledger_indexes_like_a_list_of_dicts():
+    ledger = _ledger(5)
+    records = list(ledger)
+    assert ledger[0] == records[0]
+    assert ledger[-1] == records[-1]
+    assert ledger[:3] == records[:3]
+    assert ledger[-2:] == records[-2:]
+    assert ledger[::-2] == records[::-2]
+    assert ledger[4:2] == []
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from backtest.equivalence import (CANDIDATE_TOLERANCES, _with_actions, run_harness, summarize,
+                                  synthetic_bars)
+from backtest.ledger import CompactLedger
+from backtest.registry import default_registry
+from backtest.runner import build_backtest
+
+STRATEGIES = ['RSI (14/30/70)', 'MACD (12/26/9)', 'Bollinger Bands (20/2)']
+
+DATASETS = {
+    'trend': lambda ticker: (synthetic_bars(n_bars=300, seed=1, drift=0.0008), None),
+    'crash': lambda ticker: (synthetic_bars(n_bars=300, seed=3, drift=-0.0015, volatility=0.03), None),
+    'corporate_actions': lambda ticker: _with_actions(synthetic_bars(n_bars=300, seed=7), ticker),
+}
+
+
+def _run(precision, data, corporate_actions=None):
+    strategy = default_registry().load('MACD (12/26/9)')
+    backtest = build_backtest(data, 'SYN', strategy, {}, data.index[0], corporate_actions=corporate_actions,
+                              precision=precision)
+    backtest.simulate_trading()
+    return backtest
+
+
+def test_float32_drift_within_tolerance():
+    tolerance = CANDIDATE_TOLERANCES['float32']
+    assert (tolerance.rtol, tolerance.atol) == (1e-5, 1e-2)
+    # Fills (times, sides, quantities) are always compared exactly
+    report = run_harness(candidates=['float32'], strategies=STRATEGIES, datasets=DATASETS)
+    failures = report[report['status'] != 'equal']
+    assert failures.empty, failures[['dataset', 'strategy', 'status', 'difference']].to_string()
+    assert summarize(report).loc['float32', 'mismatches'] == 0
+    assert (report['fills'] > 0).all()
+
+
+def test_float32_storage_and_float64_totals():
+    data, corporate_actions = _with_actions(synthetic_bars(n_bars=300, seed=7), 'SYN')
+    backtest = _run('float32', data, corporate_actions)
+    handler, portfolio = backtest.data_handler, backtest.portfolio
+
+    bars = handler.symbol_data['SYN']
+    for field in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        assert bars[field].dtype == np.float32
+    price_factor, volume_factor = handler.adjustments['SYN']
+    assert price_factor.dtype == np.float32 and volume_factor.dtype == np.float32
+    assert all(array.dtype == np.float32 for array in handler.panel().arrays.values())
+
+    for rows in (portfolio.all_positions, portfolio.all_holdings):
+        assert isinstance(rows, CompactLedger)
+        assert rows.values.dtype == np.float32
+    assert portfolio.all_holdings.totals.dtype == np.float64
+    assert portfolio.all_holdings.fields == ['cash', 'commission', 'total']
+
+    # Cash and totals are accumulated in float64, never in the storage dtype
+    for key in ('cash', 'commission', 'total'):
+        assert not isinstance(portfolio.current_holdings[key], np.float32)
+    curve = portfolio.equity_curve
+    for column in ('cash', 'commission', 'total', 'returns'):
+        assert curve[column].dtype == np.float64
+
+    reference = _run('float64', data, corporate_actions).portfolio.equity_curve['total']
+    np.testing.assert_allclose(curve['total'].to_numpy(), reference.to_numpy(), rtol=1e-5)
+
+
+def test_compact_ledger_rows():
+    ledger = CompactLedger(['A', 'B'], ('cash', 'total'), np.float32, capacity=2)
+    index = pd.date_range('2020-01-01', periods=5, tz='US/Eastern')
+    for i, when in enumerate(index):
+        ledger.append({'datetime': when, 'A': 1.0 / 3.0 * i, 'B': -i, 'cash': 1e9 + 0.01 * i, 'total': 1e9 + 0.01 * i})
+
+    assert len(ledger) == 5
+    # Totals keep float64 digits that float32 would drop
+    assert ledger[3]['cash'] == 1e9 + 0.03
+    assert ledger[3]['A'] == float(np.float32(1.0 / 3.0 * 3))
+    assert ledger[-1]['datetime'] == index[-1]
+    assert ledger[1:3] == [ledger[1], ledger[2]]
+
+    frame = ledger.to_frame()
+    assert list(frame.columns) == ['A', 'B', 'datetime', 'cash', 'total']
+    assert frame['A'].dtype == np.float32 and frame['total'].dtype == np.float64
+    assert (frame['datetime'] == index).all()
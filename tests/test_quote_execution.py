@@ -0,0 +1,299 @@
+import queue
+
+import pandas as pd
+import pytest
+
+from backtest.event import MarketEvent, OrderEvent
+from backtest.execution import QuoteExecutionHandler
+from backtest.quotes import QuoteStore
+
+# One quote a minute from 09:30; bars are stamped every five minutes
+QUOTES = [
+    # bid, ask
+    (100.00, 100.10),  # 09:30
+    (100.05, 100.15),  # 09:31
+    (99.90, 100.00),   # 09:32
+    (99.80, 99.90),    # 09:33
+    (100.20, 100.30),  # 09:34
+    (100.50, 100.60),  # 09:35
+    (100.40, 100.50),  # 09:36
+    (99.50, 99.60),    # 09:37
+    (99.60, 99.70),    # 09:38
+    (100.00, 100.10),  # 09:39
+]
+
+
+def _t(hhmm):
+    return pd.Timestamp(f'2024-03-01 {hhmm}')
+
+
+class _Bars:
+    # The handler only asks the data handler for the current bar's time
+    def __init__(self):
+        self.now = None
+
+    def get_latest_bar_datetime(self, symbol):
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path))
+    index = pd.date_range(_t('09:30'), periods=len(QUOTES), freq='min')
+    store.write('A', pd.DataFrame(QUOTES, index=index, columns=['Bid', 'Ask']))
+    store.write('B', pd.DataFrame({'Bid': [50.0], 'Ask': [50.2]}, index=[_t('09:30')]))
+    return store
+
+
+def _handler(store, **kwargs):
+    return QuoteExecutionHandler(queue.Queue(), _Bars(), store, **kwargs)
+
+
+def _fills(handler):
+    out = []
+    while not handler.events.empty():
+        fill = handler.events.get(False)
+        out.append((fill.timeindex, fill.symbol, fill.direction, fill.quantity,
+                    round(fill.fill_cost / fill.quantity, 6)))
+    return out
+
+
+def _bar(handler, hhmm):
+    """Moves to the bar stamped `hhmm`, matching resting orders, and returns its fills."""
+    handler.data_handler.now = _t(hhmm)
+    handler.on_bar(MarketEvent(_t(hhmm)))
+    return _fills(handler)
+
+
+def _order(handler, *args, **kwargs):
+    """Places an order on the current bar and returns the fills it takes on arrival."""
+    handler.execute_order(OrderEvent(*args, **kwargs))
+    return _fills(handler)
+
+
+def _quote_times(handler):
+    return list(handler.spread_costs()['quote_time'])
+
+
+def test_market_orders_take_the_touch(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'A', 'MKT', 10, 'BUY') == [(_t('09:30'), 'A', 'BUY', 10, 100.10)]
+    assert _order(handler, 'A', 'MKT', 10, 'SELL') == [(_t('09:30'), 'A', 'SELL', 10, 100.00)]
+    assert _quote_times(handler) == [_t('09:30')] * 2
+    assert handler.open_orders() == 0
+
+
+def test_delay_takes_the_quote_prevailing_on_arrival(store):
+    handler = _handler(store, delay='2min30s')
+    _bar(handler, '09:30')
+    # Arrives at 09:32:30, where the 09:32 quote prevails; the fill is stamped with the bar
+    assert _order(handler, 'A', 'MKT', 1, 'BUY') == [(_t('09:30'), 'A', 'BUY', 1, 100.00)]
+    assert _quote_times(handler) == [_t('09:32')]
+
+
+def test_marketable_limit_fills_at_the_touch(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'A', 'LMT', 5, 'BUY', limit_price=100.50) == [(_t('09:30'), 'A', 'BUY', 5, 100.10)]
+
+
+def test_resting_limit_fills_once_quotes_trade_through(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'A', 'LMT', 5, 'BUY', limit_price=99.90) == []
+    # The 09:33 ask only touches 99.90
+    assert _bar(handler, '09:35') == []
+    assert handler.open_orders() == 1
+    assert _bar(handler, '09:40') == [(_t('09:40'), 'A', 'BUY', 5, 99.90)]
+    assert _quote_times(handler) == [_t('09:37')]
+    assert handler.open_orders() == 0
+
+
+def test_resting_limit_fills_on_touch_without_through(store):
+    handler = _handler(store, through=False)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 5, 'BUY', limit_price=99.90)
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'BUY', 5, 99.90)]
+    assert _quote_times(handler) == [_t('09:33')]
+
+
+def test_resting_sell_limit(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 3, 'SELL', limit_price=100.45)
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'SELL', 3, 100.45)]
+    assert _quote_times(handler) == [_t('09:35')]
+
+
+def test_resting_sell_limit_touched_but_not_traded_through(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 3, 'SELL', limit_price=100.50)
+    assert _bar(handler, '09:40') == []
+    touched = _handler(store, through=False)
+    _bar(touched, '09:30')
+    _order(touched, 'A', 'LMT', 3, 'SELL', limit_price=100.50)
+    assert _bar(touched, '09:35') == [(_t('09:35'), 'A', 'SELL', 3, 100.50)]
+
+
+def test_stops_trigger_at_the_touch_and_fill_there(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'A', 'STP', 2, 'SELL', stop_price=99.85) == []
+    assert _order(handler, 'A', 'STP', 4, 'BUY', stop_price=100.55) == []
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'SELL', 2, 99.80), (_t('09:35'), 'A', 'BUY', 4, 100.60)]
+    assert _quote_times(handler) == [_t('09:33'), _t('09:35')]
+
+
+def test_stop_already_through_on_arrival_fills_at_the_touch(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'A', 'STP', 1, 'BUY', stop_price=99.00) == [(_t('09:30'), 'A', 'BUY', 1, 100.10)]
+
+
+def test_stop_limit_marketable_when_triggered(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'STPLMT', 1, 'BUY', stop_price=100.25, limit_price=100.35)
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'BUY', 1, 100.30)]
+    assert _quote_times(handler) == [_t('09:34')]
+
+
+def test_stop_limit_stays_triggered_across_bars(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'STPLMT', 1, 'BUY', stop_price=100.25, limit_price=100.28)
+    # Triggered by the 09:34 ask, but no ask goes below 100.28 before the bar
+    assert _bar(handler, '09:35') == []
+    assert handler.resting[0].triggered
+    assert _bar(handler, '09:40') == [(_t('09:40'), 'A', 'BUY', 1, 100.28)]
+    assert _quote_times(handler) == [_t('09:37')]
+
+
+def test_untriggered_stop_limit_does_not_fill_at_its_limit(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    # The limit is below every later ask, but the stop is never reached
+    _order(handler, 'A', 'STPLMT', 1, 'BUY', stop_price=101.00, limit_price=100.20)
+    assert _bar(handler, '09:40') == []
+    assert handler.open_orders() == 1
+
+
+def test_orders_wait_for_the_first_quote(store):
+    handler = _handler(store)
+    _bar(handler, '09:25')
+    assert _order(handler, 'A', 'MKT', 1, 'BUY') == []
+    assert _order(handler, 'A', 'LMT', 2, 'BUY', limit_price=100.20) == []
+    assert _order(handler, 'A', 'LMT', 3, 'BUY', limit_price=99.95) == []
+    assert handler.open_orders() == 3
+    # On the first quote they arrive: marketable ones take the touch, the rest rest
+    assert _bar(handler, '09:30') == [(_t('09:30'), 'A', 'BUY', 1, 100.10), (_t('09:30'), 'A', 'BUY', 2, 100.10)]
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'BUY', 3, 99.95)]
+    assert _quote_times(handler) == [_t('09:30'), _t('09:30'), _t('09:33')]
+
+
+def test_orders_for_a_symbol_without_quotes_keep_waiting(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    assert _order(handler, 'C', 'MKT', 1, 'BUY') == []
+    assert _bar(handler, '09:40') == []
+    assert handler.open_orders() == 1
+
+
+def test_bracket_legs_arm_from_the_next_quote(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 10, 'BUY', limit_price=99.95, take_profit=100.55, stop_loss=99.85)
+    # The parent fills on the 09:33 quote, whose bid of 99.80 would already stop out the position
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'BUY', 10, 99.95)]
+    assert handler.open_orders() == 2
+    assert _bar(handler, '09:40') == [(_t('09:40'), 'A', 'SELL', 10, 99.50)]
+    assert _quote_times(handler) == [_t('09:33'), _t('09:37')]
+    assert handler.open_orders() == 0
+
+
+def test_bracket_filled_on_arrival_arms_legs_from_the_next_quote(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    # 100.05 would take the 09:30 bid of 100.00 if the leg were armed on it
+    assert _order(handler, 'A', 'MKT', 10, 'BUY', take_profit=99.95, stop_loss=99.00) == \
+        [(_t('09:30'), 'A', 'BUY', 10, 100.10)]
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'SELL', 10, 99.95)]
+    assert _quote_times(handler) == [_t('09:30'), _t('09:31')]
+
+
+def test_oco_take_profit_cancels_the_stop_loss(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'MKT', 10, 'BUY', take_profit=100.45, stop_loss=99.50)
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'SELL', 10, 100.45)]
+    assert handler.open_orders() == 0
+    # The 09:37 bid would have hit the stop loss
+    assert _bar(handler, '09:40') == []
+
+
+def test_oco_stop_loss_cancels_the_take_profit(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'MKT', 10, 'BUY', take_profit=100.55, stop_loss=99.95)
+    assert _bar(handler, '09:35') == [(_t('09:35'), 'A', 'SELL', 10, 99.90)]
+    assert _quote_times(handler) == [_t('09:30'), _t('09:32')]
+    assert handler.open_orders() == 0
+
+
+def test_market_order_cancels_the_symbols_resting_orders(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 1, 'BUY', limit_price=99.00)
+    _order(handler, 'A', 'STP', 1, 'SELL', stop_price=98.00)
+    _order(handler, 'B', 'LMT', 1, 'BUY', limit_price=49.00)
+    assert handler.open_orders() == 3
+    assert _order(handler, 'A', 'MKT', 1, 'SELL') == [(_t('09:30'), 'A', 'SELL', 1, 100.00)]
+    assert [o.symbol for o in handler.resting] == ['B']
+
+
+def test_bracket_market_order_keeps_resting_orders(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 1, 'BUY', limit_price=99.00)
+    _order(handler, 'A', 'MKT', 1, 'BUY', take_profit=101.00, stop_loss=98.00)
+    assert handler.open_orders() == 3
+
+
+def test_cancel_withdraws_only_the_symbols_orders(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'LMT', 1, 'BUY', limit_price=99.00)
+    _order(handler, 'B', 'LMT', 1, 'BUY', limit_price=49.00)
+    assert _order(handler, 'A', 'CANCEL', 0, 'BUY') == []
+    assert [o.symbol for o in handler.resting] == ['B']
+    assert _bar(handler, '09:40') == []
+
+
+def test_spread_cost_is_positive_when_taking_and_negative_when_resting(store):
+    handler = _handler(store)
+    _bar(handler, '09:30')
+    _order(handler, 'A', 'MKT', 10, 'BUY')
+    _order(handler, 'A', 'LMT', 10, 'SELL', limit_price=100.45)
+    _bar(handler, '09:35')
+    costs = handler.spread_costs()
+    assert list(costs['direction']) == ['BUY', 'SELL']
+    # Taking the 09:30 ask pays half the spread
+    assert costs['mid'][0] == pytest.approx(100.05)
+    assert costs['spread_cost'][0] == pytest.approx(0.5)
+    # The resting offer is measured against the 09:34 quote it rested in, not the 09:35 bid that went through it
+    assert costs['mid'][1] == pytest.approx(100.25)
+    assert costs['spread_cost'][1] == pytest.approx(-2.0)
+
+
+def test_spread_cost_of_a_resting_order_inside_the_spread(store):
+    handler = _handler(store)
+    _bar(handler, '09:35')
+    # Bids 100.55 inside the 100.50/100.60 spread, making it the best bid until the 09:36 ask goes through it
+    _order(handler, 'A', 'LMT', 10, 'BUY', limit_price=100.55)
+    assert _bar(handler, '09:40') == [(_t('09:40'), 'A', 'BUY', 10, 100.55)]
+    costs = handler.spread_costs()
+    assert list(costs['quote_time']) == [_t('09:36')]
+    assert costs['mid'][0] == pytest.approx(100.575)
+    assert costs['spread_cost'][0] == pytest.approx(-0.25)
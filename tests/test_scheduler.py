@@ -0,0 +1,250 @@
+import os
+import pickle
+import queue
+
+import pandas as pd
+import pytest
+
+from backtest.engine import Backtest
+from backtest.equivalence import synthetic_bars
+from backtest.event import MarketEvent, OrderEvent, TimerEvent
+from backtest.registry import default_registry
+from backtest.runner import build_backtest
+from backtest.scheduler import EventScheduler
+
+
+def _drain(events):
+    out = []
+    while True:
+        try:
+            out.append(events.get(False))
+        except queue.Empty:
+            return out
+
+
+def _bar(events, when):
+    """Puts the MarketEvent of a bar at `when` and returns what is delivered with it."""
+    events.put(MarketEvent(pd.Timestamp(when)))
+    delivered = _drain(events)
+    assert delivered[0].type == 'MARKET'
+    return delivered[1:]
+
+
+def _order(symbol):
+    return OrderEvent(symbol, 'MKT', 1, 'BUY')
+
+
+def test_without_latency_events_are_due_now_in_put_order():
+    events = EventScheduler()
+    _bar(events, '2020-01-06')
+    orders = [_order(s) for s in 'ABC']
+    for order in orders:
+        events.put(order)
+    assert events.qsize() == 3 and events.pending() == 0
+    assert _drain(events) == orders
+
+
+def test_latency_delivers_on_first_bar_at_or_after_due_time():
+    events = EventScheduler(latency={'ORDER': '36h', 'FILL': lambda event: pd.Timedelta(0)})
+    _bar(events, '2020-01-06')
+    order = _order('A')
+    events.put(order)
+    assert events.empty() and events.pending() == 1
+    # Due Tuesday 12:00: not on Tuesday's bar, but right after Wednesday's
+    assert _bar(events, '2020-01-07') == []
+    assert _bar(events, '2020-01-08') == [order]
+    assert events.pending() == 0
+
+
+def test_latency_is_per_event_type():
+    events = EventScheduler(latency={'ORDER': '1D'})
+    _bar(events, '2020-01-06')
+    order, timer = _order('A'), TimerEvent('now', pd.Timestamp('2020-01-06'))
+    events.put(order)
+    events.put(timer)
+    assert _drain(events) == [timer]
+    assert _bar(events, '2020-01-07') == [order]
+
+
+def test_put_at_and_delay_override_latency():
+    events = EventScheduler(latency={'ORDER': '10D'})
+    _bar(events, '2020-01-06')
+    at, delay, past = _order('AT'), _order('DELAY'), _order('PAST')
+    events.put(at, at='2020-01-07 09:30')
+    events.put(delay, delay='2D')
+    events.put(past, at='2020-01-01')
+    assert _drain(events) == [past]
+    assert _bar(events, '2020-01-07') == []
+    assert _bar(events, '2020-01-08') == [at, delay]
+
+
+def test_delay_before_the_first_bar_is_due_immediately():
+    events = EventScheduler(latency={'ORDER': '1D'})
+    order = _order('A')
+    events.put(order)
+    assert _drain(events) == [order]
+
+
+def test_events_released_together_come_in_due_time_order():
+    events = EventScheduler()
+    _bar(events, '2020-01-06')
+    late, early = _order('LATE'), _order('EARLY')
+    events.put(late, at='2020-01-09')
+    events.put(early, at='2020-01-07')
+    assert _bar(events, '2020-01-10') == [early, late]
+
+
+def test_equal_due_times_keep_scheduling_order():
+    events = EventScheduler(latency={'ORDER': '1D'})
+    _bar(events, '2020-01-06')
+    orders = [_order(s) for s in 'ABCDE']
+    events.put(orders[0])
+    events.put(orders[1], at='2020-01-07')
+    events.put(orders[2], delay='1D')
+    events.put(orders[3])
+    events.put(orders[4], at=pd.Timestamp('2020-01-07'))
+    assert _bar(events, '2020-01-07') == orders
+
+
+def _fired(events, bars):
+    """(bar, timer name, timer time) for every TimerEvent delivered over `bars`."""
+    return [(pd.Timestamp(bar), event.name, event.datetime)
+            for bar in bars for event in _bar(events, bar) if event.type == 'TIMER']
+
+
+def test_rule_timer_fires_on_each_occurrence():
+    events = EventScheduler()
+    events.add_timer('friday', rule='W-FRI')
+    bars = pd.bdate_range('2020-01-06', '2020-01-24')
+    fridays = [pd.Timestamp(d) for d in ('2020-01-10', '2020-01-17', '2020-01-24')]
+    assert _fired(events, bars) == [(d, 'friday', d) for d in fridays]
+    assert events.pending() == 1
+
+
+def test_timer_offset_is_delivered_on_the_next_bar():
+    events = EventScheduler()
+    events.add_timer('close', rule='W-FRI', offset='16h')
+    bars = pd.bdate_range('2020-01-06', '2020-01-20')
+    assert _fired(events, bars) == [
+        (pd.Timestamp('2020-01-13'), 'close', pd.Timestamp('2020-01-10 16:00')),
+        (pd.Timestamp('2020-01-20'), 'close', pd.Timestamp('2020-01-17 16:00')),
+    ]
+
+
+def test_intraday_timer_fires_after_the_bar_reaching_it():
+    events = EventScheduler()
+    events.add_timer('session-close', rule='B', offset='16h')
+    bars = pd.date_range('2020-01-06 14:00', periods=6, freq='h')
+    assert _fired(events, bars) == [
+        (pd.Timestamp('2020-01-06 16:00'), 'session-close', pd.Timestamp('2020-01-06 16:00')),
+    ]
+
+
+def test_explicit_times_skip_those_before_the_first_bar():
+    events = EventScheduler()
+    events.add_timer('rebalance', times=['2020-01-15', '2020-01-02', '2020-01-08'], offset='1h')
+    bars = pd.bdate_range('2020-01-06', '2020-01-20')
+    assert _fired(events, bars) == [
+        (pd.Timestamp('2020-01-09'), 'rebalance', pd.Timestamp('2020-01-08 01:00')),
+        (pd.Timestamp('2020-01-16'), 'rebalance', pd.Timestamp('2020-01-15 01:00')),
+    ]
+    assert events.pending() == 0
+
+
+def test_timer_added_after_the_clock_started():
+    events = EventScheduler()
+    _bar(events, '2020-01-06')
+    events.add_timer('friday', rule='W-FRI')
+    assert _fired(events, pd.bdate_range('2020-01-07', '2020-01-10')) == [
+        (pd.Timestamp('2020-01-10'), 'friday', pd.Timestamp('2020-01-10')),
+    ]
+
+
+def test_timer_ties_follow_scheduling_order():
+    events = EventScheduler()
+    events.add_timer('first', rule='W-FRI')
+    events.add_timer('second', times=['2020-01-10'])
+    order = _order('A')
+    _bar(events, '2020-01-06')
+    events.put(order, at='2020-01-10')
+    delivered = _bar(events, '2020-01-10')
+    assert [getattr(e, 'name', None) for e in delivered] == ['first', 'second', None]
+    assert delivered[2] is order
+
+
+def test_add_timer_needs_exactly_one_of_rule_and_times():
+    events = EventScheduler()
+    with pytest.raises(ValueError):
+        events.add_timer('neither')
+    with pytest.raises(ValueError):
+        events.add_timer('both', rule='B', times=['2020-01-06'])
+
+
+def test_pickled_scheduler_keeps_pending_events_and_timers():
+    events = EventScheduler(latency={'ORDER': '2D'})
+    events.add_timer('friday', rule='W-FRI')
+    _bar(events, '2020-01-06')
+    events.put(_order('A'))
+    events.put(_order('B'), at='2020-01-09')
+    restored = pickle.loads(pickle.dumps(events))
+    assert restored.now == events.now and restored.pending() == events.pending() == 3
+
+    def delivered(events):
+        out = []
+        for bar in pd.bdate_range('2020-01-07', '2020-01-17'):
+            out += [(bar, e.type, getattr(e, 'symbol', None) or e.datetime) for e in _bar(events, bar)]
+        events.put(_order('C'))
+        return out + [(None, e.type, e.symbol) for e in _drain(events)] + [('later', events.pending())]
+
+    assert delivered(restored) == delivered(events)
+
+
+class _Recorder:
+    # Picklable timer callback, so it travels with a snapshot
+    def __init__(self):
+        self.fired = []
+
+    def record(self, event):
+        self.fired.append(event.datetime)
+
+
+def _scheduled_backtest(data):
+    cls = default_registry().load('RSI (14/30/70)')
+    events = EventScheduler(latency={'ORDER': '1D', 'FILL': '2D'})
+    recorder = _Recorder()
+    events.add_timer('month-end', rule='BME', callback=recorder.record)
+    backtest = build_backtest(data, 'SYN', cls, {}, '2015-01-01', events=events)
+    backtest.recorder = recorder
+    return backtest
+
+
+def test_backtest_snapshot_keeps_pending_events_and_timers(tmp_path):
+    data = synthetic_bars(n_bars=300, seed=3, reversion=0.05)
+    full = _scheduled_backtest(data.copy())
+    full_curve, full_log = full.simulate_trading()
+
+    cut = 150
+    backtest = _scheduled_backtest(data.iloc[:cut].copy())
+    backtest.simulate_trading()
+    # One delayed event beyond the cut besides the month-end timer
+    probe = TimerEvent('probe', None)
+    backtest.events.put(probe, delay='3D')
+    pending = backtest.events.pending()
+    assert pending >= 2
+
+    path = os.path.join(tmp_path, 'snapshot.pkl')
+    backtest.save_snapshot(path)
+    restored = Backtest.load_snapshot(path)
+    assert isinstance(restored.events, EventScheduler)
+    assert restored.events.pending() == pending
+    assert restored.events.now == data.index[cut - 1]
+    # Every component shares the restored scheduler
+    assert restored.strategy.events is restored.events is restored.portfolio.events
+    assert restored.execution_handler.events is restored.events
+    assert restored.data_handler.events is restored.events
+
+    curve, log = restored.resume(data)
+    assert restored.recorder.fired == full.recorder.fired
+    assert len(full.recorder.fired) > 0
+    pd.testing.assert_frame_equal(curve, full_curve)
+    assert list(log) == list(full_log)